@@ -0,0 +1,292 @@
+"""
+Suíte de benchmarks do HoldMed: micro-benchmarks do agente de IA e teste de carga das rotas.
+
+1. Gera um hospital sintético em um banco SQLite temporário (ou reaproveita um já gerado com --db).
+2. Micro-benchmarks: predict_complication, predict_batch, process_clinical_notes, varredura de
+   risco e to_dict.
+3. Carga: cada cenário dispara requisições concorrentes às rotas Flask por um cliente local
+   (test_client, sem rede) e reporta vazão e latências p50/p95/p99.
+4. Grava os resultados em JSON em benchmarks/results/ para comparar entre commits (--compare).
+
+Uso (a partir de backend/):
+    python benchmarks/bench_api.py --patients 2000 --vitals-per-patient 1000 --db /tmp/holdmed-bench.db
+    python benchmarks/bench_api.py --db /tmp/holdmed-bench.db --compare benchmarks/results/<anterior>.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCHMARKS_DIR)
+RESULTS_DIR = os.path.join(BENCHMARKS_DIR, 'results')
+
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'src'))
+
+# Tarefas em segundo plano em uma thread do próprio processo, modelos em um registro temporário e
+# sem a thread de aquecimento, para não disputar núcleos com a medição nem tocar no registro do projeto
+os.environ.setdefault('HOLDMED_JOB_WORKERS', '0')
+os.environ.setdefault('HOLDMED_MODEL_REGISTRY', os.path.join(tempfile.gettempdir(), 'holdmed-bench-registry'))
+os.environ.setdefault('HOLDMED_WARMUP', 'lazy')
+os.environ.setdefault('HOLDMED_RISK_SWEEP_SECONDS', '0')
+
+import numpy as np  # noqa: E402
+
+from main import create_app  # noqa: E402
+from model_registry import model_registry  # noqa: E402
+from models.patient import Patient, VitalSigns, ClinicalNotes, db  # noqa: E402
+from features import feature_store  # noqa: E402
+import risk_board  # noqa: E402
+from seed import seed_hospital  # noqa: E402
+
+# Cenários de carga: método, caminho (com {patient_id}) e corpo JSON opcional
+SCENARIOS = {
+    'get_patient': ('GET', '/api/patients/{patient_id}?limit=100', None),
+    'predict_complications': ('GET', '/api/patients/{patient_id}/predict-complications', None),
+    'dashboard_insights': ('GET', '/api/patients/{patient_id}/dashboard-insights', None),
+    'vital_signs_series': ('GET', '/api/patients/{patient_id}/vital-signs/series?resolution=auto&since={since}', None),
+    'risk_board': ('GET', '/api/risk-board?limit=50', None),
+    'add_vital_signs': ('POST', '/api/patients/{patient_id}/vital-signs', {
+        'blood_pressure_systolic': 122.0, 'blood_pressure_diastolic': 80.0, 'heart_rate': 84,
+        'temperature': 37.1, 'oxygen_saturation': 97.0, 'respiratory_rate': 16,
+    }),
+}
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize(latencies: list, elapsed: float = None) -> dict:
+    """
+    Estatísticas de uma lista de latências em segundos: média e percentis em microssegundos.
+    """
+    values = np.array(latencies) * 1e6
+    summary = {
+        'count': len(values),
+        'mean_us': round(float(values.mean()), 1),
+        'p50_us': round(float(np.percentile(values, 50)), 1),
+        'p95_us': round(float(np.percentile(values, 95)), 1),
+        'p99_us': round(float(np.percentile(values, 99)), 1),
+    }
+    if elapsed:
+        summary['throughput_per_s'] = round(len(values) / elapsed, 1)
+    return summary
+
+
+def time_calls(function, min_calls: int = 50, min_seconds: float = 1.0) -> dict:
+    """
+    Chama function repetidamente (pelo menos min_calls vezes e min_seconds) e resume as latências.
+    """
+    function()
+    latencies = []
+    started = time.perf_counter()
+    while len(latencies) < min_calls or time.perf_counter() - started < min_seconds:
+        call_started = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - call_started)
+    return summarize(latencies)
+
+
+def run_micro(app, log) -> dict:
+    results = {}
+    with app.app_context():
+        agent = model_registry.get_agent()
+        patients = Patient.query.limit(1000).all()
+        vectors = [feature_store.vector(patient) for patient in patients]
+        rng = random.Random(0)
+
+        results['predict_complication'] = time_calls(lambda: agent.predict_complication(rng.choice(vectors)))
+        for size in (64, 1000):
+            batch = agent.features_matrix([rng.choice(vectors) for _ in range(size)])
+            summary = time_calls(lambda: agent.predict_batch(batch), min_calls=10)
+            summary['per_patient_us'] = round(summary['mean_us'] / size, 1)
+            results[f'predict_batch_{size}'] = summary
+
+        notes = [note.content for note in ClinicalNotes.query.limit(200)]
+        try:
+            results['process_clinical_notes'] = time_calls(lambda: agent.process_clinical_notes(rng.choice(notes)))
+        except OSError as e:
+            # Modelo do spaCy indisponível (ex.: sem acesso à rede para baixar)
+            results['process_clinical_notes'] = {'skipped': str(e)}
+
+        # Varredura da enfermaria inteira (também popula o quadro lido no cenário risk_board)
+        summary = time_calls(risk_board.sweep, min_calls=3)
+        summary['patients'] = risk_board.sweep()['patients']
+        summary['per_patient_us'] = round(summary['mean_us'] / max(summary['patients'], 1), 1)
+        results['risk_sweep'] = summary
+
+        vital_signs = VitalSigns.query.limit(10000).all()
+        summary = time_calls(lambda: [row.to_dict() for row in vital_signs], min_calls=5)
+        summary['per_row_us'] = round(summary['mean_us'] / len(vital_signs), 2)
+        results['vital_signs_to_dict_10k'] = summary
+        summary = time_calls(lambda: json.dumps([row.to_dict() for row in vital_signs]), min_calls=5)
+        summary['per_row_us'] = round(summary['mean_us'] / len(vital_signs), 2)
+        results['vital_signs_to_json_10k'] = summary
+        db.session.remove()
+
+    for name, summary in results.items():
+        log(f"  {name:<28} {summary}")
+    return results
+
+
+def run_load(app, scenarios: list, concurrency: int, duration: float, log) -> dict:
+    """
+    Para cada cenário, concurrency threads fazem requisições em sequência durante duration segundos.
+    """
+    with app.app_context():
+        patient_ids = [patient_id for (patient_id,) in db.session.query(Patient.id)]
+        if 'risk_board' in scenarios:
+            risk_board.sweep()
+        db.session.remove()
+    since = (datetime.utcnow() - timedelta(days=3)).isoformat(timespec='seconds')
+
+    results = {}
+    for name in scenarios:
+        method, path, body = SCENARIOS[name]
+        deadline = time.perf_counter() + duration
+        latencies, errors = [], {}
+        lock = threading.Lock()
+
+        def worker(seed):
+            client = app.test_client()
+            choose = random.Random(seed).choice
+            local_latencies, local_errors = [], {}
+            while time.perf_counter() < deadline:
+                url = path.format(patient_id=choose(patient_ids), since=since)
+                started = time.perf_counter()
+                response = client.open(url, method=method, json=body)
+                local_latencies.append(time.perf_counter() - started)
+                if response.status_code >= 400:
+                    local_errors[response.status_code] = local_errors.get(response.status_code, 0) + 1
+            with lock:
+                latencies.extend(local_latencies)
+                for status, count in local_errors.items():
+                    errors[status] = errors.get(status, 0) + count
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(worker, range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+        summary = summarize(latencies, elapsed)
+        summary['errors'] = {str(status): count for status, count in errors.items()}
+        results[name] = summary
+        log(f"  {name:<24} {summary['throughput_per_s']:>8} req/s  p50 {summary['p50_us'] / 1000:.1f} ms  "
+            f"p95 {summary['p95_us'] / 1000:.1f} ms  p99 {summary['p99_us'] / 1000:.1f} ms  erros {summary['errors']}")
+    return results
+
+
+def compare(current: dict, baseline: dict, log):
+    """
+    Razão atual/anterior das latências (p50 e p95); valores acima de 1 indicam regressão.
+    """
+    log(f"\nComparação com {baseline.get('git_commit')} ({baseline.get('created_at')}):")
+    for section in ('micro', 'load'):
+        for name, summary in current.get(section, {}).items():
+            previous = baseline.get(section, {}).get(name)
+            if not previous or 'p50_us' not in summary or 'p50_us' not in previous:
+                continue
+            ratios = '  '.join(
+                f"{key[:-3]} x{summary[key] / previous[key]:.2f}" for key in ('p50_us', 'p95_us') if previous[key]
+            )
+            log(f"  {section}/{name:<28} {ratios}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', help='Arquivo SQLite do hospital sintético; reaproveitado se já existir.')
+    parser.add_argument('--patients', type=int, default=2000)
+    parser.add_argument('--vitals-per-patient', type=int, default=1000)
+    parser.add_argument('--labs-per-patient', type=int, default=20)
+    parser.add_argument('--notes-per-patient', type=int, default=3)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0, help='Segundos por cenário de carga.')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='Cenários de carga separados por vírgula.')
+    parser.add_argument('--skip-micro', action='store_true')
+    parser.add_argument('--skip-load', action='store_true')
+    parser.add_argument('--output', help='Arquivo de resultados (padrão: benchmarks/results/<commit>-<data>.json).')
+    parser.add_argument('--compare', help='Resultados anteriores para comparação.')
+    args = parser.parse_args()
+
+    scenarios = args.scenarios.split(',')
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Cenários desconhecidos: {', '.join(unknown)}")
+
+    temporary = None
+    db_path = args.db
+    if db_path is None:
+        temporary = tempfile.TemporaryDirectory(prefix='holdmed-bench-')
+        db_path = os.path.join(temporary.name, 'bench.db')
+    reuse = os.path.exists(db_path)
+
+    results = {
+        'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'params': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+    }
+
+    try:
+        started = time.perf_counter()
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}'})
+        results['startup_seconds'] = round(time.perf_counter() - started, 3)
+
+        with app.app_context():
+            if reuse and Patient.query.first() is not None:
+                print(f"Reaproveitando o hospital sintético em {db_path}")
+            else:
+                print(f"Gerando hospital sintético em {db_path}: {args.patients} pacientes x "
+                      f"{args.vitals_per_patient} sinais vitais")
+                results['seed'] = seed_hospital(
+                    patients=args.patients, vitals_per_patient=args.vitals_per_patient,
+                    labs_per_patient=args.labs_per_patient, notes_per_patient=args.notes_per_patient
+                )
+            results['dataset'] = {
+                'patients': Patient.query.count(),
+                'vital_signs': VitalSigns.query.count(),
+            }
+            db.session.remove()
+
+        if not args.skip_micro:
+            print("\nMicro-benchmarks (µs):")
+            results['micro'] = run_micro(app, print)
+        if not args.skip_load:
+            print(f"\nCarga: {args.concurrency} clientes concorrentes, {args.duration:.0f}s por cenário")
+            results['load'] = run_load(app, scenarios, args.concurrency, args.duration, print)
+    finally:
+        if temporary is not None:
+            temporary.cleanup()
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S')
+        output = os.path.join(RESULTS_DIR, f"{results['git_commit'] or 'local'}-{stamp}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\nResultados gravados em {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(results, json.load(f), print)
+
+
+if __name__ == '__main__':
+    main()
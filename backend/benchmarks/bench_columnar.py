@@ -0,0 +1,127 @@
+"""
+Benchmark da importação e exportação colunar (Parquet / Arrow IPC).
+
+1. Exportação: GET /api/export/vital-signs em Parquet e Arrow, com linhas/s, tamanho do arquivo
+   e o tempo para carregar o arquivo no pandas.
+2. Importação: as mesmas leituras enviadas a POST /api/import/vital-signs (Parquet) e a
+   POST /api/vital-signs/bulk (NDJSON), cada uma em um banco novo com os mesmos pacientes.
+
+Uso (a partir de backend/):
+    python benchmarks/bench_columnar.py --patients 1000 --vitals-per-patient 500
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCHMARKS_DIR), 'src'))
+
+os.environ.setdefault('HOLDMED_JOB_WORKERS', '0')
+os.environ.setdefault('HOLDMED_MODEL_REGISTRY', os.path.join(tempfile.gettempdir(), 'holdmed-bench-registry'))
+os.environ.setdefault('HOLDMED_WARMUP', 'lazy')
+os.environ.setdefault('HOLDMED_RISK_SWEEP_SECONDS', '0')
+
+import pandas as pd  # noqa: E402
+import pyarrow as pa  # noqa: E402
+import pyarrow.ipc  # noqa: E402
+
+from main import create_app  # noqa: E402
+from models.patient import VitalSigns, db  # noqa: E402
+from seed import seed_hospital  # noqa: E402
+import storage  # noqa: E402
+
+
+def run_export(client, rows: int, log) -> dict:
+    results = {}
+    files = {}
+    for format_name in ('parquet', 'arrow'):
+        started = time.perf_counter()
+        response = client.get('/api/export/vital-signs', query_string={'format': format_name}, buffered=False)
+        data = b''.join(response.response)
+        elapsed = time.perf_counter() - started
+        files[format_name] = data
+
+        started = time.perf_counter()
+        if format_name == 'parquet':
+            frame = pd.read_parquet(io.BytesIO(data))
+        else:
+            frame = pa.ipc.open_stream(data).read_pandas()
+        load_seconds = time.perf_counter() - started
+        assert len(frame) == rows
+
+        results[format_name] = {
+            'rows_per_s': round(rows / elapsed, 1),
+            'seconds': round(elapsed, 3),
+            'bytes': len(data),
+            'pandas_load_seconds': round(load_seconds, 3),
+        }
+        summary = results[format_name]
+        log(f"  {format_name:<8} {summary['rows_per_s']:>10} linhas/s  {summary['bytes'] / 1e6:>7.1f} MB  "
+            f"pandas {summary['pandas_load_seconds'] * 1000:.0f} ms")
+    return results, files
+
+
+def run_import(directory: str, mode: str, patients: bytes, vitals: bytes, ndjson: bytes, rows: int) -> dict:
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(directory, f'{mode}.db')}"})
+    client = app.test_client()
+    response = client.post('/api/import/patients', data=patients, content_type='application/vnd.apache.parquet')
+    assert response.status_code == 201, response.data
+
+    started = time.perf_counter()
+    if mode == 'parquet':
+        response = client.post('/api/import/vital-signs', data=vitals, content_type='application/vnd.apache.parquet')
+    else:
+        response = client.post('/api/vital-signs/bulk', data=ndjson, content_type='application/x-ndjson')
+    elapsed = time.perf_counter() - started
+    assert response.status_code == 201, response.data[:500]
+
+    with app.app_context():
+        assert db.session.query(VitalSigns).count() == rows
+        db.session.remove()
+    storage.dispose(app, db)
+    return {'rows_per_s': round(rows / elapsed, 1), 'seconds': round(elapsed, 3), 'body_bytes': len(vitals if mode == 'parquet' else ndjson)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--patients', type=int, default=1000)
+    parser.add_argument('--vitals-per-patient', type=int, default=200)
+    parser.add_argument('--output', help='Grava os resultados em JSON.')
+    args = parser.parse_args()
+
+    rows = args.patients * args.vitals_per_patient
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='holdmed-columnar-') as directory:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(directory, 'source.db')}"})
+        with app.app_context():
+            seed_hospital(patients=args.patients, vitals_per_patient=args.vitals_per_patient, labs_per_patient=1,
+                          notes_per_patient=0, log=lambda *a: None)
+        client = app.test_client()
+
+        print(f"Exportação de {rows} sinais vitais:")
+        results['export'], files = run_export(client, rows, print)
+        patients = client.get('/api/export/patients').data
+        storage.dispose(app, db)
+
+        # As mesmas leituras em NDJSON para a ingestão em lote (sem id, como enviadas por um monitor)
+        frame = pd.read_parquet(io.BytesIO(files['parquet'])).drop(columns=['id'])
+        ndjson = frame.to_json(orient='records', lines=True, date_format='iso', date_unit='us').encode()
+
+        print(f"\nImportação de {rows} sinais vitais (banco novo, mesmos pacientes):")
+        results['import'] = {}
+        for mode in ('parquet', 'ndjson'):
+            summary = results['import'][mode] = run_import(directory, mode, patients, files['parquet'], ndjson, rows)
+            route = '/import/vital-signs' if mode == 'parquet' else '/vital-signs/bulk'
+            print(f"  {mode:<8} {summary['rows_per_s']:>10} linhas/s  {summary['body_bytes'] / 1e6:>7.1f} MB  ({route})")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+"""
+Benchmark de concorrência do SQLite: leitores durante ingestões em lote.
+
+Gera um hospital sintético, copia o banco para cada modo e, em um processo separado por modo,
+mede as leituras (GET /patients/<id> e a série de sinais vitais) primeiro sozinhas e depois
+com escritores enviando lotes a POST /vital-signs/bulk ao mesmo tempo.
+
+Modos:
+    tuned    ajustes de storage.py: WAL, synchronous=NORMAL, mmap e busy_timeout
+    default  padrões do SQLite (journal em modo DELETE, sem PRAGMAs)
+
+Os escritores rodam em processos próprios, como workers do gunicorn. No modo default o commit
+precisa de um lock exclusivo no arquivo e os leitores esperam por ele; com WAL as leituras não
+esperam por locks. Com poucos núcleos a disputa por CPU domina as medianas: compare sobretudo
+a cauda (p95 e máximo) e as contagens de "database is locked".
+
+Uso (a partir de backend/):
+    python benchmarks/bench_concurrency.py --readers 4 --writers 2 --duration 10
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCHMARKS_DIR), 'src'))
+
+os.environ.setdefault('HOLDMED_JOB_WORKERS', '0')
+os.environ.setdefault('HOLDMED_MODEL_REGISTRY', os.path.join(tempfile.gettempdir(), 'holdmed-bench-registry'))
+# As rotas medidas não usam o modelo nem o spaCy: sem as threads de aquecimento e de varredura de risco
+os.environ.setdefault('HOLDMED_WARMUP', 'lazy')
+os.environ.setdefault('HOLDMED_RISK_SWEEP_SECONDS', '0')
+
+MODES = {
+    'tuned': {'HOLDMED_SQLITE_TUNING': '1'},
+    'default': {'HOLDMED_SQLITE_TUNING': '0'},
+}
+
+READ_PATHS = (
+    '/api/patients/{patient_id}?limit=100&include=vital_signs',
+    '/api/patients/{patient_id}/vital-signs/series?resolution=raw&since={since}',
+)
+
+
+def _reader(app, patient_ids, since, deadline, seed):
+    client = app.test_client()
+    choose = random.Random(seed).choice
+    latencies, errors = [], {}
+    while time.perf_counter() < deadline:
+        url = choose(READ_PATHS).format(patient_id=choose(patient_ids), since=since)
+        started = time.perf_counter()
+        response = client.get(url)
+        latencies.append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            errors[response.status_code] = errors.get(response.status_code, 0) + 1
+    return latencies, errors
+
+
+def _writer_process(db_path, patient_ids, bulk_size, seed, stop, messages):
+    """
+    Escritor em um processo próprio (como um worker do gunicorn), sem disputar o GIL com os leitores.
+    """
+    from main import create_app
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}'})
+    client = app.test_client()
+    rng = random.Random(seed)
+    inserted, locked, batches = 0, 0, []
+    messages.put('ready')
+    started = time.perf_counter()
+    while not stop.is_set():
+        readings = [
+            {
+                'patient_id': rng.choice(patient_ids),
+                'heart_rate': rng.randint(60, 120),
+                'temperature': round(rng.uniform(36, 39), 1),
+                'oxygen_saturation': round(rng.uniform(90, 100), 1),
+            }
+            for _ in range(bulk_size)
+        ]
+        batch_started = time.perf_counter()
+        response = client.post('/api/vital-signs/bulk', json=readings)
+        batches.append(time.perf_counter() - batch_started)
+        body = response.get_json() or {}
+        inserted += body.get('inserted', 0)
+        locked += sum('locked' in error['error'] for error in body.get('errors', []))
+    messages.put((inserted, locked, batches, time.perf_counter() - started))
+
+
+def _run_readers(app, patient_ids, since, readers, duration):
+    deadline = time.perf_counter() + duration
+    with ThreadPoolExecutor(max_workers=readers) as executor:
+        started = time.perf_counter()
+        reads = list(executor.map(lambda seed: _reader(app, patient_ids, since, deadline, seed), range(readers)))
+        return reads, time.perf_counter() - started
+
+
+def run_mode(db_path, readers, writers, bulk_size, duration):
+    """
+    Executado no processo de cada modo: mede leitores sozinhos e com escritores concorrentes.
+    """
+    from bench_api import summarize
+    from main import create_app
+    from models.patient import Patient, db
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}'})
+    with app.app_context():
+        patient_ids = [patient_id for (patient_id,) in db.session.query(Patient.id)]
+        journal_mode = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+        db.session.remove()
+    since = (datetime.utcnow() - timedelta(hours=6)).isoformat(timespec='seconds')
+    results = {'journal_mode': journal_mode}
+
+    context = multiprocessing.get_context('spawn')
+    for phase, phase_writers in (('readers_only', 0), ('readers_with_writers', writers)):
+        stop, messages = context.Event(), context.Queue()
+        processes = [
+            context.Process(target=_writer_process, args=(db_path, patient_ids, bulk_size, 100 + seed, stop, messages))
+            for seed in range(phase_writers)
+        ]
+        for process in processes:
+            process.start()
+        for _ in processes:
+            messages.get()
+
+        reads, elapsed = _run_readers(app, patient_ids, since, readers, duration)
+        stop.set()
+        writes = [messages.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+        latencies = [latency for reader_latencies, _ in reads for latency in reader_latencies]
+        summary = summarize(latencies, elapsed)
+        summary['max_us'] = round(max(latencies) * 1e6, 1)
+        summary['errors'] = {}
+        for _, errors in reads:
+            for status, count in errors.items():
+                summary['errors'][str(status)] = summary['errors'].get(str(status), 0) + count
+        if writes:
+            batches = [latency for _, _, batch_latencies, _ in writes for latency in batch_latencies]
+            summary['writes'] = {
+                'rows_per_s': round(sum(inserted / seconds for inserted, _, _, seconds in writes), 1),
+                'locked_errors': sum(locked for _, locked, _, _ in writes),
+                'batch': summarize(batches),
+            }
+        results[phase] = summary
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--patients', type=int, default=200)
+    parser.add_argument('--vitals-per-patient', type=int, default=500)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--bulk-size', type=int, default=5000, help='Leituras por requisição de ingestão.')
+    parser.add_argument('--duration', type=float, default=10.0, help='Segundos por fase.')
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--output', help='Grava os resultados em JSON.')
+    parser.add_argument('--run-mode', help=argparse.SUPPRESS)
+    parser.add_argument('--db', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_mode:
+        # Processo filho: a configuração do SQLite é lida das variáveis de ambiente na importação
+        print(json.dumps(run_mode(args.db, args.readers, args.writers, args.bulk_size, args.duration)))
+        return
+
+    from main import create_app
+    from models.user import db
+    from seed import seed_hospital
+    import storage
+
+    modes = args.modes.split(',')
+    with tempfile.TemporaryDirectory(prefix='holdmed-concurrency-') as directory:
+        template = os.path.join(directory, 'template.db')
+        print(f"Gerando hospital sintético: {args.patients} pacientes x {args.vitals_per_patient} sinais vitais")
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{template}'})
+        with app.app_context():
+            seed_hospital(patients=args.patients, vitals_per_patient=args.vitals_per_patient, log=lambda *a: None)
+        storage.dispose(app, db)
+        # O modo do journal fica gravado no arquivo: o modelo volta ao padrão do SQLite
+        with sqlite3.connect(template) as connection:
+            connection.execute('PRAGMA journal_mode=DELETE')
+
+        results = {}
+        for mode in modes:
+            db_path = os.path.join(directory, f'{mode}.db')
+            shutil.copyfile(template, db_path)
+            print(f"\nModo {mode}: {args.readers} leitores, {args.writers} escritores "
+                  f"({args.bulk_size} leituras por lote), {args.duration:.0f}s por fase")
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--run-mode', mode, '--db', db_path,
+                 '--readers', str(args.readers), '--writers', str(args.writers),
+                 '--bulk-size', str(args.bulk_size), '--duration', str(args.duration)],
+                env={**os.environ, **MODES[mode]}, check=True, stdout=subprocess.PIPE, text=True
+            ).stdout
+            results[mode] = json.loads(output.strip().splitlines()[-1])
+
+            print(f"  journal_mode={results[mode]['journal_mode']}")
+            for phase in ('readers_only', 'readers_with_writers'):
+                summary = results[mode][phase]
+                line = (f"  {phase:<22} leituras {summary['throughput_per_s']:>7} req/s  "
+                        f"p50 {summary['p50_us'] / 1000:6.1f} ms  p95 {summary['p95_us'] / 1000:6.1f} ms  "
+                        f"máx {summary['max_us'] / 1000:7.1f} ms  erros {summary['errors']}")
+                if 'writes' in summary:
+                    line += (f"\n  {'':<22} escritas {summary['writes']['rows_per_s']:>7} linhas/s  "
+                             f"'database is locked': {summary['writes']['locked_errors']}")
+                print(line)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
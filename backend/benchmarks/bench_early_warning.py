@@ -0,0 +1,211 @@
+"""
+Benchmark do escore de alerta precoce (NEWS2) na ingestão de sinais vitais.
+
+1. Regras: pontuação de um bloco de leituras com as faixas compiladas (np.digitize) comparada
+   à avaliação leitura a leitura em Python, e o custo da atualização do estado por leitura.
+2. Ingestão: lotes enviados a POST /vital-signs/bulk com a avaliação desativada e ativada, cada
+   modo em uma cópia do mesmo banco; reporta linhas/s, latência por lote e alertas gerados.
+3. Atraso do alerta: leitura individual em piora até a chegada do evento 'early_warning' a um
+   assinante do paciente (o mesmo caminho do SSE).
+
+Uso (a partir de backend/):
+    python benchmarks/bench_early_warning.py --patients 500 --batches 20 --batch-size 5000
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCHMARKS_DIR), 'src'))
+
+os.environ.setdefault('HOLDMED_JOB_WORKERS', '0')
+os.environ.setdefault('HOLDMED_MODEL_REGISTRY', os.path.join(tempfile.gettempdir(), 'holdmed-bench-registry'))
+os.environ.setdefault('HOLDMED_WARMUP', 'lazy')
+os.environ.setdefault('HOLDMED_RISK_SWEEP_SECONDS', '0')
+
+from bench_api import summarize, time_calls  # noqa: E402
+import early_warning as early_warning_module  # noqa: E402
+from early_warning import NEWS2_RULES, early_warning  # noqa: E402
+from main import create_app  # noqa: E402
+from models.early_warning import EarlyWarningAlert  # noqa: E402
+from models.patient import Patient, db  # noqa: E402
+from push import event_broker, patient_topic  # noqa: E402
+from seed import seed_hospital  # noqa: E402
+import storage  # noqa: E402
+
+
+def synthetic_values(rng, size: int, abnormal: float) -> np.ndarray:
+    """
+    Matriz (size, parâmetros) na ordem de early_warning.fields; uma fração abnormal das
+    leituras sai de um paciente em piora.
+    """
+    worse = rng.random(size) < abnormal
+    columns = {
+        'respiratory_rate': np.where(worse, rng.normal(26, 3, size), rng.normal(16, 2, size)).round(),
+        'oxygen_saturation': np.where(worse, rng.normal(90, 2, size), rng.normal(97, 1, size)).clip(70, 100).round(1),
+        'blood_pressure_systolic': np.where(worse, rng.normal(92, 8, size), rng.normal(122, 10, size)).round(1),
+        'heart_rate': np.where(worse, rng.normal(125, 10, size), rng.normal(78, 8, size)).round(),
+        'temperature': np.where(worse, rng.normal(38.8, 0.5, size), rng.normal(36.9, 0.3, size)).round(1),
+    }
+    return np.column_stack([columns[field] for field in early_warning.fields])
+
+
+def naive_points(row) -> list:
+    # Avaliação leitura a leitura, faixa a faixa (referência para as regras compiladas)
+    points = []
+    for field, value in zip(early_warning.fields, row):
+        for upper, band_points in NEWS2_RULES[field]:
+            if upper is None or value <= upper:
+                points.append(band_points)
+                break
+    return points
+
+
+def run_rules(rng, size: int, log) -> dict:
+    values = synthetic_values(rng, size, abnormal=0.1)
+    results = {}
+    assert (early_warning.points(values) == np.array([naive_points(row) for row in values.tolist()])).all()
+
+    summary = time_calls(lambda: early_warning.points(values), min_calls=10)
+    summary['per_reading_ns'] = round(summary['mean_us'] * 1000 / size, 1)
+    results['compiled_points'] = summary
+    rows = values.tolist()
+    summary = time_calls(lambda: [naive_points(row) for row in rows], min_calls=3)
+    summary['per_reading_ns'] = round(summary['mean_us'] * 1000 / size, 1)
+    results['python_points'] = summary
+
+    points = early_warning.points(values).tolist()
+    start = datetime.utcnow()
+    timestamps = [start + timedelta(seconds=index) for index in range(size)]
+
+    def fold_all():
+        states = [{} for _ in range(100)]
+        for index, (row, row_points) in enumerate(zip(rows, points)):
+            early_warning.fold(states[index % 100], timestamps[index], row, row_points)
+    summary = time_calls(fold_all, min_calls=3)
+    summary['per_reading_ns'] = round(summary['mean_us'] * 1000 / size, 1)
+    results['state_fold'] = summary
+
+    for name, summary in results.items():
+        log(f"  {name:<16} {summary['per_reading_ns']:>8} ns/leitura  ({size} leituras: {summary['mean_us'] / 1000:.1f} ms)")
+    return results
+
+
+def run_ingest(db_path: str, enabled: bool, batches: int, batch_size: int, abnormal: float, seed: int) -> dict:
+    early_warning_module.ENABLED = enabled
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}'})
+    with app.app_context():
+        patient_ids = np.array([patient_id for (patient_id,) in db.session.query(Patient.id)])
+        db.session.remove()
+
+    rng = np.random.default_rng(seed)
+    client = app.test_client()
+    # Leituras do lote no passado recente; as individuais (carimbadas pelo servidor) vêm depois
+    start = datetime.utcnow() - timedelta(seconds=(batches + 1) * batch_size)
+    batch_latencies, inserted = [], 0
+    for batch in range(batches + 1):
+        values = synthetic_values(rng, batch_size, abnormal)
+        chosen = rng.choice(patient_ids, batch_size)
+        readings = [
+            {'patient_id': int(patient_id), 'timestamp': (start + timedelta(seconds=batch * batch_size + index)).isoformat(),
+             **dict(zip(early_warning.fields, row))}
+            for index, (patient_id, row) in enumerate(zip(chosen.tolist(), values.tolist()))
+        ]
+        body = json.dumps(readings)
+        started = time.perf_counter()
+        response = client.post('/api/vital-signs/bulk', data=body, content_type='application/json')
+        elapsed = time.perf_counter() - started
+        assert response.status_code == 201, response.data
+        if batch:  # o primeiro lote é aquecimento
+            batch_latencies.append(elapsed)
+            inserted += batch_size
+
+    result = {'rows_per_s': round(inserted / sum(batch_latencies), 1), 'batch': summarize(batch_latencies)}
+    if enabled:
+        result['alert_delay'] = measure_alert_delay(client, patient_ids[:50].tolist())
+    with app.app_context():
+        result['alerts'] = db.session.query(EarlyWarningAlert).count()
+        db.session.remove()
+    storage.dispose(app, db)
+    return result
+
+
+def measure_alert_delay(client, patient_ids: list) -> dict:
+    """
+    Atraso entre o início de POST /patients/<id>/vital-signs com uma leitura em piora e a chegada
+    do evento 'early_warning' a um assinante do paciente (mesmo caminho do SSE).
+    """
+    normal = {'heart_rate': 78, 'respiratory_rate': 16, 'oxygen_saturation': 97,
+              'blood_pressure_systolic': 122, 'temperature': 36.9}
+    worse = {'heart_rate': 128, 'respiratory_rate': 26, 'oxygen_saturation': 90,
+             'blood_pressure_systolic': 92, 'temperature': 38.8}
+    delays = []
+    for patient_id in patient_ids:
+        client.post(f'/api/patients/{patient_id}/vital-signs', json=normal)
+        subscription = event_broker.subscribe([patient_topic(patient_id)])
+        try:
+            started = time.perf_counter()
+            client.post(f'/api/patients/{patient_id}/vital-signs', json=worse)
+            while True:
+                message = subscription.queue.get(timeout=5)
+                if 'event: early_warning' in message:
+                    delays.append(time.perf_counter() - started)
+                    break
+        finally:
+            event_broker.unsubscribe(subscription)
+    return summarize(delays)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--patients', type=int, default=500)
+    parser.add_argument('--batches', type=int, default=20)
+    parser.add_argument('--batch-size', type=int, default=5000, help='Leituras por requisição de ingestão.')
+    parser.add_argument('--abnormal', type=float, default=0.02, help='Fração de leituras de pacientes em piora.')
+    parser.add_argument('--rule-readings', type=int, default=100000)
+    parser.add_argument('--output', help='Grava os resultados em JSON.')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    results = {}
+    print(f"Regras NEWS2 ({args.rule_readings} leituras):")
+    results['rules'] = run_rules(rng, args.rule_readings, print)
+
+    with tempfile.TemporaryDirectory(prefix='holdmed-early-warning-') as directory:
+        template = os.path.join(directory, 'template.db')
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{template}'})
+        with app.app_context():
+            seed_hospital(patients=args.patients, vitals_per_patient=10, labs_per_patient=1, notes_per_patient=0,
+                          log=lambda *a: None)
+        storage.dispose(app, db)
+
+        print(f"\nIngestão: {args.batches} lotes de {args.batch_size} leituras, {args.patients} pacientes, "
+              f"{args.abnormal:.0%} das leituras em piora")
+        results['ingest'] = {}
+        for mode, enabled in (('off', False), ('on', True)):
+            db_path = os.path.join(directory, f'{mode}.db')
+            shutil.copyfile(template, db_path)
+            summary = results['ingest'][mode] = run_ingest(
+                db_path, enabled, args.batches, args.batch_size, args.abnormal, seed=7
+            )
+            line = (f"  NEWS2 {mode:<4} {summary['rows_per_s']:>9} linhas/s  lote p50 {summary['batch']['p50_us'] / 1000:.1f} ms"
+                    f"  p95 {summary['batch']['p95_us'] / 1000:.1f} ms  alertas {summary['alerts']}")
+            if 'alert_delay' in summary:
+                line += (f"\n  {'':<10} leitura individual até o alerta (SSE): p50 {summary['alert_delay']['p50_us'] / 1000:.1f} ms"
+                         f"  p95 {summary['alert_delay']['p95_us'] / 1000:.1f} ms")
+            print(line)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
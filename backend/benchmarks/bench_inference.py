@@ -0,0 +1,77 @@
+"""
+Benchmark de inferência do modelo de complicações: predict_proba do scikit-learn x floresta compilada.
+
+Treina uma Random Forest com dados simulados, confere que as probabilidades das duas
+implementações coincidem e mede a latência por predição, em microssegundos, em chamadas
+de uma amostra e em lotes.
+
+Uso (a partir de backend/):
+    python benchmarks/bench_inference.py --trees 100 --features 4 --batch 1000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from compiled_forest import CompiledForest  # noqa: E402
+
+
+def measure(function, repeat: int) -> float:
+    """
+    Melhor tempo médio por chamada (segundos) em 3 rodadas de repeat chamadas.
+    """
+    best = float('inf')
+    for _ in range(3):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            function()
+        best = min(best, (time.perf_counter() - started) / repeat)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--trees', type=int, default=100)
+    parser.add_argument('--features', type=int, default=4)
+    parser.add_argument('--samples', type=int, default=5000, help='Amostras de treinamento.')
+    parser.add_argument('--batch', type=int, default=1000, help='Tamanho do lote medido.')
+    parser.add_argument('--repeat', type=int, default=200, help='Chamadas por rodada na medição de uma amostra.')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    X = rng.normal(size=(args.samples, args.features))
+    y = (X[:, 0] + 0.5 * X[:, 1] + rng.normal(scale=0.5, size=args.samples) > 0).astype(int)
+    forest = RandomForestClassifier(n_estimators=args.trees, random_state=42).fit(X, y)
+
+    started = time.perf_counter()
+    compiled = CompiledForest(forest)
+    compile_ms = (time.perf_counter() - started) * 1000
+
+    X_batch = rng.normal(size=(args.batch, args.features))
+    difference = np.abs(compiled.predict_proba(X_batch) - forest.predict_proba(X_batch)).max()
+    print(f"Árvores: {args.trees}  nós: {len(compiled.feature)}  profundidade máx.: {compiled.max_depth}  "
+          f"compilação: {compile_ms:.1f} ms")
+    print(f"Maior diferença entre as probabilidades: {difference:.2e}")
+    assert difference < 1e-9, 'Probabilidades divergentes'
+
+    row = X_batch[:1]
+    batch_repeat = max(1, args.repeat // 20)
+    results = {
+        'sklearn, 1 amostra': measure(lambda: forest.predict_proba(row), args.repeat),
+        'compilada, 1 amostra': measure(lambda: compiled.predict_proba(row[0]), args.repeat),
+        f'sklearn, lote de {args.batch}': measure(lambda: forest.predict_proba(X_batch), batch_repeat) / args.batch,
+        f'compilada, lote de {args.batch}': measure(lambda: compiled.predict_proba(X_batch), batch_repeat) / args.batch,
+    }
+
+    print(f"\n{'Implementação':<32}{'µs por predição':>18}")
+    for name, seconds in results.items():
+        print(f"{name:<32}{seconds * 1e6:>18.1f}")
+
+
+if __name__ == '__main__':
+    main()
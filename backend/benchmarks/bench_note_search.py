@@ -0,0 +1,209 @@
+"""
+Benchmark da busca nas notas clínicas (GET /api/notes/search).
+
+Gera notas sintéticas variadas (frases combinadas, com termos raros e comuns), grava extrações
+sintéticas no índice invertido e mede cada tipo de busca pela rota, comparando com a varredura
+LIKE da tabela inteira que a busca substitui. Também reporta o custo de indexação na inserção.
+
+Uso (a partir de backend/):
+    python benchmarks/bench_note_search.py --notes 1000000
+    python benchmarks/bench_note_search.py --db /tmp/holdmed-notes.db   # reaproveita o banco gerado
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCHMARKS_DIR), 'src'))
+
+os.environ.setdefault('HOLDMED_JOB_WORKERS', '0')
+os.environ.setdefault('HOLDMED_MODEL_REGISTRY', os.path.join(tempfile.gettempdir(), 'holdmed-bench-registry'))
+os.environ.setdefault('HOLDMED_WARMUP', 'lazy')
+os.environ.setdefault('HOLDMED_RISK_SWEEP_SECONDS', '0')
+
+from sqlalchemy import insert, select, text  # noqa: E402
+
+from bench_api import time_calls  # noqa: E402
+from main import create_app  # noqa: E402
+from models.patient import ClinicalNoteExtraction, ClinicalNotes, Patient, db  # noqa: E402
+from note_search import note_search  # noqa: E402
+
+# Linhas por INSERT em lote
+INSERT_CHUNK_SIZE = 10000
+
+SENTENCES = [
+    'Paciente evolui bem no pós-operatório, sem queixas.',
+    'Ferida operatória limpa e seca, sem sinais flogísticos.',
+    'Apresentou febre de {temp} durante a madrugada.',
+    'Refere dor abdominal {intensity}, controlada com analgesia.',
+    'Solicitados exames para investigar infecção de sítio cirúrgico.',
+    'Taquicardia com frequência de {hr} bpm e queda de saturação.',
+    'Iniciada antibioticoterapia empírica após coleta de hemoculturas.',
+    'Aceitando dieta oral, deambulando com auxílio.',
+    'Diurese presente, sem alterações de coloração.',
+    'Programada alta hospitalar para amanhã, orientações fornecidas.',
+    'Curativo trocado, secreção serosa em pequena quantidade.',
+    'Sinais vitais estáveis, mantida a conduta.',
+]
+INTENSITIES = ['leve', 'moderada', 'intensa']
+
+# Termos raros (uma nota em ~1000) e as entidades reconhecidas nas notas sintéticas
+RARE_SENTENCES = [
+    'Suspeita de endocardite, solicitado ecocardiograma.',
+    'Quadro compatível com pneumonia hospitalar, ajustado antibiótico.',
+    'Evento de tromboembolismo pulmonar descartado por angiotomografia.',
+]
+ENTITIES = ['febre', 'infecção', 'taquicardia', 'endocardite', 'pneumonia', 'tromboembolismo pulmonar']
+_WORDS = re.compile(r'[^\W\d_]{4,}')
+
+QUERIES = {
+    'fts_rare': {'q': 'endocardite'},
+    'fts_common': {'q': 'febre'},
+    'fts_common_recent': {'q': 'febre', 'sort': 'recent'},
+    'fts_two_terms': {'q': 'febre infeccao'},
+    'fts_phrase': {'q': '"dor abdominal intensa"'},
+    'fts_prefix': {'q': 'antibiotico*'},
+    'fts_patient': {'q': 'febre', 'patient_id': None},
+    'fts_period': {'q': 'pneumonia', 'since': None},
+    'entity_rare': {'entity': 'pneumonia'},
+    'entity_and_fts': {'entity': 'infecção', 'q': 'hemoculturas'},
+}
+
+
+def synthetic_notes(rng, patient_ids, count: int, start: datetime):
+    """
+    Notas (dicionários para INSERT) com 2 a 5 frases; ~0,1% recebem um termo raro.
+    """
+    for index in range(count):
+        parts = [
+            SENTENCES[sentence].format(temp=round(float(rng.normal(38.3, 0.4)), 1),
+                                       intensity=INTENSITIES[int(rng.integers(3))], hr=int(rng.integers(95, 140)))
+            for sentence in rng.choice(len(SENTENCES), int(rng.integers(2, 6)), replace=False)
+        ]
+        if rng.random() < 0.001:
+            parts.insert(int(rng.integers(len(parts) + 1)), RARE_SENTENCES[int(rng.integers(len(RARE_SENTENCES)))])
+        yield {
+            'patient_id': int(patient_ids[index % len(patient_ids)]),
+            'timestamp': start + timedelta(minutes=index),
+            'note_type': 'evolução',
+            'content': ' '.join(parts),
+            'author': 'Equipe de enfermagem',
+        }
+
+
+def synthetic_extraction(content: str) -> dict:
+    # Aproxima nlp_service._extract sem o spaCy: palavras como keywords, termos conhecidos como entidades
+    lowered = content.lower()
+    entities = [[entity, 'MISC'] for entity in ENTITIES if entity in lowered]
+    return {
+        'extracted_entities': entities,
+        'keywords': sorted(set(_WORDS.findall(content))),
+        'medical_terms': [entity for entity, _ in entities],
+    }
+
+
+def populate(patients: int, notes: int, log) -> dict:
+    rng = np.random.default_rng(42)
+    timings = {}
+    db.session.execute(insert(Patient), [
+        {'name': f'Paciente {index:06d}', 'age': 50, 'gender': 'F', 'surgery_type': 'Apendicectomia',
+         'surgery_date': datetime(2024, 1, 1)}
+        for index in range(patients)
+    ])
+    db.session.commit()
+    patient_ids = [patient_id for (patient_id,) in db.session.query(Patient.id).order_by(Patient.id)]
+    start = datetime(2024, 1, 1)
+
+    inserted = 0
+    insert_seconds = index_seconds = 0.0
+    generator = synthetic_notes(rng, patient_ids, notes, start)
+    while inserted < notes:
+        chunk = [note for _, note in zip(range(INSERT_CHUNK_SIZE), generator)]
+        started = time.perf_counter()
+        first_id = (db.session.execute(select(db.func.max(ClinicalNotes.id))).scalar() or 0) + 1
+        # Os gatilhos alimentam o índice FTS5 na mesma transação
+        db.session.execute(insert(ClinicalNotes), chunk)
+        db.session.commit()
+        insert_seconds += time.perf_counter() - started
+
+        started = time.perf_counter()
+        extractions = [(first_id + offset, synthetic_extraction(note['content'])) for offset, note in enumerate(chunk)]
+        db.session.execute(insert(ClinicalNoteExtraction), [
+            {'note_id': note_id, 'content_hash': ClinicalNoteExtraction.hash_content(note['content']), **result}
+            for (note_id, result), note in zip(extractions, chunk)
+        ])
+        note_search.index_extractions(extractions)
+        db.session.commit()
+        index_seconds += time.perf_counter() - started
+        inserted += len(chunk)
+        if inserted % (INSERT_CHUNK_SIZE * 20) == 0:
+            log(f"  {inserted} notas")
+
+    timings['notes_per_s'] = round(notes / insert_seconds, 1)
+    timings['extractions_per_s'] = round(notes / index_seconds, 1)
+    log(f"  inserção com índice FTS5: {timings['notes_per_s']} notas/s; "
+        f"extrações com índice invertido: {timings['extractions_per_s']} notas/s")
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--notes', type=int, default=200000)
+    parser.add_argument('--patients', type=int, default=5000)
+    parser.add_argument('--db', help='Banco SQLite a usar; se já tiver notas, não gera novas.')
+    parser.add_argument('--output', help='Grava os resultados em JSON.')
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix='holdmed-notes-'), 'notes.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}'})
+    results = {'db': db_path}
+    with app.app_context():
+        total = db.session.query(ClinicalNotes).count()
+        if total == 0:
+            print(f"Gerando {args.notes} notas para {args.patients} pacientes em {db_path}")
+            results['populate'] = populate(args.patients, args.notes, print)
+            total = args.notes
+        patient_id = db.session.execute(select(ClinicalNotes.patient_id).limit(1)).scalar()
+        middle = db.session.execute(
+            select(ClinicalNotes.timestamp).order_by(ClinicalNotes.id.desc()).offset(total // 2).limit(1)
+        ).scalar()
+        db.session.remove()
+
+    QUERIES['fts_patient']['patient_id'] = patient_id
+    QUERIES['fts_period']['since'] = middle.isoformat()
+
+    client = app.test_client()
+    print(f"\nBuscas em {total} notas (p50 / p95, pela rota):")
+    results['notes'] = total
+    results['queries'] = {}
+    for name, params in QUERIES.items():
+        response = client.get('/api/notes/search', query_string={**params, 'count': 1})
+        assert response.status_code == 200, response.data
+        matches = int(response.headers['X-Total-Count'])
+        summary = time_calls(lambda: client.get('/api/notes/search', query_string=params), min_calls=20)
+        summary['matches'] = matches
+        results['queries'][name] = summary
+        print(f"  {name:<18} {summary['p50_us'] / 1000:>8.2f} ms  {summary['p95_us'] / 1000:>8.2f} ms  ({matches} notas)")
+
+    # Referência: sem índice, encontrar as notas que mencionam um termo exige ler a tabela inteira
+    with app.app_context():
+        statement = text("SELECT id, patient_id FROM clinical_notes WHERE content LIKE '%endocardite%'")
+        summary = time_calls(lambda: db.session.execute(statement).all(), min_calls=3)
+        db.session.remove()
+    results['like_scan'] = summary
+    print(f"  {'like_scan (SQL)':<18} {summary['p50_us'] / 1000:>8.2f} ms  {summary['p95_us'] / 1000:>8.2f} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""
+Benchmark da inicialização a frio: tempo de importação por pacote e linha do tempo até a
+primeira resposta de cada tipo de rota, em um interpretador novo por modo de aquecimento.
+
+1. Importação: roda "import main" com python -X importtime e soma o tempo próprio (self) de
+   cada módulo por pacote de topo (sklearn, spacy, flask...). Repete importando também o que o
+   aquecimento carrega (modelo de IA e spaCy), para mostrar o que deixou de pesar no "import main".
+2. Linha do tempo, para cada modo de HOLDMED_WARMUP (background, lazy, eager): import main,
+   create_app, primeira GET /api/users (rota só de banco), prontidão em /api/health/ready e
+   primeira POST /api/ai-prediction.
+
+O registro de modelos é temporário e o modelo inicial é treinado antes das medições.
+
+Uso (a partir de backend/):
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --modes lazy,background --top 20 --output /tmp/startup.json
+"""
+import time
+
+PROCESS_STARTED = time.perf_counter()
+
+import argparse  # noqa: E402
+import json  # noqa: E402
+import os  # noqa: E402
+import subprocess  # noqa: E402
+import sys  # noqa: E402
+import tempfile  # noqa: E402
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCHMARKS_DIR), 'src')
+sys.path.insert(0, SRC_DIR)
+
+MODES = ('background', 'lazy', 'eager')
+
+# Paciente das predições, com as features do modelo simulado inicial
+PATIENT_DATA = {
+    'sinais_vitais_pressao': 130.0,
+    'sinais_vitais_temperatura': 38.5,
+    'exames_laboratoriais_glicose': 150.0,
+    'idade': 65,
+}
+
+WARMUP_SNIPPET = (
+    "import main\n"
+    "from warmup import warmup\n"
+    "warmup.run()\n"
+)
+
+
+def import_times(code: str, env: dict) -> dict:
+    """
+    Executa code em um interpretador novo com -X importtime e soma o tempo próprio (µs) dos
+    módulos por pacote de topo.
+    """
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=SRC_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    ).stderr
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        if not self_us.strip().isdigit():
+            continue  # cabeçalho
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0) + int(self_us)
+    return dict(sorted(packages.items(), key=lambda item: item[1], reverse=True))
+
+
+def run_mode(db_path: str) -> dict:
+    """
+    Executado em um processo novo por modo: linha do tempo desde o início do interpretador.
+    """
+    timeline = {}
+
+    def mark(name):
+        timeline[name] = round(time.perf_counter() - PROCESS_STARTED, 3)
+
+    from main import create_app
+    mark('import_main_s')
+    imported = {package: package in sys.modules for package in ('sklearn', 'pandas', 'spacy', 'joblib')}
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}'})
+    mark('create_app_s')
+    client = app.test_client()
+
+    response = client.get('/api/users')
+    assert response.status_code == 200, response.data
+    mark('first_users_s')
+
+    deadline = time.perf_counter() + 300
+    while client.get('/api/health/ready').status_code == 503 and time.perf_counter() < deadline:
+        time.sleep(0.02)
+    mark('ready_s')
+
+    response = client.post('/api/ai-prediction', json={'patient_data': PATIENT_DATA})
+    assert response.status_code == 200, response.data
+    mark('first_prediction_s')
+
+    status = client.get('/api/health/ready').get_json()
+    return {
+        'timeline': timeline,
+        'imported_after_import_main': imported,
+        'warmup': {name: component['seconds'] for name, component in status['components'].items()},
+        'warmup_errors': {name: component['error'] for name, component in status['components'].items()
+                          if component['error']},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--top', type=int, default=15, help='Pacotes listados na importação.')
+    parser.add_argument('--output', help='Grava os resultados em JSON.')
+    parser.add_argument('--run-mode', help=argparse.SUPPRESS)
+    parser.add_argument('--db', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_mode:
+        print(json.dumps(run_mode(args.db)))
+        return
+
+    modes = args.modes.split(',')
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        parser.error(f"Modos desconhecidos: {', '.join(unknown)}")
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='holdmed-startup-') as directory:
+        env = {
+            **os.environ,
+            'HOLDMED_JOB_WORKERS': '0',
+            'HOLDMED_MODEL_REGISTRY': os.path.join(directory, 'registry'),
+            'PYTHONPATH': os.pathsep.join(filter(None, [SRC_DIR, os.environ.get('PYTHONPATH')])),
+        }
+        # Modelo inicial treinado fora das medições
+        subprocess.run(
+            [sys.executable, '-c', 'from model_registry import model_registry; model_registry.get_agent()'],
+            cwd=SRC_DIR, env=env, check=True, stdout=subprocess.DEVNULL
+        )
+
+        lazy_env = {**env, 'HOLDMED_WARMUP': 'lazy'}
+        cold = import_times('import main', lazy_env)
+        warm = import_times(WARMUP_SNIPPET, lazy_env)
+        results['import_us'] = {'import_main': cold, 'after_warmup': warm}
+
+        print(f"Importação de main: {sum(cold.values()) / 1e6:.2f}s "
+              f"(com o aquecimento: {sum(warm.values()) / 1e6:.2f}s)")
+        print(f"  {'pacote':<24} {'import main':>12} {'+ aquecimento':>14}")
+        for package in sorted(warm, key=warm.get, reverse=True)[:args.top]:
+            cold_ms = f"{cold[package] / 1000:.1f} ms" if package in cold else 'adiado'
+            print(f"  {package:<24} {cold_ms:>12} {warm[package] / 1000:>11.1f} ms")
+
+        results['modes'] = {}
+        for mode in modes:
+            db_path = os.path.join(directory, f'{mode}.db')
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--run-mode', mode, '--db', db_path],
+                env={**env, 'HOLDMED_WARMUP': mode}, check=True, stdout=subprocess.PIPE, text=True
+            ).stdout
+            result = results['modes'][mode] = json.loads(output.strip().splitlines()[-1])
+
+            timeline = result['timeline']
+            print(f"\nModo {mode} (segundos desde o início do processo):")
+            print(f"  import main {timeline['import_main_s']:.2f}  create_app {timeline['create_app_s']:.2f}  "
+                  f"1ª /api/users {timeline['first_users_s']:.2f}  pronto {timeline['ready_s']:.2f}  "
+                  f"1ª predição {timeline['first_prediction_s']:.2f}")
+            print(f"  aquecimento: {result['warmup']}  importados no import main: "
+                  f"{[name for name, loaded in result['imported_after_import_main'].items() if loaded]}")
+            if result['warmup_errors']:
+                print(f"  falhas: {result['warmup_errors']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
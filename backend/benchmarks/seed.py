@@ -0,0 +1,132 @@
+"""
+Gera um hospital sintético (pacientes, sinais vitais, exames e notas clínicas) no banco da aplicação.
+
+As leituras são inseridas diretamente com INSERT em lote e as tabelas derivadas (snapshot das
+leituras mais recentes, séries temporais e features) são reconstruídas no final, como na
+inicialização de um banco pré-existente.
+"""
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import insert
+
+from features import feature_store
+from models.patient import Patient, VitalSigns, LabResults, ClinicalNotes, PatientLatest, db
+from timeseries import series_store
+
+# Linhas por INSERT em lote
+INSERT_CHUNK_SIZE = 20000
+
+SURGERY_TYPES = ['Apendicectomia', 'Colecistectomia', 'Artroplastia de quadril', 'Revascularização do miocárdio',
+                 'Herniorrafia', 'Gastrectomia', 'Histerectomia', 'Laminectomia']
+
+NOTE_TEMPLATES = [
+    'Paciente evolui bem no pós-operatório, sem queixas. Ferida operatória limpa e seca.',
+    'Paciente apresentou febre de 38.5 e dor abdominal intensa. Solicitados exames para investigar infecção.',
+    'Refere dor moderada no local da incisão, controlada com analgesia. Sinais vitais estáveis.',
+    'Taquicardia e queda de saturação durante a madrugada. Iniciada oxigenoterapia e hemoculturas.',
+    'Paciente deambulando, aceitando dieta oral. Programada alta para amanhã.',
+]
+
+
+def _insert_chunks(model, rows):
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        db.session.execute(insert(model), rows[start:start + INSERT_CHUNK_SIZE])
+    db.session.commit()
+
+
+def seed_hospital(patients: int = 1000, vitals_per_patient: int = 1000, labs_per_patient: int = 20,
+                  notes_per_patient: int = 3, vitals_interval: timedelta = timedelta(minutes=5),
+                  seed: int = 42, log=print) -> dict:
+    """
+    Popula o banco da aplicação atual (dentro de um app_context) e retorna os tempos de cada etapa.
+    """
+    rng = np.random.default_rng(seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    timings = {}
+
+    started = time.perf_counter()
+    span = vitals_interval * vitals_per_patient
+    surgery_offsets = rng.uniform(0, 48, patients)
+    db.session.execute(insert(Patient), [
+        {
+            'name': f'Paciente {index:06d}',
+            'age': int(rng.integers(18, 95)),
+            'gender': str(rng.choice(['M', 'F'])),
+            'surgery_type': str(rng.choice(SURGERY_TYPES)),
+            'surgery_date': now - span - timedelta(hours=float(surgery_offsets[index])),
+        }
+        for index in range(patients)
+    ])
+    db.session.commit()
+    patient_ids = [patient_id for (patient_id,) in db.session.query(Patient.id).order_by(Patient.id)]
+    timings['patients'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    offsets = [vitals_interval * step for step in range(vitals_per_patient)]
+    start_time = now - span
+    for patient_id in patient_ids:
+        # Pacientes com pior evolução têm uma tendência de alta na temperatura e na frequência cardíaca
+        trend = np.linspace(0, rng.uniform(-0.5, 2.0), vitals_per_patient)
+        systolic = rng.normal(120, 12, vitals_per_patient)
+        diastolic = rng.normal(78, 8, vitals_per_patient)
+        heart_rate = rng.normal(80, 10, vitals_per_patient) + trend * 10
+        temperature = rng.normal(36.8, 0.3, vitals_per_patient) + trend
+        saturation = np.clip(rng.normal(97, 1.5, vitals_per_patient) - trend, 80, 100)
+        respiratory = rng.normal(16, 2, vitals_per_patient) + trend * 2
+        _insert_chunks(VitalSigns, [
+            {
+                'patient_id': patient_id,
+                'timestamp': start_time + offsets[step],
+                'blood_pressure_systolic': round(float(systolic[step]), 1),
+                'blood_pressure_diastolic': round(float(diastolic[step]), 1),
+                'heart_rate': int(heart_rate[step]),
+                'temperature': round(float(temperature[step]), 1),
+                'oxygen_saturation': round(float(saturation[step]), 1),
+                'respiratory_rate': int(respiratory[step]),
+            }
+            for step in range(vitals_per_patient)
+        ])
+    timings['vital_signs'] = time.perf_counter() - started
+    log(f"  {patients * vitals_per_patient} sinais vitais em {timings['vital_signs']:.1f}s")
+
+    started = time.perf_counter()
+    lab_step = span / max(labs_per_patient, 1)
+    _insert_chunks(LabResults, [
+        {
+            'patient_id': patient_id,
+            'timestamp': start_time + lab_step * step,
+            'glucose': round(float(rng.normal(105, 20)), 1),
+            'hemoglobin': round(float(rng.normal(13, 1.5)), 1),
+            'white_blood_cells': round(float(rng.normal(8, 2.5)), 1),
+            'creatinine': round(float(rng.normal(1.0, 0.3)), 2),
+            'sodium': round(float(rng.normal(140, 3)), 1),
+            'potassium': round(float(rng.normal(4.2, 0.4)), 1),
+        }
+        for patient_id in patient_ids
+        for step in range(labs_per_patient)
+    ])
+    note_step = span / max(notes_per_patient, 1)
+    _insert_chunks(ClinicalNotes, [
+        {
+            'patient_id': patient_id,
+            'timestamp': start_time + note_step * step,
+            'note_type': 'evolução',
+            'content': NOTE_TEMPLATES[int(rng.integers(len(NOTE_TEMPLATES)))],
+            'author': 'Equipe de enfermagem',
+        }
+        for patient_id in patient_ids
+        for step in range(notes_per_patient)
+    ])
+    timings['lab_results_and_notes'] = time.perf_counter() - started
+
+    # Tabelas derivadas, como na inicialização de um banco com leituras anteriores a elas
+    for name, rebuild in (('patient_latest', PatientLatest.rebuild), ('series', series_store.rebuild),
+                          ('features', feature_store.rebuild)):
+        started = time.perf_counter()
+        rebuild()
+        timings[f'rebuild_{name}'] = time.perf_counter() - started
+        log(f"  reconstrução de {name} em {timings[f'rebuild_{name}']:.1f}s")
+
+    return {name: round(seconds, 3) for name, seconds in timings.items()}
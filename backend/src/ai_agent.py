@@ -1,30 +1,44 @@
 
-import spacy
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score
-import pandas as pd
 import numpy as np
+import os
+from compiled_forest import CompiledForest
+from instrumentation import span
+from nlp_service import nlp_service
 
-# Carregar modelo de linguagem do spaCy para português
-try:
-    nlp = spacy.load("pt_core_news_sm")
-except OSError:
-    print("Baixando modelo pt_core_news_sm do spaCy...")
-    spacy.cli.download("pt_core_news_sm")
-    nlp = spacy.load("pt_core_news_sm")
+# Inferência: 'compiled' percorre a floresta exportada para arrays NumPy; 'sklearn' usa predict_proba
+INFERENCE_MODE = os.environ.get('HOLDMED_INFERENCE', 'compiled')
+
+# Acima deste número de amostras o predict_proba do scikit-learn é mais rápido que a floresta compilada
+COMPILED_MAX_BATCH = 64
 
 class AIAgent:
     def __init__(self):
         self.model = None
         self.features = []
+        self.compiled = None
 
-    def train_model(self, data: pd.DataFrame, target_column: str):
+    def compile(self):
+        """
+        Exporta a floresta treinada para arrays planos (CompiledForest), usados por predict_batch.
+        Sem efeito com HOLDMED_INFERENCE=sklearn.
+        """
+        if self.model is None:
+            raise ValueError("Modelo de IA não treinado. Por favor, treine o modelo primeiro.")
+        self.compiled = CompiledForest(self.model) if INFERENCE_MODE == 'compiled' else None
+        return self.compiled
+
+    def train_model(self, data, target_column: str):
         """
         Treina um modelo de classificação para prever complicações.
         data: DataFrame com dados clínicos e laboratoriais.
         target_column: Nome da coluna que indica a complicação (0 para não, 1 para sim).
+        Retorna a acurácia no conjunto de teste.
         """
+        # scikit-learn só é importado ao treinar (ver warmup.py)
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.metrics import accuracy_score
+        from sklearn.model_selection import train_test_split
+
         # Exemplo simplificado de seleção de features e treinamento
         # Em um cenário real, a seleção de features seria mais complexa e baseada em dados reais.
         self.features = [col for col in data.columns if col != target_column]
@@ -37,55 +51,72 @@ class AIAgent:
 
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
+        # Treina sobre arrays NumPy: a inferência recebe matrizes na ordem de self.features
         self.model = RandomForestClassifier(n_estimators=100, random_state=42)
-        self.model.fit(X_train, y_train)
+        with span('model.train'):
+            self.model.fit(X_train.to_numpy(), y_train.to_numpy())
+            self.compile()
 
-        predictions = self.model.predict(X_test)
+        predictions = self.model.predict(X_test.to_numpy())
         accuracy = accuracy_score(y_test, predictions)
         print(f"Modelo treinado com acurácia: {accuracy:.2f}")
+        return accuracy
 
-    def predict_complication(self, patient_data: dict) -> dict:
+    def features_matrix(self, records: list) -> np.ndarray:
         """
-        Prevê a probabilidade de complicação para um dado paciente.
-        patient_data: Dicionário com os dados do paciente.
+        Converte uma lista de dicionários de pacientes em uma matriz NumPy na ordem de self.features.
+        Features ausentes são preenchidas com NaN.
+        """
+        return np.array(
+            [[record.get(feature, np.nan) for feature in self.features] for record in records],
+            dtype=np.float64
+        ).reshape(len(records), len(self.features))
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """
+        Probabilidades de cada classe (colunas na ordem de self.model.classes_) com uma única
+        chamada para todos os pacientes.
+        X: matriz (n_pacientes, n_features) com colunas na ordem de self.features.
         """
         if self.model is None:
             raise ValueError("Modelo de IA não treinado. Por favor, treine o modelo primeiro.")
 
-        # Converter dados do paciente para DataFrame no formato esperado pelo modelo
-        patient_df = pd.DataFrame([patient_data])
-        
-        # Garantir que todas as features usadas no treinamento estão presentes, preenchendo com NaN se necessário
-        for feature in self.features:
-            if feature not in patient_df.columns:
-                patient_df[feature] = np.nan
-        
-        # Reordenar colunas para corresponder à ordem de treinamento
-        patient_df = patient_df[self.features]
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        model = self.compiled if self.compiled is not None and len(X) <= COMPILED_MAX_BATCH else self.model
+        with span('model.predict_proba'):
+            return model.predict_proba(X)
 
-        prediction = self.model.predict(patient_df)[0]
-        probability = self.model.predict_proba(patient_df)[0].tolist()
+    def predict_batch(self, X: np.ndarray) -> list:
+        """
+        Prevê complicações para vários pacientes com uma única chamada a predict_proba.
+        X: matriz (n_pacientes, n_features) com colunas na ordem de self.features.
+        """
+        # A classe prevista é derivada das probabilidades, evitando percorrer a floresta duas vezes
+        probabilities = self.predict_proba(X)
+        predictions = self.model.classes_[probabilities.argmax(axis=1)]
 
-        return {"complication_predicted": bool(prediction), "probabilities": probability}
+        return [
+            {"complication_predicted": bool(prediction), "probabilities": row.tolist()}
+            for prediction, row in zip(predictions, probabilities)
+        ]
+
+    def predict_complication(self, patient_data: dict) -> dict:
+        """
+        Prevê a probabilidade de complicação para um dado paciente.
+        patient_data: Dicionário com os dados do paciente.
+        """
+        return self.predict_batch(self.features_matrix([patient_data]))[0]
 
     def process_clinical_notes(self, notes: str) -> dict:
         """
         Processa notas clínicas usando NLP para extrair informações relevantes.
         notes: Texto das notas clínicas.
         """
-        doc = nlp(notes)
-        entities = [(ent.text, ent.label_) for ent in doc.ents]
-        keywords = [token.text for token in doc if not token.is_stop and not token.is_punct and token.is_alpha]
-
-        # Exemplo de extração de termos médicos ou condições
-        medical_terms = [token.text for token in doc if token.ent_type_ == "DISEASE" or token.ent_type_ == "SYMPTOM"]
-
-        return {
-            "original_notes": notes,
-            "extracted_entities": entities,
-            "keywords": list(set(keywords)),
-            "medical_terms": list(set(medical_terms))
-        }
+        # O pipeline spaCy é compartilhado por todas as instâncias (ver nlp_service)
+        return {"original_notes": notes, **nlp_service.process_note(notes)}
 
     def generate_dashboard_insights(self, prediction_result: dict, processed_notes: dict) -> str:
         """
@@ -109,6 +140,8 @@ class AIAgent:
 
 # Exemplo de uso (para demonstração e teste)
 if __name__ == "__main__":
+    import pandas as pd
+
     agent = AIAgent()
 
     # Dados de exemplo para treinamento (em um cenário real, seriam dados de pacientes)
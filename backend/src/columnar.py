@@ -0,0 +1,421 @@
+"""
+Importação e exportação em lote de pacientes e leituras em formato colunar (Parquet ou Arrow IPC).
+
+A exportação lê a tabela em blocos (yield_per) e grava cada bloco como um RecordBatch (um row group
+no Parquet), então a memória não cresce com o número de linhas; o arquivo é lido direto pelo
+pandas (pd.read_parquet ou pyarrow.ipc.open_stream(...).read_pandas()), sem passar por JSON.
+
+A importação lê o arquivo em blocos de IMPORT_BATCH_SIZE linhas, converte as colunas para os tipos
+da tabela e insere cada bloco com um INSERT em lote, em uma transação por bloco. Os estados derivados
+(snapshot das leituras mais recentes, séries temporais, features e o índice de texto das notas) são
+atualizados na mesma transação, como em POST /vital-signs/bulk. Dados históricos não geram alertas
+NEWS2 nem eventos para os painéis: o estado de alerta precoce dos pacientes afetados é reconstruído
+no fim. As colunas id são preservadas quando presentes, para que um banco exportado possa ser
+reimportado com as mesmas referências entre pacientes e leituras; ids anteriores aos já compactados
+nas séries temporais fazem as séries desses pacientes serem reconstruídas no fim.
+
+pyarrow é opcional: sem ele, importação e exportação levantam ColumnarUnavailable.
+"""
+import tempfile
+from datetime import datetime
+
+from sqlalchemy import func, insert, select, text
+
+from early_warning import early_warning
+from features import feature_store
+from models.patient import Patient, VitalSigns, LabResults, ClinicalNotes, PatientLatest, db
+from models.timeseries import SeriesHead
+import serialization
+from timeseries import series_store
+
+# Tabelas disponíveis, com os mesmos nomes das rotas de cada série
+TABLES = {
+    'patients': Patient,
+    'vital-signs': VitalSigns,
+    'lab-results': LabResults,
+    'clinical-notes': ClinicalNotes,
+}
+
+# Colunas obrigatórias na importação; linhas com valor ausente são rejeitadas
+REQUIRED_COLUMNS = {
+    Patient: ('name',),
+    VitalSigns: ('patient_id', 'timestamp'),
+    LabResults: ('patient_id', 'timestamp'),
+    ClinicalNotes: ('patient_id', 'timestamp'),
+}
+
+FORMATS = {
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+FILE_EXTENSIONS = {'parquet': '.parquet', 'arrow': '.arrows'}
+
+# Linhas por RecordBatch exportado (um row group no Parquet)
+EXPORT_BATCH_SIZE = 50000
+
+# Linhas inseridas por transação na importação
+IMPORT_BATCH_SIZE = 5000
+
+# Máximo de erros detalhados no resumo da importação (os demais são apenas contados)
+MAX_REPORTED_ERRORS = 1000
+
+# Pacientes por consulta ao validar referências e reconstruir o estado de alerta precoce
+PATIENT_BATCH_SIZE = 5000
+
+# Tamanho dos blocos copiados do corpo da requisição para o arquivo temporário
+COPY_BLOCK_SIZE = 1 << 20
+
+# Corpo até este tamanho fica em memória ao ser copiado; acima disso, vai para disco
+SPOOL_MAX_SIZE = 16 << 20
+
+
+class ColumnarUnavailable(RuntimeError):
+    pass
+
+
+def _require_pyarrow():
+    # Importado no primeiro uso, não na subida do servidor (main importa este módulo pelas rotas).
+    # pyarrow é opcional: sem ele, só a importação/exportação colunar fica indisponível
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ColumnarUnavailable('Importação/exportação colunar requer o pacote pyarrow (pip install pyarrow)')
+    return pa
+
+
+def format_for(name: str = None, mimetype: str = None) -> str:
+    """
+    Formato pelo nome ('parquet' ou 'arrow') ou pelo tipo de conteúdo; Parquet por padrão.
+    """
+    if name:
+        if name not in FORMATS:
+            raise ValueError(f'Formato desconhecido: {name} (use {" ou ".join(FORMATS)})')
+        return name
+    for format_name, format_mimetype in FORMATS.items():
+        if mimetype == format_mimetype:
+            return format_name
+    return 'parquet'
+
+
+def arrow_schema(model):
+    """
+    Esquema Arrow com as colunas da tabela, na ordem de declaração. Datas saem como timestamp sem
+    fuso (UTC, como gravadas no banco).
+    """
+    pa = _require_pyarrow()
+    types = {int: pa.int64(), float: pa.float64(), str: pa.string(), bool: pa.bool_(), datetime: pa.timestamp('us')}
+    return pa.schema([
+        pa.field(name, types[column.type.python_type], nullable=not column.primary_key)
+        for name, column in model.__table__.columns.items() if not column.info.get('derived')
+    ])
+
+
+class _BlockSink:
+    """
+    Saída de arquivo para os writers do pyarrow que acumula os bytes escritos até serem retirados
+    com take(), para enviar o arquivo em partes enquanto ele é gerado.
+    """
+
+    def __init__(self):
+        self.blocks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.blocks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def take(self) -> bytes:
+        data = b''.join(self.blocks)
+        self.blocks = []
+        return data
+
+
+def export_batches(model, patient_ids=None, since: datetime = None, until: datetime = None,
+                   batch_size: int = EXPORT_BATCH_SIZE):
+    """
+    RecordBatches da tabela em ordem de id, lidos do banco em blocos de batch_size linhas.
+    patient_ids, since e until filtram as leituras (since/until pelo timestamp).
+    """
+    pa = _require_pyarrow()
+    schema = arrow_schema(model)
+    statement = serialization.select_columns(model, schema.names).order_by(model.id)
+    if patient_ids:
+        column = model.id if model is Patient else model.patient_id
+        statement = statement.where(column.in_(patient_ids))
+    if model is not Patient:
+        if since is not None:
+            statement = statement.where(model.timestamp >= since)
+        if until is not None:
+            statement = statement.where(model.timestamp <= until)
+
+    result = db.session.execute(statement.execution_options(yield_per=batch_size))
+    for rows in result.partitions():
+        columns = zip(*rows)
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema
+        )
+
+
+def write_batches(batches, schema, format_name: str):
+    """
+    Gera o arquivo em partes (bytes), uma por RecordBatch: Parquet ou Arrow IPC em streaming.
+    """
+    pa = _require_pyarrow()
+    sink = _BlockSink()
+    if format_name == 'parquet':
+        writer = pa.parquet.ParquetWriter(sink, schema, compression='zstd')
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+    with writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            yield sink.take()
+    yield sink.take()
+
+
+def export_stream(model, format_name: str, **filters):
+    """
+    Exportação da tabela em partes, para uma resposta em streaming ou um arquivo.
+    """
+    return write_batches(export_batches(model, **filters), arrow_schema(model), format_name)
+
+
+def read_batches(source, format_name: str, batch_size: int = IMPORT_BATCH_SIZE):
+    """
+    RecordBatches de até batch_size linhas de um arquivo (caminho ou objeto de arquivo).
+    Parquet precisa de acesso aleatório (o índice fica no fim do arquivo); Arrow IPC é lido em sequência.
+    """
+    pa = _require_pyarrow()
+    try:
+        if format_name == 'parquet':
+            yield from pa.parquet.ParquetFile(source).iter_batches(batch_size=batch_size)
+            return
+        for batch in pa.ipc.open_stream(source):
+            for offset in range(0, batch.num_rows, batch_size):
+                yield batch.slice(offset, batch_size)
+    except (pa.ArrowInvalid, OSError) as e:
+        raise ValueError(f'Arquivo {format_name} inválido: {str(e)}')
+
+
+def spool(stream, format_name: str):
+    """
+    Cópia do corpo da requisição para um arquivo temporário (em blocos) quando o formato precisa
+    de acesso aleatório; Arrow IPC é lido direto do stream.
+    """
+    if format_name != 'parquet':
+        return stream
+    spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    while True:
+        block = stream.read(COPY_BLOCK_SIZE)
+        if not block:
+            break
+        spooled.write(block)
+    spooled.seek(0)
+    return spooled
+
+
+class ImportResult:
+    def __init__(self, table: str):
+        self.table = table
+        self.received = 0
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+        self.patient_ids = set()
+        self.explicit_ids = False
+
+    def error(self, index, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'index': index, 'error': message})
+
+    def to_dict(self) -> dict:
+        return {
+            'table': self.table,
+            'received': self.received,
+            'inserted': self.inserted,
+            'failed': self.failed,
+            'errors': self.errors,
+        }
+
+
+class ColumnarImporter:
+    """
+    Importação de uma tabela a partir de RecordBatches, bloco a bloco.
+    """
+
+    def __init__(self, table: str):
+        if table not in TABLES:
+            raise ValueError(f'Tabela desconhecida: {table} (use {", ".join(TABLES)})')
+        self.model = TABLES[table]
+        self.schema = arrow_schema(self.model)
+        self.required = REQUIRED_COLUMNS[self.model]
+        self.series = PatientLatest.SERIES.get(self.model)
+        self.result = ImportResult(table)
+        self.known_patients = set()
+        self.resealed_patients = set()
+
+    def _conform(self, batch):
+        """
+        Seleciona as colunas conhecidas e as converte para os tipos da tabela (colunas extras, como o
+        índice gravado pelo pandas, são ignoradas). Erros de tipo valem para o arquivo inteiro.
+        """
+        missing = [name for name in self.required if name not in batch.schema.names]
+        if missing:
+            raise ValueError(f'Colunas obrigatórias ausentes: {", ".join(missing)}')
+        pa = _require_pyarrow()
+        fields = [field for field in self.schema if field.name in batch.schema.names]
+        table = pa.Table.from_batches([batch]).select([field.name for field in fields])
+        try:
+            return table.cast(pa.schema([field.with_nullable(True) for field in fields]))
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            raise ValueError(f'Coluna com tipo incompatível: {str(e)}')
+
+    def add(self, batch):
+        """
+        Valida e insere um bloco em uma única transação.
+        """
+        table = self._conform(batch)
+        offset = self.result.received
+        self.result.received += table.num_rows
+        self.result.explicit_ids = self.result.explicit_ids or 'id' in table.column_names
+
+        rows = []
+        for index, values in enumerate(table.to_pylist(), start=offset):
+            absent = [name for name in self.required if values[name] is None]
+            if absent:
+                self.result.error(index, f'{", ".join(absent)} é obrigatório')
+            else:
+                if 'id' in values and values['id'] is None:
+                    del values['id']
+                rows.append((index, values))
+
+        if self.series is not None:
+            rows = self._known_patient_rows(rows)
+        if rows:
+            self._insert(rows)
+
+    def _known_patient_rows(self, rows):
+        missing = {values['patient_id'] for _, values in rows} - self.known_patients
+        missing = list(missing)
+        for start in range(0, len(missing), PATIENT_BATCH_SIZE):
+            self.known_patients.update(db.session.scalars(
+                select(Patient.id).where(Patient.id.in_(missing[start:start + PATIENT_BATCH_SIZE]))
+            ))
+
+        known = []
+        for index, values in rows:
+            if values['patient_id'] in self.known_patients:
+                known.append((index, values))
+            else:
+                self.result.error(index, f"Paciente {values['patient_id']} não encontrado")
+        return known
+
+    def _insert(self, rows):
+        """
+        Insere as linhas em uma única transação. Se o banco recusar o bloco (ex.: id já existente),
+        cada metade é tentada em separado, até chegar às linhas com problema: só elas são reportadas.
+        """
+        values = [row for _, row in rows]
+        try:
+            if self.series is None:
+                db.session.execute(insert(self.model), values)
+            else:
+                model = self.model
+                inserted = db.session.execute(
+                    insert(model).returning(model.patient_id, model.id, model.timestamp, sort_by_parameter_order=True),
+                    values
+                ).all()
+                readings = [{**row, 'id': row_id} for row, (_, row_id, _) in zip(values, inserted)]
+                PatientLatest.record_readings(self.series, inserted)
+                if self.model is not ClinicalNotes:
+                    self._find_sealed_ids(readings)
+                    series_store.record_readings(self.series, readings)
+                    feature_store.update_readings(self.series, readings)
+                self.result.patient_ids.update(patient_id for patient_id, _, _ in inserted)
+            db.session.commit()
+            self.result.inserted += len(values)
+        except Exception as e:
+            db.session.rollback()
+            if len(rows) == 1:
+                self.result.error(rows[0][0], f'Erro ao inserir: {str(e)}')
+                return
+            middle = len(rows) // 2
+            self._insert(rows[:middle])
+            self._insert(rows[middle:])
+
+    def _find_sealed_ids(self, readings):
+        """
+        Pacientes com ids importados que já estão dentro de um bloco compactado (id <= sealed_through_id):
+        essas leituras não entram em blocos nem na ponta lida pelas consultas, então as séries
+        desses pacientes são reconstruídas em finish().
+        """
+        if not self.result.explicit_ids:
+            return
+        lowest = {}
+        for reading in readings:
+            patient_id = reading['patient_id']
+            lowest[patient_id] = min(lowest.get(patient_id, reading['id']), reading['id'])
+        heads = db.session.execute(
+            select(SeriesHead.patient_id, SeriesHead.sealed_through_id)
+            .where(SeriesHead.series == self.series, SeriesHead.patient_id.in_(list(lowest)))
+        )
+        self.resealed_patients.update(
+            patient_id for patient_id, sealed_through_id in heads if lowest[patient_id] <= sealed_through_id
+        )
+
+    def finish(self) -> ImportResult:
+        """
+        Ajustes depois do último bloco: sequência de ids (PostgreSQL, quando o arquivo trouxe ids),
+        séries temporais dos pacientes com ids anteriores aos já compactados e estado de alerta
+        precoce dos pacientes com sinais vitais importados.
+        """
+        if self.result.explicit_ids and db.engine.dialect.name == 'postgresql':
+            table_name = self.model.__table__.name
+            db.session.execute(
+                text("SELECT setval(pg_get_serial_sequence(:table, 'id'), :value)"),
+                {'table': table_name, 'value': db.session.execute(select(func.max(self.model.id))).scalar() or 1}
+            )
+            db.session.commit()
+        if self.resealed_patients:
+            patient_ids = sorted(self.resealed_patients)
+            for start in range(0, len(patient_ids), PATIENT_BATCH_SIZE):
+                series_store.rebuild(patient_ids[start:start + PATIENT_BATCH_SIZE], [self.series])
+        if self.model is VitalSigns and self.result.patient_ids:
+            patient_ids = sorted(self.result.patient_ids)
+            for start in range(0, len(patient_ids), PATIENT_BATCH_SIZE):
+                early_warning.rebuild(patient_ids[start:start + PATIENT_BATCH_SIZE])
+        return self.result
+
+
+def import_batches(table: str, batches) -> ImportResult:
+    """
+    Importa os RecordBatches na tabela e retorna o resumo (recebidas, inseridas, erros por linha).
+    """
+    importer = ColumnarImporter(table)
+    try:
+        for batch in batches:
+            importer.add(batch)
+    except ValueError as e:
+        # Blocos anteriores já foram gravados (uma transação por bloco)
+        if importer.result.inserted:
+            importer.finish()
+            raise ValueError(f'{str(e)} ({importer.result.inserted} linhas já importadas)')
+        raise
+    return importer.finish()
@@ -0,0 +1,85 @@
+import numpy as np
+
+
+class CompiledForest:
+    """
+    Random Forest treinada pelo scikit-learn exportada para arrays NumPy planos.
+
+    Os nós de todas as árvores ficam em arrays contíguos (feature, limiar, filhos esquerdo e
+    direito, probabilidades do nó). Cada par (amostra, árvore) desce um nível por passo
+    vetorizado e sai do conjunto ativo ao chegar a uma folha, sem o custo fixo de validação e
+    despacho do predict_proba do scikit-learn. Compensa em chamadas pequenas; em lotes grandes
+    o percurso em Cython do scikit-learn é mais rápido.
+    """
+
+    def __init__(self, forest):
+        features, thresholds, left, right, leaves, values, roots = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            is_leaf = tree.children_left == -1
+            indices = np.arange(tree.node_count) + offset
+
+            # Folhas apontam para si mesmas: índices sempre válidos nos arrays de nós
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            left.append(np.where(is_leaf, indices, tree.children_left + offset))
+            right.append(np.where(is_leaf, indices, tree.children_right + offset))
+            leaves.append(is_leaf)
+
+            # Probabilidades de cada nó, como em DecisionTreeClassifier.predict_proba
+            counts = tree.value[:, 0, :]
+            totals = counts.sum(axis=1, keepdims=True)
+            values.append(counts / np.where(totals == 0, 1, totals))
+
+            roots.append(offset)
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        self.classes_ = np.asarray(forest.classes_)
+        self.n_features_in_ = forest.n_features_in_
+        self.max_depth = max_depth
+        self.feature = np.concatenate(features).astype(np.intp)
+        self.threshold = np.concatenate(thresholds).astype(np.float64)
+        self.children_left = np.concatenate(left).astype(np.intp)
+        self.children_right = np.concatenate(right).astype(np.intp)
+        self.is_leaf = np.concatenate(leaves)
+        self.value = np.concatenate(values).astype(np.float64)
+        self.roots = np.array(roots, dtype=np.intp)
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def predict_proba(self, X) -> np.ndarray:
+        """
+        Probabilidades de cada classe, na ordem de classes_, para uma matriz (n_amostras, n_features)
+        ou um único vetor de features.
+        """
+        # O scikit-learn compara as features em float32 com limiares em float64
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Esperadas {self.n_features_in_} features, recebidas {X.shape[1]}")
+        if np.isnan(X).any():
+            raise ValueError("Input contains NaN.")
+
+        n_samples = X.shape[0]
+        flat = X.ravel()
+        nodes = np.tile(self.roots, n_samples)
+        offsets = np.repeat(np.arange(n_samples) * self.n_features_in_, self.n_trees)
+
+        active = np.flatnonzero(~self.is_leaf[nodes])
+        while active.size:
+            current = nodes[active]
+            go_left = flat[offsets[active] + self.feature[current]] <= self.threshold[current]
+            following = np.where(go_left, self.children_left[current], self.children_right[current])
+            nodes[active] = following
+            active = active[~self.is_leaf[following]]
+
+        return self.value[nodes.reshape(n_samples, self.n_trees)].mean(axis=1)
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
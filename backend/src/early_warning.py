@@ -0,0 +1,229 @@
+"""
+Escore de alerta precoce no estilo NEWS2, avaliado a cada inserção de sinais vitais.
+
+As faixas de cada parâmetro são compiladas uma vez em arrays NumPy (limites e pontos) e um bloco
+inteiro de leituras é pontuado com np.digitize. O estado de cada paciente (último valor e pontos
+de cada parâmetro) fica em PatientEarlyWarning e é atualizado na mesma transação da inserção,
+sem reler o histórico: leituras parciais (ex.: só frequência cardíaca) são combinadas com os
+valores mais recentes dos demais parâmetros. Quando o nível de risco sobe, um EarlyWarningAlert
+é gravado e publicado como evento 'early_warning' depois do commit.
+
+Variáveis de ambiente:
+    HOLDMED_EARLY_WARNING           0 desativa a avaliação na ingestão
+    HOLDMED_NEWS2_MAX_AGE_MINUTES   valores mais antigos que isso não entram no escore (padrão 60)
+"""
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import insert, select
+from sqlalchemy.orm.attributes import flag_modified
+
+from models.early_warning import EarlyWarningAlert, PatientEarlyWarning
+from models.patient import PatientLatest, VitalSigns, db
+from push import event_broker
+
+ENABLED = os.environ.get('HOLDMED_EARLY_WARNING', '1').lower() not in ('0', 'false', 'no')
+MAX_AGE = timedelta(minutes=float(os.environ.get('HOLDMED_NEWS2_MAX_AGE_MINUTES', 60)))
+
+# Faixas do NEWS2 por parâmetro: (limite superior inclusivo, pontos); a última faixa não tem limite.
+# SpO2 na escala 1. Nível de consciência e oxigênio suplementar não são registrados nos sinais vitais.
+NEWS2_RULES = {
+    'respiratory_rate': ((8, 3), (11, 1), (20, 0), (24, 2), (None, 3)),
+    'oxygen_saturation': ((91, 3), (93, 2), (95, 1), (None, 0)),
+    'blood_pressure_systolic': ((90, 3), (100, 2), (110, 1), (219, 0), (None, 3)),
+    'heart_rate': ((40, 3), (50, 1), (90, 0), (110, 1), (130, 2), (None, 3)),
+    'temperature': ((35.0, 3), (36.0, 1), (38.0, 0), (39.0, 1), (None, 2)),
+}
+
+# Níveis de risco em ordem crescente; um alerta é gerado quando o nível sobe
+LEVELS = ('low', 'low_medium', 'medium', 'high')
+MEDIUM_SCORE = 5
+HIGH_SCORE = 7
+# Um único parâmetro com esta pontuação já pede avaliação urgente (nível low_medium)
+RED_SCORE = 3
+
+# Estados de paciente gravados por INSERT na reconstrução
+REBUILD_BATCH_SIZE = 5000
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def risk_level(score: int, maximum: int) -> str:
+    if score >= HIGH_SCORE:
+        return 'high'
+    if score >= MEDIUM_SCORE:
+        return 'medium'
+    if maximum >= RED_SCORE:
+        return 'low_medium'
+    return 'low'
+
+
+class CompiledRule:
+    """
+    Faixas de um parâmetro como arrays: limites superiores (ordenados) e os pontos de cada faixa.
+    """
+
+    __slots__ = ('field', 'edges', 'points')
+
+    def __init__(self, field: str, bands: tuple):
+        self.field = field
+        self.edges = np.array([upper for upper, _ in bands[:-1]], dtype=np.float64)
+        self.points = np.array([points for _, points in bands], dtype=np.int8)
+
+    def evaluate(self, values: np.ndarray) -> np.ndarray:
+        """
+        Pontos de cada valor; -1 onde o valor está ausente (NaN).
+        """
+        points = self.points[np.digitize(values, self.edges, right=True)]
+        return np.where(np.isnan(values), -1, points)
+
+
+class EarlyWarningEngine:
+    """
+    Regras compiladas e a atualização incremental do estado dos pacientes.
+    """
+
+    def __init__(self, rules: dict = None, max_age: timedelta = MAX_AGE):
+        self.rules = [CompiledRule(field, bands) for field, bands in (rules or NEWS2_RULES).items()]
+        self.fields = [rule.field for rule in self.rules]
+        self.max_age = max_age.total_seconds()
+
+    def points(self, values: np.ndarray) -> np.ndarray:
+        """
+        Pontua um bloco de leituras de uma vez.
+        values: matriz (n_leituras, n_parametros) na ordem de self.fields, NaN para ausente.
+        """
+        return np.column_stack([rule.evaluate(values[:, index]) for index, rule in enumerate(self.rules)])
+
+    def fold(self, state: dict, timestamp: datetime, values, points) -> tuple:
+        """
+        Incorpora uma leitura ao estado do paciente e retorna (nível anterior, nível atual).
+        Parâmetros com leitura mais recente já incorporada (inserções retroativas) são ignorados.
+        """
+        seconds = (timestamp - EPOCH).total_seconds()
+        parameters = state.setdefault('parameters', {})
+        previous_level = state.get('level', 'low')
+        changed = False
+        for field, value, point in zip(self.fields, values, points):
+            if point < 0:
+                continue
+            previous = parameters.get(field)
+            if previous is not None and seconds < previous['t']:
+                continue
+            parameters[field] = {'t': seconds, 'value': float(value), 'points': int(point)}
+            changed = True
+        if not changed:
+            return previous_level, previous_level
+
+        current = [parameter['points'] for parameter in parameters.values() if seconds - parameter['t'] <= self.max_age]
+        state['score'] = sum(current)
+        state['level'] = risk_level(state['score'], max(current))
+        state['t'] = max(seconds, state.get('t', seconds))
+        return previous_level, state['level']
+
+    def update(self, *rows) -> list:
+        """
+        Avalia leituras recém-inseridas (VitalSigns, já com id). Deve ser chamado antes do commit.
+        Retorna os alertas gerados, para publicar com publish() depois do commit.
+        """
+        return self.update_readings([
+            {'patient_id': row.patient_id, 'id': row.id, 'timestamp': row.timestamp,
+             **{field: getattr(row, field) for field in self.fields}}
+            for row in rows
+        ])
+
+    def update_readings(self, readings: list) -> list:
+        """
+        Versão em lote de update para inserções feitas sem objetos ORM.
+        readings: dicionários com patient_id, id, timestamp e os campos de sinais vitais.
+        """
+        if not ENABLED or not readings:
+            return []
+
+        readings = sorted(readings, key=lambda reading: reading['timestamp'])
+        values = np.array([[reading.get(field) for field in self.fields] for reading in readings], dtype=np.float64)
+        points = self.points(values)
+
+        patient_ids = {reading['patient_id'] for reading in readings}
+        records = {
+            record.patient_id: record
+            for record in db.session.scalars(
+                select(PatientEarlyWarning).where(PatientEarlyWarning.patient_id.in_(patient_ids)).with_for_update()
+            )
+        }
+        states = {patient_id: dict(record.state) for patient_id, record in records.items()}
+
+        alerts = []
+        for reading, reading_values, reading_points in zip(readings, values.tolist(), points.tolist()):
+            state = states.setdefault(reading['patient_id'], {})
+            previous_level, level = self.fold(state, reading['timestamp'], reading_values, reading_points)
+            if LEVELS.index(level) > LEVELS.index(previous_level):
+                alerts.append({
+                    'patient_id': reading['patient_id'],
+                    'vital_signs_id': reading.get('id'),
+                    'timestamp': reading['timestamp'],
+                    'score': state['score'],
+                    'level': level,
+                    'previous_level': previous_level,
+                    'parameters': {
+                        field: {'value': parameter['value'], 'points': parameter['points']}
+                        for field, parameter in state['parameters'].items()
+                    },
+                })
+
+        for patient_id, state in states.items():
+            record = records.get(patient_id)
+            if record is None:
+                db.session.add(PatientEarlyWarning(patient_id=patient_id, score=state.get('score', 0),
+                                                   level=state.get('level', 'low'), state=state))
+            else:
+                record.score = state.get('score', 0)
+                record.level = state.get('level', 'low')
+                record.state = state
+                flag_modified(record, 'state')
+
+        if alerts:
+            db.session.execute(insert(EarlyWarningAlert), alerts)
+        return alerts
+
+    def publish(self, alerts: list):
+        """
+        Envia os alertas aos painéis conectados (evento 'early_warning'). Chamar depois do commit.
+        """
+        for alert in alerts:
+            event_broker.publish('early_warning', alert['patient_id'], {
+                **alert, 'timestamp': alert['timestamp'].isoformat()
+            })
+
+    def rebuild(self, patient_ids=None):
+        """
+        Estado inicial a partir da leitura mais recente de cada paciente (ex.: banco pré-existente),
+        sem gerar alertas. patient_ids restringe a reconstrução a esses pacientes (ex.: importação).
+        """
+        query = (
+            select(VitalSigns.patient_id, VitalSigns.timestamp, *(getattr(VitalSigns, field) for field in self.fields))
+            .join(PatientLatest, PatientLatest.vital_signs_id == VitalSigns.id)
+        )
+        stale = db.session.query(PatientEarlyWarning)
+        if patient_ids is not None:
+            patient_ids = list(patient_ids)
+            stale = stale.filter(PatientEarlyWarning.patient_id.in_(patient_ids))
+            query = query.where(PatientLatest.patient_id.in_(patient_ids))
+        stale.delete(synchronize_session=False)
+        latest = db.session.execute(query).all()
+        for start in range(0, len(latest), REBUILD_BATCH_SIZE):
+            rows = latest[start:start + REBUILD_BATCH_SIZE]
+            values = np.array([row[2:] for row in rows], dtype=np.float64)
+            records = []
+            for row, row_values, row_points in zip(rows, values.tolist(), self.points(values).tolist()):
+                state = {}
+                self.fold(state, row.timestamp, row_values, row_points)
+                records.append({'patient_id': row.patient_id, 'score': state.get('score', 0),
+                                'level': state.get('level', 'low'), 'state': state})
+            db.session.execute(insert(PatientEarlyWarning), records)
+        db.session.commit()
+
+
+# Instância compartilhada pelas rotas de inserção
+early_warning = EarlyWarningEngine()
@@ -0,0 +1,88 @@
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from models.patient import ClinicalNotes, ClinicalNoteExtraction, dialect_insert, db
+from nlp_service import nlp_service
+from note_search import note_search
+
+
+class ExtractionCache:
+    """
+    Cache das extrações NLP de notas clínicas.
+
+    Notas não mudam depois de inseridas, então a extração é calculada uma única vez e gravada
+    em ClinicalNoteExtraction. Um LRU em memória, indexado pelo hash do conteúdo, fica na frente
+    da tabela: leituras repetidas não tocam no banco nem no spaCy.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, content_hash):
+        with self._lock:
+            result = self._entries.get(content_hash)
+            if result is not None:
+                self._entries.move_to_end(content_hash)
+            return result
+
+    def _put(self, content_hash, result):
+        with self._lock:
+            self._entries[content_hash] = result
+            self._entries.move_to_end(content_hash)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def process_text(self, content: str) -> dict:
+        """
+        Extração de um texto qualquer, reaproveitando o LRU para textos repetidos.
+        """
+        content_hash = ClinicalNoteExtraction.hash_content(content)
+        result = self._get(content_hash)
+        if result is None:
+            result = nlp_service.process_note(content)
+            self._put(content_hash, result)
+        return result
+
+    def get_for_note(self, note: ClinicalNotes) -> dict:
+        """
+        Extração de uma nota gravada: LRU, depois a tabela e, só se faltar, o spaCy.
+        """
+        content_hash = ClinicalNoteExtraction.hash_content(note.content)
+        result = self._get(content_hash)
+        if result is not None:
+            return result
+
+        stored = db.session.get(ClinicalNoteExtraction, note.id)
+        if stored is not None and stored.content_hash == content_hash:
+            result = stored.to_dict()
+        else:
+            result = self.store(note.id, note.content, nlp_service.process_note(note.content or ''))
+            db.session.commit()
+
+        self._put(content_hash, result)
+        return result
+
+    def store(self, note_id: int, content: str, result: dict) -> dict:
+        """
+        Grava (ou substitui) a extração de uma nota, e seus termos no índice de busca, na sessão
+        atual; o commit fica com quem chama.
+        """
+        content_hash = ClinicalNoteExtraction.hash_content(content)
+        # Upsert: a requisição (get_for_note) e a conclusão de uma tarefa podem gravar a mesma nota ao mesmo tempo
+        values = {'note_id': note_id, 'content_hash': content_hash, 'processed_at': datetime.utcnow(), **result}
+        insert = dialect_insert(ClinicalNoteExtraction.__table__).values(values)
+        db.session.execute(insert.on_conflict_do_update(
+            index_elements=['note_id'],
+            set_={column: insert.excluded[column] for column in values if column != 'note_id'}
+        ))
+        note_search.index_extractions([(note_id, result)])
+        self._put(content_hash, result)
+        return result
+
+
+# Instância compartilhada pelas rotas
+extraction_cache = ExtractionCache(maxsize=int(os.environ.get('HOLDMED_EXTRACTION_CACHE_SIZE', 1024)))
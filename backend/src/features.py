@@ -0,0 +1,184 @@
+from datetime import datetime
+
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.orm.attributes import flag_modified
+
+from models.feature import PatientFeatures
+from models.patient import VitalSigns, LabResults, db
+
+# Sinais acompanhados por série e o nome da feature de cada um.
+# Os nomes das features originais do modelo (pressão, temperatura, glicose) são mantidos.
+FEATURE_SIGNALS = {
+    'vital_signs': {
+        'blood_pressure_systolic': 'sinais_vitais_pressao',
+        'temperature': 'sinais_vitais_temperatura',
+        'heart_rate': 'sinais_vitais_frequencia_cardiaca',
+        'oxygen_saturation': 'sinais_vitais_saturacao',
+        'respiratory_rate': 'sinais_vitais_frequencia_respiratoria',
+    },
+    'lab_results': {
+        'glucose': 'exames_laboratoriais_glicose',
+        'white_blood_cells': 'exames_laboratoriais_leucocitos',
+        'creatinine': 'exames_laboratoriais_creatinina',
+    },
+}
+
+SERIES_MODELS = {
+    'vital_signs': VitalSigns,
+    'lab_results': LabResults,
+}
+
+# Meia-vida (em horas) das médias móveis exponenciais de cada série
+EWMA_HALF_LIFE_HOURS = {
+    'vital_signs': 4.0,
+    'lab_results': 24.0,
+}
+
+# Leituras lidas por transação na reconstrução
+REBUILD_BATCH_SIZE = 5000
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def fold(state: dict, series: str, timestamp: datetime, values: dict) -> dict:
+    """
+    Incorpora uma leitura ao estado de features do paciente em O(1) e retorna o estado.
+    Leituras anteriores à última já incorporada de um sinal (inserções retroativas) são ignoradas.
+    """
+    seconds = (timestamp - EPOCH).total_seconds()
+    half_life = EWMA_HALF_LIFE_HOURS[series]
+
+    for field, name in FEATURE_SIGNALS[series].items():
+        value = values.get(field)
+        if value is None:
+            continue
+
+        previous = state.get(name)
+        if previous is None:
+            state[name] = {'t': seconds, 'value': value, 'delta': 0.0, 'ewma': value, 'slope': 0.0, 'n': 1}
+            continue
+        if seconds < previous['t']:
+            continue
+
+        # Peso da nova leitura cresce com o tempo desde a anterior (EWMA com intervalos irregulares)
+        hours = (seconds - previous['t']) / 3600
+        alpha = 1 - 0.5 ** (hours / half_life)
+        slope = previous['slope']
+        if hours > 0:
+            instant_slope = (value - previous['value']) / hours
+            slope = instant_slope if previous['n'] == 1 else slope + alpha * (instant_slope - slope)
+
+        state[name] = {
+            't': seconds,
+            'value': value,
+            'delta': value - previous['value'],
+            'ewma': previous['ewma'] + alpha * (value - previous['ewma']),
+            'slope': slope,
+            'n': previous['n'] + 1,
+        }
+    return state
+
+
+def feature_vector(patient, state: dict, at: datetime = None) -> dict:
+    """
+    Vetor de features do paciente a partir do estado, pronto para AIAgent.predict_complication.
+    Sinais sem leitura valem 0, como nas features originais.
+    """
+    at = at or datetime.utcnow()
+    vector = {'idade': patient.age}
+    for signals in FEATURE_SIGNALS.values():
+        for name in signals.values():
+            signal = state.get(name)
+            vector[name] = signal['value'] if signal else 0
+            vector[f'{name}_variacao'] = signal['delta'] if signal else 0
+            vector[f'{name}_media_movel'] = signal['ewma'] if signal else 0
+            vector[f'{name}_tendencia'] = signal['slope'] if signal else 0
+    vector['horas_desde_cirurgia'] = (
+        (at - patient.surgery_date).total_seconds() / 3600 if patient.surgery_date else 0
+    )
+    return vector
+
+
+class FeatureStore:
+    """
+    Features do modelo mantidas de forma incremental por paciente.
+
+    Cada leitura atualiza o estado de PatientFeatures na mesma transação da inserção, sem reler o
+    histórico; a predição lê uma única linha e monta o vetor de features.
+    """
+
+    def update(self, *rows):
+        """
+        Atualiza o estado com leituras recém-inseridas (VitalSigns ou LabResults).
+        """
+        by_series = {}
+        for row in rows:
+            series = next(name for name, model in SERIES_MODELS.items() if isinstance(row, model))
+            by_series.setdefault(series, []).append(
+                (row.patient_id, row.timestamp, {field: getattr(row, field) for field in FEATURE_SIGNALS[series]})
+            )
+        for series, readings in by_series.items():
+            self._apply(series, readings)
+
+    def update_readings(self, series: str, readings):
+        """
+        Versão em lote de update para inserções feitas sem objetos ORM.
+        readings: dicionários com patient_id, timestamp e os campos da série.
+        """
+        self._apply(series, [(reading['patient_id'], reading['timestamp'], reading) for reading in readings])
+
+    def _apply(self, series, readings):
+        # readings: tuplas (patient_id, timestamp, valores)
+        patient_ids = {patient_id for patient_id, _, _ in readings}
+        records = {
+            record.patient_id: record
+            for record in db.session.scalars(
+                select(PatientFeatures).where(PatientFeatures.patient_id.in_(patient_ids)).with_for_update()
+            )
+        }
+
+        states = {}
+        for patient_id, timestamp, values in sorted(readings, key=lambda reading: reading[1]):
+            if patient_id not in states:
+                record = records.get(patient_id)
+                states[patient_id] = dict(record.state) if record is not None else {}
+            fold(states[patient_id], series, timestamp, values)
+
+        for patient_id, state in states.items():
+            record = records.get(patient_id)
+            if record is None:
+                db.session.add(PatientFeatures(patient_id=patient_id, state=state))
+            else:
+                record.state = state
+                flag_modified(record, 'state')
+
+    def vector(self, patient, at: datetime = None) -> dict:
+        """
+        Vetor de features atual do paciente (uma leitura por chave primária).
+        """
+        record = db.session.get(PatientFeatures, patient.id)
+        return feature_vector(patient, record.state if record is not None else {}, at)
+
+    def rebuild(self):
+        """
+        Reconstrói o estado de todos os pacientes a partir das leituras (ex.: banco pré-existente).
+        """
+        db.session.execute(delete(PatientFeatures))
+        for series, model in SERIES_MODELS.items():
+            fields = list(FEATURE_SIGNALS[series])
+            last = None
+            while True:
+                query = select(model.patient_id, model.timestamp, model.id, *(getattr(model, field) for field in fields))
+                if last is not None:
+                    query = query.where(tuple_(model.timestamp, model.id) > last)
+                rows = db.session.execute(query.order_by(model.timestamp, model.id).limit(REBUILD_BATCH_SIZE)).all()
+                if not rows:
+                    break
+                self._apply(series, [(row[0], row[1], dict(zip(fields, row[3:]))) for row in rows])
+                db.session.flush()
+                last = (rows[-1][1], rows[-1][2])
+        db.session.commit()
+
+
+# Instância compartilhada pelas rotas de inserção e de predição
+feature_store = FeatureStore()
@@ -0,0 +1,197 @@
+import hashlib
+import json
+from datetime import datetime
+
+from sqlalchemy import select, update
+
+from extraction_cache import extraction_cache
+from features import feature_store
+from instrumentation import span
+from jobs import job_queue
+from model_registry import model_registry
+from push import event_broker
+from models.job import Job
+from models.patient import (
+    Patient, VitalSigns, LabResults, ClinicalNoteExtraction, PatientLatest, PatientInsight, dialect_insert, db
+)
+
+
+def current_sources(patient_id: int):
+    """
+    Ids das leituras mais recentes do paciente (uma linha do snapshot, sem carregar as leituras).
+    """
+    return db.session.execute(
+        select(PatientLatest.vital_signs_id, PatientLatest.lab_results_id, PatientLatest.clinical_notes_id)
+        .where(PatientLatest.patient_id == patient_id)
+    ).first()
+
+
+def is_fresh(insight: PatientInsight, sources, model_version: str) -> bool:
+    """
+    O snapshot vale enquanto foi calculado com as leituras mais recentes e com o modelo ativo.
+    """
+    return (
+        insight is not None
+        and sources is not None
+        and (insight.vital_signs_id, insight.lab_results_id, insight.clinical_notes_id) == tuple(sources)
+        and insight.model_version == model_version
+    )
+
+
+def build_body(patient, vital_signs, lab_results, prediction, processed_notes, insights) -> dict:
+    return {
+        'patient_id': patient.id,
+        'patient_name': patient.name,
+        'insights': insights,
+        'prediction': prediction,
+        'latest_vital_signs': vital_signs.to_dict() if vital_signs else None,
+        'latest_lab_results': lab_results.to_dict() if lab_results else None,
+        'processed_notes': processed_notes
+    }
+
+
+def store(patient_id: int, sources, model_version: str, body: dict) -> tuple:
+    """
+    Grava (ou substitui) o snapshot de insights do paciente na sessão atual.
+    Retorna (snapshot, alerta): o alerta, se houver, é publicado com publish_alert() depois do commit.
+    """
+    etag = hashlib.sha256(json.dumps(body, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    vital_signs_id, lab_results_id, clinical_notes_id = sources
+
+    # Alerta em tempo real quando o paciente passa a ter complicação prevista
+    previous = db.session.get(PatientInsight, patient_id)
+    was_predicted = previous is not None and previous.body['prediction']['complication_predicted']
+    alert = None
+    if body['prediction']['complication_predicted'] and not was_predicted:
+        alert = {
+            'patient_id': patient_id,
+            'patient_name': body['patient_name'],
+            'prediction': body['prediction'],
+            'insights': body['insights']
+        }
+
+    # Upsert: a requisição e a tarefa em segundo plano podem gravar o mesmo paciente ao mesmo tempo
+    values = {
+        'patient_id': patient_id,
+        'vital_signs_id': vital_signs_id,
+        'lab_results_id': lab_results_id,
+        'clinical_notes_id': clinical_notes_id,
+        'model_version': model_version,
+        'body': body,
+        'etag': etag,
+        'computed_at': datetime.utcnow(),
+    }
+    insert = dialect_insert(PatientInsight.__table__).values(values)
+    db.session.execute(insert.on_conflict_do_update(
+        index_elements=['patient_id'],
+        set_={column: insert.excluded[column] for column in values if column != 'patient_id'}
+    ))
+    return db.session.get(PatientInsight, patient_id, populate_existing=True), alert
+
+
+def publish_alert(alert):
+    """
+    Publica o alerta retornado por store(); chamar só depois do commit.
+    """
+    if alert is not None:
+        event_broker.publish('alert', alert['patient_id'], alert)
+
+
+def compute(patient: Patient, latest: PatientLatest) -> PatientInsight:
+    """
+    Calcula os insights na própria requisição (snapshot ausente ou desatualizado) e os grava.
+    """
+    agent = model_registry.get_agent()
+    with span('features.vector'):
+        patient_data = feature_store.vector(patient)
+    prediction = agent.predict_complication(patient_data)
+
+    processed_notes = {'keywords': [], 'medical_terms': []}
+    if latest.clinical_notes:
+        # Extração calculada uma única vez por nota (LRU + ClinicalNoteExtraction)
+        with span('nlp.extract'):
+            processed_notes = {
+                'original_notes': latest.clinical_notes.content,
+                **extraction_cache.get_for_note(latest.clinical_notes)
+            }
+
+    body = build_body(
+        patient, latest.vital_signs, latest.lab_results, prediction, processed_notes,
+        agent.generate_dashboard_insights(prediction, processed_notes)
+    )
+    sources = (latest.vital_signs_id, latest.lab_results_id, latest.clinical_notes_id)
+    with span('db.store_insight'):
+        insight, alert = store(patient.id, sources, model_registry.version, body)
+        db.session.commit()
+    publish_alert(alert)
+    return insight
+
+
+def refresh_payload(patient: Patient, latest: PatientLatest) -> dict:
+    """
+    Payload da tarefa 'dashboard_insights'. Se a nota já foi extraída, a extração vai junto
+    e o processo de trabalho só executa a predição.
+    """
+    payload = {
+        'patient_data': feature_store.vector(patient),
+        'vital_signs_id': latest.vital_signs_id,
+        'lab_results_id': latest.lab_results_id,
+        'note_id': latest.clinical_notes_id,
+        'note_content': latest.clinical_notes.content if latest.clinical_notes else None,
+    }
+    if latest.clinical_notes_id is not None:
+        stored = db.session.get(ClinicalNoteExtraction, latest.clinical_notes_id)
+        if stored is not None and stored.content_hash == ClinicalNoteExtraction.hash_content(payload['note_content']):
+            payload['processed_notes'] = {'original_notes': payload['note_content'], **stored.to_dict()}
+    return payload
+
+
+def enqueue_refresh(patient_ids) -> int:
+    """
+    Agenda o recálculo dos insights dos pacientes afetados por novas leituras.
+    Se o paciente já tem um recálculo na fila, apenas atualiza o payload dele (coalescência),
+    evitando uma tarefa por leitura quando os monitores enviam dados a cada poucos segundos.
+    Retorna os ids dos pacientes com recálculo agendado.
+    """
+    patient_ids = list(patient_ids)
+    snapshots = PatientLatest.query.filter(PatientLatest.patient_id.in_(patient_ids)).all()
+    patients = {patient.id: patient for patient in Patient.query.filter(Patient.id.in_(patient_ids))}
+
+    created = 0
+    scheduled = set()
+    for latest in snapshots:
+        if latest.vital_signs is None or latest.lab_results is None:
+            continue
+        payload = refresh_payload(patients[latest.patient_id], latest)
+        coalesced = db.session.execute(
+            update(Job)
+            .where(Job.patient_id == latest.patient_id, Job.kind == 'dashboard_insights', Job.status == 'queued')
+            .values(payload=payload)
+        ).rowcount
+        if not coalesced:
+            db.session.add(Job(kind='dashboard_insights', patient_id=latest.patient_id, status='queued', payload=payload))
+            created += 1
+        scheduled.add(latest.patient_id)
+
+    db.session.commit()
+    if created:
+        job_queue.notify()
+    return scheduled
+
+
+def store_from_job(job: Job, result: dict):
+    """
+    Conclusão da tarefa 'dashboard_insights': grava o snapshot com as fontes do payload.
+    Retorna o alerta a publicar depois do commit (ou None).
+    """
+    payload = job.payload
+    patient = db.session.get(Patient, job.patient_id)
+    vital_signs = db.session.get(VitalSigns, payload['vital_signs_id'])
+    lab_results = db.session.get(LabResults, payload['lab_results_id'])
+    body = build_body(
+        patient, vital_signs, lab_results,
+        result['prediction'], result['processed_notes'], result['insights']
+    )
+    sources = (payload['vital_signs_id'], payload['lab_results_id'], payload.get('note_id'))
+    _, alert = store(job.patient_id, sources, result.get('model_version'), body)
+    return alert
@@ -0,0 +1,309 @@
+import bisect
+import hmac
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+
+from flask import g, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Limites (em segundos) dos histogramas de latência
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Limites do histograma de consultas SQL por requisição
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+# Profiler de amostragem: '' desativado, 'request' só nas requisições com ?profile=1 (ou cabeçalho
+# X-Profile: 1), 'all' em todas as requisições
+PROFILING = os.environ.get('HOLDMED_PROFILING', '').lower()
+# No modo 'request', o valor de ?profile= / X-Profile precisa ser este token; sem token, só
+# requisições diretas da própria máquina (loopback, sem proxy) podem ativar o profiler
+PROFILE_TOKEN = os.environ.get('HOLDMED_PROFILE_TOKEN', '')
+LOOPBACK_ADDRESSES = ('127.0.0.1', '::1')
+PROFILE_INTERVAL = float(os.environ.get('HOLDMED_PROFILE_INTERVAL_MS', 5)) / 1000.0
+PROFILE_DIR = os.environ.get('HOLDMED_PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'holdmed-profiles'))
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """
+    Histograma com rótulos no formato de exposição do Prometheus (buckets cumulativos, _sum e _count).
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple, buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def collect(self) -> list:
+        with self._lock:
+            snapshot = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for labels, counts, total, count in sorted(snapshot):
+            pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, labels)]
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                le = 'le="{}"'.format(bound if bound == '+Inf' else _format_number(bound))
+                lines.append(f'{self.name}_bucket{{{",".join(pairs + [le])}}} {cumulative}')
+            suffix = f'{{{",".join(pairs)}}}' if pairs else ''
+            lines.append(f'{self.name}_sum{suffix} {_format_number(total)}')
+            lines.append(f'{self.name}_count{suffix} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Métricas do processo atual. Com vários workers do gunicorn, cada worker expõe as suas.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Histogram(name, documentation, labelnames, buckets)
+            return self._metrics[name]
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(line for metric in metrics for line in metric.collect()) + '\n'
+
+
+metrics = MetricsRegistry()
+
+REQUEST_SECONDS = metrics.histogram(
+    'holdmed_request_duration_seconds', 'Duração das requisições HTTP (até o envio dos cabeçalhos).',
+    ('method', 'endpoint', 'status')
+)
+REQUEST_QUERIES = metrics.histogram(
+    'holdmed_request_sql_queries', 'Consultas SQL executadas por requisição.', ('endpoint',), QUERY_COUNT_BUCKETS
+)
+SQL_SECONDS = metrics.histogram(
+    'holdmed_sql_query_duration_seconds', 'Duração das consultas SQL, por tipo de comando.', ('statement',)
+)
+SPAN_SECONDS = metrics.histogram(
+    'holdmed_span_duration_seconds', 'Duração das etapas instrumentadas (banco, modelo, NLP, JSON).', ('span',)
+)
+
+
+class RequestTrace:
+    """
+    Etapas e consultas SQL de uma requisição, expostas no cabeçalho Server-Timing.
+    """
+
+    __slots__ = ('spans', 'queries', 'sql_seconds')
+
+    def __init__(self):
+        self.spans = []
+        self.queries = 0
+        self.sql_seconds = 0.0
+
+    def server_timing(self, total: float) -> str:
+        durations = {}
+        for name, seconds in self.spans:
+            durations[name] = durations.get(name, 0.0) + seconds
+        entries = [f'{re.sub(r"[^A-Za-z0-9_.-]", "_", name)};dur={seconds * 1000:.2f}' for name, seconds in durations.items()]
+        entries.append(f'sql;dur={self.sql_seconds * 1000:.2f};desc="{self.queries} consultas"')
+        entries.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(entries)
+
+
+# Rastreamento da requisição em andamento no contexto (thread) atual
+_current_trace = ContextVar('holdmed_request_trace', default=None)
+
+
+class span:
+    """
+    Mede um trecho de código: alimenta o histograma holdmed_span_duration_seconds e, dentro de
+    uma requisição, o cabeçalho Server-Timing.
+
+        with span('model.predict_proba'):
+            ...
+    """
+
+    __slots__ = ('name', '_started')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self._started
+        SPAN_SECONDS.observe(seconds, self.name)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.spans.append((self.name, seconds))
+        return False
+
+
+def _statement_kind(statement: str) -> str:
+    words = statement.lstrip().split(None, 1)
+    return words[0].upper() if words else ''
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['holdmed_query_started'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop('holdmed_query_started', None)
+    if started is None:
+        return
+    seconds = time.perf_counter() - started
+    SQL_SECONDS.observe(seconds, _statement_kind(statement))
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.queries += 1
+        trace.sql_seconds += seconds
+
+
+class SamplingProfiler:
+    """
+    Profiler de amostragem de uma thread: a cada intervalo, uma thread auxiliar lê a pilha da
+    thread observada (sys._current_frames) e conta as pilhas iguais. O resultado sai no formato
+    "collapsed" (frame;frame;frame contagem), aceito por flamegraph.pl e speedscope.
+    """
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='holdmed-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def dump(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f'{stack} {count}\n')
+        return path
+
+
+def _wants_profile() -> bool:
+    if PROFILING == 'all':
+        return True
+    if PROFILING not in ('1', 'true', 'request'):
+        return False
+    flag = request.args.get('profile') or request.headers.get('X-Profile', '')
+    if PROFILE_TOKEN:
+        return hmac.compare_digest(flag.encode(), PROFILE_TOKEN.encode())
+    local = request.remote_addr in LOOPBACK_ADDRESSES and 'X-Forwarded-For' not in request.headers
+    return local and flag.lower() in ('1', 'true', 'yes')
+
+
+class InstrumentedJSONProvider(DefaultJSONProvider):
+    """
+    Provedor JSON padrão do Flask com a serialização medida como a etapa 'json.encode'.
+    """
+
+    def dumps(self, obj, **kwargs):
+        with span('json.encode'):
+            return super().dumps(obj, **kwargs)
+
+
+def _before_request():
+    g.holdmed_started = time.perf_counter()
+    g.holdmed_trace = RequestTrace()
+    g.holdmed_trace_token = _current_trace.set(g.holdmed_trace)
+    g.holdmed_profiler = SamplingProfiler(threading.get_ident()).start() if _wants_profile() else None
+
+
+def _after_request(response):
+    trace = g.get('holdmed_trace')
+    if trace is None:
+        return response
+    total = time.perf_counter() - g.holdmed_started
+    endpoint = request.endpoint or 'unmatched'
+    REQUEST_SECONDS.observe(total, request.method, endpoint, str(response.status_code))
+    REQUEST_QUERIES.observe(trace.queries, endpoint)
+    response.headers['Server-Timing'] = trace.server_timing(total)
+
+    profiler = g.pop('holdmed_profiler', None)
+    if profiler is not None:
+        profiler.stop()
+        # A resposta leva só um id opaco; o arquivo é PROFILE_DIR/<id>.collapsed no servidor
+        profile_id = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:12]}"
+        profiler.dump(os.path.join(PROFILE_DIR, f'{profile_id}.collapsed'))
+        response.headers['X-Profile'] = profile_id
+    return response
+
+
+def _teardown_request(exc):
+    profiler = g.pop('holdmed_profiler', None)
+    if profiler is not None:
+        profiler.stop()
+    token = g.pop('holdmed_trace_token', None)
+    if token is not None:
+        _current_trace.reset(token)
+
+
+def init_app(app):
+    """
+    Instrumenta a aplicação: duração e consultas SQL de cada requisição (histogramas e cabeçalho
+    Server-Timing), serialização JSON e, se HOLDMED_PROFILING estiver ativo, o profiler de amostragem.
+    """
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+    app.json = InstrumentedJSONProvider(app)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
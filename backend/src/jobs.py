@@ -0,0 +1,293 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select, update
+
+from models.job import Job
+from models.user import db
+
+# Intervalo para buscar tarefas enfileiradas por outros processos do servidor
+POLL_INTERVAL = 1.0
+
+# Tarefas em execução há mais tempo que isso são consideradas órfãs e reenfileiradas
+STALE_JOB_TIMEOUT = timedelta(minutes=10)
+
+# Tarefas concluídas ou com falha são apagadas depois disso (HOLDMED_JOB_RETENTION_HOURS; 0 mantém todas)
+JOB_RETENTION = timedelta(hours=float(os.environ.get('HOLDMED_JOB_RETENTION_HOURS', 24)))
+
+# Intervalo entre as limpezas de tarefas antigas e linhas apagadas por transação
+PURGE_INTERVAL = 300.0
+PURGE_BATCH_SIZE = 5000
+
+# Funções executadas nos processos de trabalho, por tipo de tarefa.
+# Recebem apenas o payload (dados simples) e não acessam o banco.
+_TASKS = {}
+
+# Funções executadas no processo do servidor ao concluir uma tarefa, para gravar o resultado
+_COMPLETIONS = {}
+
+
+def task(kind, on_complete=None):
+    """
+    Registra a função de um tipo de tarefa.
+    on_complete(job, result): chamada no servidor, dentro da transação que conclui a tarefa. Pode
+    retornar uma função sem argumentos, executada só depois do commit (ex.: publicar eventos).
+    """
+    def decorator(function):
+        _TASKS[kind] = function
+        if on_complete is not None:
+            _COMPLETIONS[kind] = on_complete
+        return function
+    return decorator
+
+
+def _execute(kind, payload):
+    # Ponto de entrada nos processos de trabalho
+    return _TASKS[kind](payload)
+
+
+class JobQueue:
+    """
+    Fila de tarefas persistida na tabela Job e executada em um pool de processos local.
+
+    enqueue grava a tarefa e retorna imediatamente; uma thread despachante reserva as
+    tarefas pendentes, envia-as ao pool e grava os resultados de volta no banco.
+    Com HOLDMED_JOB_WORKERS=0 as tarefas rodam em uma thread do próprio processo.
+    """
+
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers
+        self.app = None
+        self._executor = None
+        self._dispatcher = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._completed = queue.Queue()
+        self._in_flight = 0
+        self._purged_at = 0.0
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['job_queue'] = self
+
+    def _ensure_started(self):
+        # Pool e thread só são criados no primeiro uso, depois de um eventual fork do servidor
+        if self._dispatcher is not None and self._dispatcher.is_alive():
+            return
+        with self._lock:
+            if self._dispatcher is None or not self._dispatcher.is_alive():
+                workers = self.max_workers if self.max_workers is not None else (os.cpu_count() or 1)
+                if workers == 0:
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='job-worker')
+                    self._capacity = 1
+                else:
+                    self._executor = ProcessPoolExecutor(max_workers=workers)
+                    self._capacity = workers
+                self._in_flight = 0
+                self._dispatcher = threading.Thread(target=self._run, name='job-dispatcher', daemon=True)
+                self._dispatcher.start()
+
+    def enqueue(self, kind: str, payload: dict, patient_id: int = None) -> Job:
+        """
+        Grava uma nova tarefa e acorda o despachante. Faz commit da sessão atual.
+        """
+        if kind not in _TASKS:
+            raise ValueError(f"Tipo de tarefa desconhecido: {kind}")
+
+        job = Job(kind=kind, payload=payload, patient_id=patient_id, status='queued')
+        db.session.add(job)
+        db.session.commit()
+
+        self.notify()
+        return job
+
+    def notify(self):
+        """
+        Acorda o despachante para tarefas gravadas diretamente na tabela (ex.: em lote).
+        """
+        self._ensure_started()
+        self._wake.set()
+
+    def _requeue_stale(self):
+        db.session.execute(
+            update(Job)
+            .where(Job.status == 'running', Job.started_at < datetime.utcnow() - STALE_JOB_TIMEOUT)
+            .values(status='queued', started_at=None)
+        )
+        db.session.commit()
+
+    def purge_finished(self, retention: timedelta = JOB_RETENTION) -> int:
+        """
+        Apaga as tarefas concluídas ou com falha há mais de retention (payload e resultado inclusos),
+        em lotes para não segurar o banco. Retorna o número de tarefas apagadas.
+        """
+        cutoff = datetime.utcnow() - retention
+        purged = 0
+        while True:
+            expired = select(Job.id).where(
+                Job.status.in_(('done', 'failed')), Job.finished_at < cutoff
+            ).limit(PURGE_BATCH_SIZE)
+            deleted = db.session.execute(
+                delete(Job).where(Job.id.in_(expired.scalar_subquery())), execution_options={'synchronize_session': False}
+            ).rowcount
+            db.session.commit()
+            purged += deleted
+            if deleted < PURGE_BATCH_SIZE:
+                return purged
+
+    def _claim(self, limit: int) -> list:
+        """
+        Reserva até limit tarefas pendentes. O UPDATE condicional garante que cada tarefa é
+        reservada por um único processo mesmo com vários servidores no mesmo banco.
+        """
+        claimed = []
+        candidates = Job.query.filter_by(status='queued').order_by(Job.id).limit(limit).all()
+        for job in candidates:
+            reserved = db.session.execute(
+                update(Job)
+                .where(Job.id == job.id, Job.status == 'queued')
+                .values(status='running', started_at=datetime.utcnow())
+            ).rowcount
+            if reserved:
+                claimed.append((job.id, job.kind, job.payload))
+        db.session.commit()
+        return claimed
+
+    def _submit(self, job_id, kind, payload):
+        future = self._executor.submit(_execute, kind, payload)
+        self._in_flight += 1
+
+        def done(completed_future):
+            self._completed.put((job_id, completed_future))
+            self._wake.set()
+
+        future.add_done_callback(done)
+
+    def _finish(self, job_id, future):
+        self._in_flight -= 1
+        job = db.session.get(Job, job_id)
+        if job is None:
+            return
+
+        after_commit = None
+        try:
+            result = future.result()
+            if job.kind in _COMPLETIONS:
+                after_commit = _COMPLETIONS[job.kind](job, result)
+            job.status = 'done'
+            job.result = result
+        except Exception as e:
+            db.session.rollback()
+            after_commit = None
+            job = db.session.get(Job, job_id)
+            job.status = 'failed'
+            job.error = str(e)
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        if after_commit is not None:
+            after_commit()
+
+    def _run(self):
+        with self.app.app_context():
+            self._requeue_stale()
+            while True:
+                self._wake.wait(timeout=POLL_INTERVAL)
+                self._wake.clear()
+                try:
+                    while not self._completed.empty():
+                        self._finish(*self._completed.get())
+
+                    free = self._capacity - self._in_flight
+                    if free > 0:
+                        for job_id, kind, payload in self._claim(free):
+                            self._submit(job_id, kind, payload)
+
+                    if JOB_RETENTION and time.monotonic() - self._purged_at >= PURGE_INTERVAL:
+                        self._purged_at = time.monotonic()
+                        self.purge_finished()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Erro no despachante de tarefas: {e}")
+                finally:
+                    db.session.remove()
+
+    def wait(self, job_id: int, timeout: float = 30.0) -> Job:
+        """
+        Espera uma tarefa terminar (útil em scripts e na CLI). Retorna a tarefa atualizada.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            db.session.expire_all()
+            job = db.session.get(Job, job_id)
+            if job.status in ('done', 'failed') or time.monotonic() >= deadline:
+                return job
+            time.sleep(0.05)
+
+
+# Instância compartilhada; o app é associado em main.py com job_queue.init_app(app)
+job_queue = JobQueue(
+    max_workers=int(os.environ['HOLDMED_JOB_WORKERS']) if 'HOLDMED_JOB_WORKERS' in os.environ else None
+)
+
+
+# Tipos de tarefa ------------------------------------------------------------
+
+def _store_note_extraction(job, result):
+    from extraction_cache import extraction_cache
+    extraction_cache.store(job.payload['note_id'], job.payload['content'], result)
+
+
+@task('process_note', on_complete=_store_note_extraction)
+def process_note_task(payload):
+    from nlp_service import nlp_service
+    return nlp_service.process_note(payload['content'] or '')
+
+
+@task('process_text')
+def process_text_task(payload):
+    from nlp_service import nlp_service
+    return {'original_notes': payload['notes'], **nlp_service.process_note(payload['notes'])}
+
+
+@task('predict_complications')
+def predict_complications_task(payload):
+    from model_registry import model_registry
+    return model_registry.get_agent().predict_complication(payload['patient_data'])
+
+
+def _store_dashboard_insight(job, result):
+    from insights import publish_alert, store_from_job
+
+    if job.payload.get('note_id') is not None and 'processed_notes' not in job.payload:
+        from extraction_cache import extraction_cache
+        notes = {key: value for key, value in result['processed_notes'].items() if key != 'original_notes'}
+        extraction_cache.store(job.payload['note_id'], job.payload['note_content'], notes)
+    alert = store_from_job(job, result)
+    return lambda: publish_alert(alert)
+
+
+@task('dashboard_insights', on_complete=_store_dashboard_insight)
+def dashboard_insights_task(payload):
+    from model_registry import model_registry
+    from nlp_service import nlp_service
+
+    agent = model_registry.get_agent()
+    prediction = agent.predict_complication(payload['patient_data'])
+
+    # A extração da nota vem pronta no payload quando já estava gravada
+    processed_notes = payload.get('processed_notes') or {'keywords': [], 'medical_terms': []}
+    if payload.get('note_id') is not None and 'processed_notes' not in payload:
+        processed_notes = {
+            'original_notes': payload['note_content'],
+            **nlp_service.process_note(payload['note_content'] or '')
+        }
+    return {
+        'prediction': prediction,
+        'processed_notes': processed_notes,
+        'insights': agent.generate_dashboard_insights(prediction, processed_notes),
+        'model_version': model_registry.version
+    }
@@ -12,35 +12,107 @@ PROJECT_ROOT = os.path.dirname(BACKEND_DIR)
 # Correct frontend dist path
 FRONTEND_DIST = os.path.join(PROJECT_ROOT, 'frontend', 'dist')
 
-app = Flask(__name__, static_folder=FRONTEND_DIST)
-app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
-
-# Habilitar CORS para permitir requisições do frontend
-CORS(app, origins="*")
-
 # Adiciona o diretório do projeto ao PYTHONPATH
 sys.path.append(BACKEND_DIR)
 
 from models.user import db
-from models.patient import Patient, VitalSigns, LabResults, ClinicalNotes
+from models.patient import Patient, VitalSigns, LabResults, ClinicalNotes, ClinicalNoteExtraction, PatientLatest, PatientOutcome, add_missing_columns, create_missing_indexes
+from models.job import Job
+from models.feature import PatientFeatures
+from models.timeseries import SeriesChunk, SeriesHead, SeriesRollup
+from models.risk import RiskScore
+from models.early_warning import PatientEarlyWarning, EarlyWarningAlert
+from models.search import NoteTerm
+from models.push import PushEvent
 from routes.user import user_bp
 from routes.patient import patient_bp
 from routes.ai import ai_bp
+from routes.ingest import ingest_bp
+from routes.jobs import jobs_bp
+from routes.stream import stream_bp
+from routes.metrics import metrics_bp
+from routes.health import health_bp
+from routes.risk import risk_bp
+from routes.early_warning import early_warning_bp
+from routes.search import search_bp
+from routes.data import data_bp
+import instrumentation
+import storage
+from early_warning import early_warning
+from features import feature_store
+from jobs import job_queue
+from note_search import note_search
+from push import event_broker
+from risk_board import risk_sweeper
+from timeseries import series_store
+from warmup import warmup
+
+def create_app(config=None):
+    """
+    Cria e configura a aplicação Flask.
+    config: dicionário opcional que sobrescreve a configuração padrão (ex.: SQLALCHEMY_DATABASE_URI).
+    """
+    app = Flask(__name__, static_folder=FRONTEND_DIST)
+    app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
+
+    # Habilitar CORS para permitir requisições do frontend
+    CORS(app, origins="*")
+
+    app.register_blueprint(user_bp, url_prefix='/api')
+    app.register_blueprint(patient_bp, url_prefix='/api')
+    app.register_blueprint(ai_bp, url_prefix='/api')
+    app.register_blueprint(ingest_bp, url_prefix='/api')
+    app.register_blueprint(jobs_bp, url_prefix='/api')
+    app.register_blueprint(stream_bp, url_prefix='/api')
+    app.register_blueprint(health_bp, url_prefix='/api')
+    app.register_blueprint(risk_bp, url_prefix='/api')
+    app.register_blueprint(early_warning_bp, url_prefix='/api')
+    app.register_blueprint(search_bp, url_prefix='/api')
+    app.register_blueprint(data_bp, url_prefix='/api')
+    # Caminho padrão de coleta do Prometheus, fora de /api
+    app.register_blueprint(metrics_bp)
+
+    # Database configuration (HOLDMED_DATABASE_URL aponta para outro banco; ver storage.py)
+    app.config['SQLALCHEMY_DATABASE_URI'] = storage.database_url(
+        f"sqlite:///{os.path.join(PROJECT_ROOT, 'database', 'app.db')}"
+    )
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config.update(config or {})
+    storage.configure(app)
+    db.init_app(app)
+    storage.init_app(app, db)
+    job_queue.init_app(app)
+    risk_sweeper.init_app(app)
+    event_broker.init_app(app)
+    instrumentation.init_app(app)
 
-app.register_blueprint(user_bp, url_prefix='/api')
-app.register_blueprint(patient_bp, url_prefix='/api')
-app.register_blueprint(ai_bp, url_prefix='/api')
+    with app.app_context():
+        db.create_all()
+        add_missing_columns()
+        create_missing_indexes()
+        # Índice de texto completo das notas (FTS5) e gatilhos; preenchido na criação
+        note_search.install()
+        # Banco com leituras anteriores ao snapshot: materializa as mais recentes uma única vez
+        if PatientLatest.query.first() is None and Patient.query.first() is not None:
+            PatientLatest.rebuild()
+        # Idem para os agregados das séries temporais e o estado das features do modelo
+        has_readings = VitalSigns.query.first() is not None or LabResults.query.first() is not None
+        if has_readings and SeriesHead.query.first() is None:
+            series_store.rebuild()
+        if has_readings and PatientFeatures.query.first() is None:
+            feature_store.rebuild()
+        if VitalSigns.query.first() is not None and PatientEarlyWarning.query.first() is None:
+            early_warning.rebuild()
+        if ClinicalNoteExtraction.query.first() is not None and NoteTerm.query.first() is None:
+            note_search.rebuild_terms()
 
-# Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(PROJECT_ROOT, 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
+    # Modelo de IA e spaCy: em segundo plano, agora ou no primeiro uso (ver warmup.py)
+    warmup.init_app(app)
 
-with app.app_context():
-    db.create_all()
+    app.add_url_rule('/', 'serve', serve, defaults={'path': ''})
+    app.add_url_rule('/<path:path>', 'serve', serve)
+    return app
 
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
 def serve(path):
     # First try to serve the requested file
     requested_path = os.path.join(FRONTEND_DIST, path)
@@ -99,4 +171,7 @@ if __name__ == '__main__':
     else:
         print(f"❌ Diretório frontend/dist não encontrado em: {FRONTEND_DIST}")
     
+    # O modelo de IA e o spaCy são carregados em segundo plano (HOLDMED_WARMUP); acompanhe em /api/health/ready
+    # Servidor de desenvolvimento; em produção use serve.py
+    app = create_app()
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,95 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from model_registry import model_registry
+
+
+class MicroBatcher:
+    """
+    Agrupa predições individuais que chegam quase ao mesmo tempo em uma única chamada
+    vetorizada a AIAgent.predict_batch.
+
+    Cada requisição entra em uma fila e recebe um Future. Uma thread de fundo espera até
+    max_wait_ms pelo próximo item (ou até juntar max_batch_size itens) e processa o lote
+    inteiro de uma vez.
+    """
+
+    def __init__(self, agent_getter, max_batch_size: int = 256, max_wait_ms: float = 5.0):
+        self.agent_getter = agent_getter
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        # A thread só é criada no primeiro uso, depois de um eventual fork do servidor
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+                self._thread.start()
+
+    def submit(self, patient_data: dict) -> Future:
+        """
+        Enfileira os dados de um paciente e retorna um Future com o resultado da predição.
+        """
+        self._ensure_started()
+        future = Future()
+        self._queue.put((patient_data, future))
+        return future
+
+    def predict(self, patient_data: dict, timeout: float = 30.0) -> dict:
+        """
+        Versão bloqueante de submit, com a mesma saída de AIAgent.predict_complication.
+        """
+        return self.submit(patient_data).result(timeout=timeout)
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            self._process(batch)
+
+    def _process(self, batch: list):
+        try:
+            agent = self.agent_getter()
+            results = agent.predict_batch(agent.features_matrix([data for data, _ in batch]))
+        except Exception:
+            # Um registro inválido não deve derrubar o lote inteiro: refaz um a um
+            self._process_individually(batch)
+            return
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _process_individually(self, batch: list):
+        for data, future in batch:
+            try:
+                future.set_result(self.agent_getter().predict_complication(data))
+            except Exception as e:
+                future.set_exception(e)
+
+
+# Instância compartilhada pelas rotas de IA
+micro_batcher = MicroBatcher(
+    model_registry.get_agent,
+    max_batch_size=int(os.environ.get('HOLDMED_BATCH_MAX_SIZE', 256)),
+    max_wait_ms=float(os.environ.get('HOLDMED_BATCH_MAX_WAIT_MS', 5))
+)
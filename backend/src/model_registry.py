@@ -0,0 +1,254 @@
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from ai_agent import AIAgent
+from instrumentation import span
+
+# Diretório padrão dos artefatos: backend/model_registry/<versão>/
+DEFAULT_REGISTRY_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'model_registry'
+)
+
+# Versão do formato em disco; incrementar ao mudar a estrutura dos artefatos
+FORMAT_VERSION = 1
+
+CURRENT_FILE = 'CURRENT'
+MODEL_FILE = 'model.joblib'
+METADATA_FILE = 'metadata.json'
+TARGET_COLUMN = 'complicação'
+
+
+def build_simulated_training_data(n_samples: int = 100):
+    """
+    Gera o conjunto de treinamento simulado (DataFrame) usado enquanto não há dados históricos reais.
+    """
+    import pandas as pd
+
+    return pd.DataFrame({
+        'sinais_vitais_pressao': np.random.rand(n_samples) * 50 + 80,
+        'sinais_vitais_temperatura': np.random.rand(n_samples) * 3 + 36,
+        'exames_laboratoriais_glicose': np.random.rand(n_samples) * 50 + 80,
+        'idade': np.random.randint(20, 80, n_samples),
+        TARGET_COLUMN: np.random.randint(0, 2, n_samples)
+    })
+
+
+class ModelRegistry:
+    """
+    Registro versionado de modelos treinados do AIAgent.
+
+    Cada versão fica em um subdiretório próprio (v0001, v0002, ...) contendo o modelo
+    serializado com joblib e um metadata.json com features e métricas. O arquivo CURRENT
+    aponta para a versão ativa. O modelo só é carregado no primeiro uso (memory-mapped) e
+    é recarregado automaticamente quando CURRENT muda, permitindo trocar de versão sem
+    reiniciar o servidor.
+    """
+
+    def __init__(self, root: str = None):
+        self.root = root or os.environ.get('HOLDMED_MODEL_REGISTRY', DEFAULT_REGISTRY_DIR)
+        self._lock = threading.Lock()
+        self._bootstrap_lock = threading.Lock()
+        # Processos filhos (ex.: pool de tarefas) não podem herdar um lock preso por outra thread
+        os.register_at_fork(after_in_child=self._reset_locks)
+        self._agent = None
+        self._version = None
+        self._pointer_stamp_loaded = None
+
+    def _reset_locks(self):
+        self._lock = threading.Lock()
+        self._bootstrap_lock = threading.Lock()
+
+    def _version_dir(self, version: str) -> str:
+        return os.path.join(self.root, version)
+
+    def _pointer_path(self) -> str:
+        return os.path.join(self.root, CURRENT_FILE)
+
+    def list_versions(self) -> list:
+        """
+        Lista os metadados de todas as versões registradas, da mais antiga para a mais nova.
+        """
+        if not os.path.isdir(self.root):
+            return []
+
+        versions = []
+        for name in sorted(os.listdir(self.root)):
+            metadata_path = os.path.join(self.root, name, METADATA_FILE)
+            if os.path.isfile(metadata_path):
+                with open(metadata_path, encoding='utf-8') as f:
+                    versions.append(json.load(f))
+        return versions
+
+    def current_version(self):
+        """
+        Retorna o nome da versão ativa ou None se nenhum modelo foi registrado.
+        """
+        try:
+            with open(self._pointer_path(), encoding='utf-8') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _claim_version_dir(self) -> str:
+        # os.mkdir é atômico: dois processos registrando ao mesmo tempo não colidem
+        os.makedirs(self.root, exist_ok=True)
+        existing = [int(name[1:]) for name in os.listdir(self.root) if name.startswith('v') and name[1:].isdigit()]
+        number = max(existing, default=0) + 1
+        while True:
+            version = f'v{number:04d}'
+            try:
+                os.mkdir(self._version_dir(version))
+                return version
+            except FileExistsError:
+                number += 1
+
+    def register(self, agent: AIAgent, metadata: dict = None, activate: bool = True) -> str:
+        """
+        Salva o modelo treinado de um AIAgent como uma nova versão.
+        metadata: informações adicionais (métricas, origem dos dados, tempo de treinamento).
+        activate: se True, a nova versão passa a ser a ativa.
+        """
+        if agent.model is None:
+            raise ValueError("Modelo de IA não treinado. Por favor, treine o modelo primeiro.")
+
+        import joblib
+        import sklearn
+
+        version = self._claim_version_dir()
+        version_dir = self._version_dir(version)
+        try:
+            # Sem compressão para permitir carregamento com mmap_mode
+            joblib.dump(agent.model, os.path.join(version_dir, MODEL_FILE))
+
+            full_metadata = {
+                **(metadata or {}),
+                'format_version': FORMAT_VERSION,
+                'version': version,
+                'created_at': datetime.utcnow().isoformat(),
+                'features': list(agent.features),
+                'sklearn_version': sklearn.__version__,
+            }
+            with open(os.path.join(version_dir, METADATA_FILE), 'w', encoding='utf-8') as f:
+                json.dump(full_metadata, f, ensure_ascii=False, indent=2)
+        except Exception:
+            shutil.rmtree(version_dir, ignore_errors=True)
+            raise
+
+        if activate:
+            self.activate(version)
+        return version
+
+    def activate(self, version: str):
+        """
+        Torna uma versão a ativa. Todos os processos que compartilham o diretório passam a
+        usá-la na próxima requisição.
+        """
+        if not os.path.isfile(os.path.join(self._version_dir(version), METADATA_FILE)):
+            raise ValueError(f"Versão de modelo não encontrada: {version}")
+
+        tmp_path = f'{self._pointer_path()}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(version)
+        os.replace(tmp_path, self._pointer_path())
+        self.reload()
+
+    def load(self, version: str) -> AIAgent:
+        """
+        Carrega uma versão específica do disco e retorna um AIAgent pronto para inferência.
+        """
+        version_dir = self._version_dir(version)
+        with open(os.path.join(version_dir, METADATA_FILE), encoding='utf-8') as f:
+            metadata = json.load(f)
+
+        if metadata.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Formato de modelo incompatível na versão {version}: {metadata.get('format_version')}")
+
+        import joblib
+
+        agent = AIAgent()
+        agent.model = joblib.load(os.path.join(version_dir, MODEL_FILE), mmap_mode='r')
+        agent.features = metadata['features']
+        agent.compile()
+        return agent
+
+    def train_and_register(self, data=None, target_column: str = TARGET_COLUMN,
+                           metadata: dict = None, activate: bool = True) -> str:
+        """
+        Treina um novo modelo e o registra. data: DataFrame; sem dados, usa o conjunto simulado.
+        """
+        source = 'provided'
+        if data is None:
+            data = build_simulated_training_data()
+            source = 'simulated'
+
+        agent = AIAgent()
+        accuracy = agent.train_model(data, target_column)
+        return self.register(agent, {
+            'source': source,
+            'target_column': target_column,
+            'training_samples': len(data),
+            'metrics': {'accuracy': accuracy},
+            **(metadata or {}),
+        }, activate=activate)
+
+    def reload(self):
+        """
+        Descarta o modelo em memória; a próxima chamada a get_agent carrega a versão ativa.
+        """
+        with self._lock:
+            self._agent = None
+            self._version = None
+            self._pointer_stamp_loaded = None
+
+    def _pointer_stamp(self):
+        # os.replace gera um novo inode, então (inode, mtime) muda a cada ativação
+        try:
+            stat = os.stat(self._pointer_path())
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _pointer_changed(self) -> bool:
+        return self._pointer_stamp() != self._pointer_stamp_loaded
+
+    def get_agent(self) -> AIAgent:
+        """
+        Retorna o AIAgent da versão ativa, carregando-o sob demanda.
+        Se nenhum modelo foi registrado ainda, treina e registra um modelo inicial.
+        """
+        agent = self._agent
+        if agent is not None and not self._pointer_changed():
+            return agent
+
+        if self.current_version() is None:
+            with self._bootstrap_lock:
+                if self.current_version() is None:
+                    print("Nenhum modelo registrado; treinando modelo inicial...")
+                    self.train_and_register()
+
+        with self._lock:
+            if self._agent is None or self._pointer_changed():
+                # Lê o carimbo de CURRENT antes da versão: se CURRENT mudar no meio, a próxima chamada recarrega
+                pointer_stamp = self._pointer_stamp()
+                version = self.current_version()
+                with span('model.load'):
+                    self._agent = self.load(version)
+                self._version = version
+                self._pointer_stamp_loaded = pointer_stamp
+            return self._agent
+
+    @property
+    def version(self):
+        """
+        Versão atualmente carregada em memória neste processo.
+        """
+        return self._version
+
+
+# Instância compartilhada pelas rotas
+model_registry = ModelRegistry()
@@ -0,0 +1,43 @@
+from datetime import datetime
+from models.user import db
+
+class PatientEarlyWarning(db.Model):
+    """
+    Estado do escore de alerta precoce (NEWS2) por paciente: último valor e pontos de cada
+    parâmetro, escore agregado e nível de risco. Atualizado na mesma transação de cada leitura.
+    """
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), primary_key=True)
+    score = db.Column(db.Integer, nullable=False, default=0)
+    level = db.Column(db.String(20), nullable=False, default='low')
+    state = db.Column(db.JSON, nullable=False, default=dict)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class EarlyWarningAlert(db.Model):
+    """
+    Alerta gerado quando o nível de risco NEWS2 de um paciente sobe, com os pontos de cada
+    parâmetro no momento da leitura que o disparou.
+    """
+    __table_args__ = (db.Index('ix_early_warning_alert_patient_id_id', 'patient_id', 'id'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False)
+    vital_signs_id = db.Column(db.Integer)
+    timestamp = db.Column(db.DateTime, nullable=False)
+    score = db.Column(db.Integer, nullable=False)
+    level = db.Column(db.String(20), nullable=False)
+    previous_level = db.Column(db.String(20))
+    parameters = db.Column(db.JSON, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'patient_id': self.patient_id,
+            'vital_signs_id': self.vital_signs_id,
+            'timestamp': self.timestamp.isoformat() if self.timestamp else None,
+            'score': self.score,
+            'level': self.level,
+            'previous_level': self.previous_level,
+            'parameters': self.parameters,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
@@ -0,0 +1,11 @@
+from datetime import datetime
+from models.user import db
+
+class PatientFeatures(db.Model):
+    """
+    Estado das features do modelo por paciente (último valor, variação, média móvel exponencial
+    e tendência de cada sinal), atualizado a cada leitura na mesma transação da inserção.
+    """
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), primary_key=True)
+    state = db.Column(db.JSON, nullable=False, default=dict)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,35 @@
+from datetime import datetime
+from models.user import db
+
+class Job(db.Model):
+    """
+    Tarefa de processamento em segundo plano (NLP, predição) e seu resultado.
+    """
+    __table_args__ = (
+        db.Index('ix_job_status_id', 'status', 'id'),
+        db.Index('ix_job_patient_id_kind', 'patient_id', 'kind', 'finished_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'))
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    payload = db.Column(db.JSON)
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'patient_id': self.patient_id,
+            'status': self.status,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
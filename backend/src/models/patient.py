@@ -1,15 +1,42 @@
-from flask_sqlalchemy import SQLAlchemy
+import hashlib
+import unicodedata
 from datetime import datetime
+from sqlalchemy import bindparam, event, func, inspect, select, update
+from sqlalchemy.schema import CreateIndex
+from models.user import db
 
-db = SQLAlchemy()
+# Linhas por UPDATE ao preencher uma coluna nova em um banco existente
+BACKFILL_BATCH_SIZE = 5000
+
+def normalize_name(value: str) -> str:
+    """
+    Minúsculas, sem acentos e com espaços simples: "Ávila" e "avila" ficam iguais.
+    """
+    decomposed = unicodedata.normalize('NFKD', value or '')
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(stripped.casefold().split())
+
+def _name_key_default(context):
+    # Calculada no INSERT, inclusive nas inserções em lote (insert(Patient) com uma lista de linhas)
+    return normalize_name(context.get_current_parameters().get('name'))
 
 class Patient(db.Model):
+    # Filtros da listagem (censo) de pacientes; a busca por prefixo do nome usa ix_patient_name_key
+    __table_args__ = (
+        db.Index('ix_patient_surgery_type_surgery_date', 'surgery_type', 'surgery_date'),
+        db.Index('ix_patient_surgery_date', 'surgery_date'),
+        db.Index('ix_patient_gender_age', 'gender', 'age'),
+        db.Index('ix_patient_age', 'age'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     age = db.Column(db.Integer)
     gender = db.Column(db.String(10))
     surgery_type = db.Column(db.String(100))
     surgery_date = db.Column(db.DateTime)
+    # Nome normalizado (normalize_name) para a busca por prefixo e a ordenação por nome; não é serializado
+    name_key = db.Column(db.String(100), default=_name_key_default, info={'derived': True})
     
     vital_signs = db.relationship('VitalSigns', backref='patient', lazy=True)
     lab_results = db.relationship('LabResults', backref='patient', lazy=True)
@@ -25,7 +52,16 @@ class Patient(db.Model):
             'surgery_date': self.surgery_date.isoformat() if self.surgery_date else None
         }
 
+# (nome normalizado, id): busca por prefixo e ordenação por nome com paginação por chave
+db.Index('ix_patient_name_key', Patient.name_key, Patient.id)
+
+@event.listens_for(Patient.name, 'set')
+def _update_name_key(target, value, oldvalue, initiator):
+    target.name_key = normalize_name(value)
+
 class VitalSigns(db.Model):
+    __table_args__ = (db.Index('ix_vital_signs_patient_id_timestamp', 'patient_id', 'timestamp'),)
+
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
@@ -50,6 +86,8 @@ class VitalSigns(db.Model):
         }
 
 class LabResults(db.Model):
+    __table_args__ = (db.Index('ix_lab_results_patient_id_timestamp', 'patient_id', 'timestamp'),)
+
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
@@ -74,6 +112,8 @@ class LabResults(db.Model):
         }
 
 class ClinicalNotes(db.Model):
+    __table_args__ = (db.Index('ix_clinical_notes_patient_id_timestamp', 'patient_id', 'timestamp'),)
+
     id = db.Column(db.Integer, primary_key=True)
     patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
@@ -91,3 +131,199 @@ class ClinicalNotes(db.Model):
             'author': self.author
         }
 
+class PatientOutcome(db.Model):
+    """
+    Desfecho observado do paciente (ocorrência de complicação), usado como rótulo no treinamento.
+    occurred_at: quando a complicação ocorreu; leituras posteriores não entram no treinamento.
+    """
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), primary_key=True)
+    complication = db.Column(db.Boolean, nullable=False)
+    occurred_at = db.Column(db.DateTime)
+    recorded_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'patient_id': self.patient_id,
+            'complication': self.complication,
+            'occurred_at': self.occurred_at.isoformat() if self.occurred_at else None,
+            'recorded_at': self.recorded_at.isoformat() if self.recorded_at else None
+        }
+
+class ClinicalNoteExtraction(db.Model):
+    """
+    Resultado da extração NLP de uma nota clínica (entidades, palavras-chave e termos médicos).
+    Notas sem linha nesta tabela ainda não foram processadas.
+    """
+    note_id = db.Column(db.Integer, db.ForeignKey('clinical_notes.id'), primary_key=True)
+    content_hash = db.Column(db.String(64), nullable=False)
+    extracted_entities = db.Column(db.JSON)
+    keywords = db.Column(db.JSON)
+    medical_terms = db.Column(db.JSON)
+    processed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @staticmethod
+    def hash_content(content):
+        return hashlib.sha256((content or '').encode('utf-8')).hexdigest()
+
+    def to_dict(self):
+        return {
+            'extracted_entities': self.extracted_entities,
+            'keywords': self.keywords,
+            'medical_terms': self.medical_terms
+        }
+
+class PatientLatest(db.Model):
+    """
+    Snapshot materializado das leituras mais recentes de cada paciente.
+    É atualizado na mesma transação de cada inserção, para que o dashboard leia uma única
+    linha por paciente em vez de ordenar cada tabela.
+    """
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), primary_key=True)
+    vital_signs_id = db.Column(db.Integer, db.ForeignKey('vital_signs.id'))
+    vital_signs_timestamp = db.Column(db.DateTime)
+    lab_results_id = db.Column(db.Integer, db.ForeignKey('lab_results.id'))
+    lab_results_timestamp = db.Column(db.DateTime)
+    clinical_notes_id = db.Column(db.Integer, db.ForeignKey('clinical_notes.id'))
+    clinical_notes_timestamp = db.Column(db.DateTime)
+
+    vital_signs = db.relationship('VitalSigns', lazy='joined')
+    lab_results = db.relationship('LabResults', lazy='joined')
+    clinical_notes = db.relationship('ClinicalNotes', lazy='joined')
+
+    SERIES = {
+        VitalSigns: 'vital_signs',
+        LabResults: 'lab_results',
+        ClinicalNotes: 'clinical_notes',
+    }
+
+    @classmethod
+    def _upsert(cls, series, values):
+        insert = dialect_insert(cls.__table__)
+        id_column, timestamp_column = f'{series}_id', f'{series}_timestamp'
+        current = getattr(cls.__table__.c, timestamp_column)
+        statement = insert.on_conflict_do_update(
+            index_elements=['patient_id'],
+            set_={
+                id_column: getattr(insert.excluded, id_column),
+                timestamp_column: getattr(insert.excluded, timestamp_column),
+            },
+            # Só substitui se a nova leitura for mais recente (inserções retroativas não regridem o snapshot)
+            where=current.is_(None) | (getattr(insert.excluded, timestamp_column) >= current)
+        )
+        db.session.execute(statement, values)
+
+    @classmethod
+    def record(cls, *rows):
+        """
+        Atualiza o snapshot com leituras recém-inseridas (VitalSigns, LabResults ou ClinicalNotes).
+        Deve ser chamado antes do commit, na mesma transação da inserção.
+        """
+        db.session.flush()
+        by_series = {}
+        for row in rows:
+            by_series.setdefault(cls.SERIES[type(row)], []).append((row.patient_id, row.id, row.timestamp))
+        for series, readings in by_series.items():
+            cls.record_readings(series, readings)
+
+    @classmethod
+    def record_readings(cls, series, readings):
+        """
+        Versão em lote de record para inserções feitas sem objetos ORM.
+        readings: tuplas (patient_id, id, timestamp) de uma série ('vital_signs', 'lab_results' ou 'clinical_notes').
+        """
+        newest = {}
+        for patient_id, row_id, timestamp in readings:
+            if patient_id not in newest or (timestamp, row_id) >= newest[patient_id]:
+                newest[patient_id] = (timestamp, row_id)
+
+        if newest:
+            cls._upsert(series, [
+                {'patient_id': patient_id, f'{series}_id': row_id, f'{series}_timestamp': timestamp}
+                for patient_id, (timestamp, row_id) in newest.items()
+            ])
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Reconstrói todos os snapshots a partir das tabelas de leituras (ex.: banco pré-existente).
+        """
+        for model, series in cls.SERIES.items():
+            row_number = func.row_number().over(
+                partition_by=model.patient_id, order_by=(model.timestamp.desc(), model.id.desc())
+            ).label('row_number')
+            ranked = select(model.patient_id, model.id, model.timestamp, row_number).subquery()
+            latest = db.session.execute(
+                select(ranked.c.patient_id, ranked.c.id, ranked.c.timestamp).where(ranked.c.row_number == 1)
+            ).all()
+            if latest:
+                cls._upsert(series, [
+                    {'patient_id': patient_id, f'{series}_id': row_id, f'{series}_timestamp': timestamp}
+                    for patient_id, row_id, timestamp in latest
+                ])
+        db.session.commit()
+
+
+class PatientInsight(db.Model):
+    """
+    Insights do dashboard pré-calculados por paciente.
+    Guarda o corpo completo da resposta, as leituras e a versão do modelo usadas no cálculo e
+    um ETag; o snapshot só é válido enquanto essas fontes forem as mais recentes.
+    """
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), primary_key=True)
+    vital_signs_id = db.Column(db.Integer)
+    lab_results_id = db.Column(db.Integer)
+    clinical_notes_id = db.Column(db.Integer)
+    model_version = db.Column(db.String(20))
+    body = db.Column(db.JSON, nullable=False)
+    etag = db.Column(db.String(64), nullable=False)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+def dialect_insert(table):
+    """
+    INSERT do dialeto do banco em uso, com on_conflict_do_update/on_conflict_do_nothing
+    (mesma API no SQLite e no PostgreSQL). Usado pelos upserts dos demais módulos.
+    """
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
+
+def add_missing_columns():
+    """
+    db.create_all não acrescenta colunas a tabelas que já existem; adiciona as que faltarem (todas
+    aceitam nulo) e preenche o nome normalizado dos pacientes já cadastrados.
+    """
+    existing = inspect(db.engine)
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if not existing.has_table(table.name):
+                continue
+            present = {column['name'] for column in existing.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in present:
+                    column_type = column.type.compile(dialect=connection.dialect)
+                    connection.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}')
+
+        patients = Patient.__table__
+        statement = (update(patients).where(patients.c.id == bindparam('patient_id'))
+                     .values(name_key=bindparam('key')))
+        while True:
+            rows = connection.execute(
+                select(patients.c.id, patients.c.name).where(patients.c.name_key.is_(None)).limit(BACKFILL_BATCH_SIZE)
+            ).all()
+            if not rows:
+                break
+            connection.execute(statement, [{'patient_id': patient_id, 'key': normalize_name(name)} for patient_id, name in rows])
+
+
+def create_missing_indexes():
+    """
+    db.create_all não cria índices novos em tabelas que já existem; cria os que faltarem.
+    """
+    # IF NOT EXISTS em vez de checkfirst: a reflexão do SQLite não enxerga índices de expressão
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                connection.execute(CreateIndex(index, if_not_exists=True))
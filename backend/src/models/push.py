@@ -0,0 +1,17 @@
+from datetime import datetime
+from models.user import db
+
+class PushEvent(db.Model):
+    """
+    Evento de tempo real (nova leitura, alerta) repassado entre os processos do servidor:
+    com vários workers, cada processo lê os eventos novos desta tabela e os entrega às
+    conexões Server-Sent Events abertas nele (ver push.py). Apagado depois de alguns minutos.
+    """
+    __table_args__ = (db.Index('ix_push_event_created_at', 'created_at'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    event = db.Column(db.String(50), nullable=False)
+    patient_id = db.Column(db.Integer, nullable=False)
+    # Dados do evento já codificados em JSON
+    data = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
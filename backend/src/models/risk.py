@@ -0,0 +1,20 @@
+from datetime import datetime
+from models.user import db
+
+class RiskScore(db.Model):
+    """
+    Resultado da última varredura de risco da enfermaria: um registro por paciente ativo,
+    com a probabilidade de complicação e a posição no ranking (1 = maior risco).
+    A tabela inteira é substituída a cada varredura, na mesma transação.
+    """
+    __table_args__ = (db.Index('ix_risk_score_rank', 'rank'),)
+
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), primary_key=True)
+    rank = db.Column(db.Integer, nullable=False)
+    score = db.Column(db.Float, nullable=False)
+    complication_predicted = db.Column(db.Boolean, nullable=False)
+    # Leituras usadas no cálculo
+    vital_signs_id = db.Column(db.Integer)
+    lab_results_id = db.Column(db.Integer)
+    model_version = db.Column(db.String(20))
+    scored_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,13 @@
+from models.user import db
+
+class NoteTerm(db.Model):
+    """
+    Índice invertido das extrações NLP das notas clínicas: um termo normalizado (minúsculas, sem
+    acentos) por nota e tipo (entity, keyword ou medical_term). A chave primária começa pelo termo,
+    então as notas de um termo são lidas por um intervalo do índice, já ordenadas por nota.
+    """
+    __table_args__ = (db.Index('ix_note_term_note_id', 'note_id'),)
+
+    term = db.Column(db.String(200), primary_key=True)
+    kind = db.Column(db.String(20), primary_key=True)
+    note_id = db.Column(db.Integer, db.ForeignKey('clinical_notes.id'), primary_key=True)
@@ -0,0 +1,47 @@
+from models.user import db
+
+class SeriesChunk(db.Model):
+    """
+    Bloco imutável de leituras de uma série (sinais vitais ou exames) de um paciente, em formato
+    colunar: timestamps e cada campo são arrays NumPy comprimidos, ordenados por tempo.
+    """
+    __table_args__ = (
+        db.Index('ix_series_chunk_patient_series_start', 'patient_id', 'series', 'start_time'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), nullable=False)
+    series = db.Column(db.String(20), nullable=False)
+    start_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(db.DateTime, nullable=False)
+    first_id = db.Column(db.Integer, nullable=False)
+    last_id = db.Column(db.Integer, nullable=False)
+    count = db.Column(db.Integer, nullable=False)
+    fields = db.Column(db.JSON, nullable=False)
+    timestamps = db.Column(db.LargeBinary, nullable=False)
+    values = db.Column(db.LargeBinary, nullable=False)
+
+class SeriesHead(db.Model):
+    """
+    Ponta de escrita de cada série por paciente: até onde as leituras já foram compactadas em
+    blocos e quantas ainda estão só na tabela de origem.
+    """
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), primary_key=True)
+    series = db.Column(db.String(20), primary_key=True)
+    sealed_through_id = db.Column(db.Integer, nullable=False, default=0)
+    pending_count = db.Column(db.Integer, nullable=False, default=0)
+
+class SeriesRollup(db.Model):
+    """
+    Agregados por intervalo de tempo (contagem, soma, mínimo e máximo) de cada campo de uma série.
+    resolution é a largura do intervalo e bucket o seu início, ambos em segundos (bucket desde 1970, UTC).
+    """
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), primary_key=True)
+    series = db.Column(db.String(20), primary_key=True)
+    resolution = db.Column(db.Integer, primary_key=True)
+    bucket = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    field = db.Column(db.String(50), primary_key=True)
+    count = db.Column(db.Integer, nullable=False)
+    sum = db.Column(db.Float, nullable=False)
+    min = db.Column(db.Float, nullable=False)
+    max = db.Column(db.Float, nullable=False)
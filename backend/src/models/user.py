@@ -1,6 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
+from storage import RoutingSession
 
-db = SQLAlchemy()
+# Leituras de requisições GET podem ir para uma réplica (ver storage.RoutingSession)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -0,0 +1,120 @@
+import os
+import threading
+
+from instrumentation import span
+
+# Modelo de linguagem do spaCy para português
+MODEL_NAME = os.environ.get('HOLDMED_SPACY_MODEL', 'pt_core_news_sm')
+
+# Baixar o modelo se não estiver instalado (acesso à rede; sem rede o download trava a carga)
+AUTO_DOWNLOAD = os.environ.get('HOLDMED_SPACY_DOWNLOAD', '').lower() in ('1', 'true', 'yes')
+
+# Componentes usados pela extração: só o reconhecimento de entidades.
+# Tokenização e atributos léxicos (is_stop, is_punct, is_alpha) não dependem de componentes.
+REQUIRED_COMPONENTS = ('ner',)
+
+
+class NLPService:
+    """
+    Pipeline spaCy compartilhado por todo o processo.
+
+    O spaCy só é importado e o modelo só é carregado no primeiro uso (ou no aquecimento, ver
+    warmup.py), uma única vez, com os componentes que a extração não utiliza desativados. process_notes_batch processa várias notas com nlp.pipe.
+    """
+
+    def __init__(self, model_name: str = MODEL_NAME, batch_size: int = 64, n_process: int = 1):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.n_process = n_process
+        self._nlp = None
+        self._lock = threading.Lock()
+        # Processos filhos (ex.: pool de tarefas) não podem herdar um lock preso por outra thread
+        os.register_at_fork(after_in_child=self._reset_locks)
+
+    def _reset_locks(self):
+        self._lock = threading.Lock()
+
+    def _load(self):
+        import spacy
+
+        try:
+            nlp = spacy.load(self.model_name)
+        except OSError:
+            if not AUTO_DOWNLOAD:
+                raise OSError(
+                    f"Modelo {self.model_name} do spaCy não instalado. Execute "
+                    f"'python -m spacy download {self.model_name}' ou defina HOLDMED_SPACY_DOWNLOAD=1."
+                ) from None
+            print(f"Baixando modelo {self.model_name} do spaCy...")
+            spacy.cli.download(self.model_name)
+            nlp = spacy.load(self.model_name)
+
+        # Mantém os componentes necessários e os tok2vec compartilhados que eles escutam
+        needed = set(REQUIRED_COMPONENTS)
+        for name, pipe in nlp.pipeline:
+            if needed & set(getattr(pipe, 'listening_components', [])):
+                needed.add(name)
+        nlp.select_pipes(disable=[name for name in nlp.pipe_names if name not in needed])
+        return nlp
+
+    @property
+    def nlp(self):
+        if self._nlp is None:
+            with self._lock:
+                if self._nlp is None:
+                    with span('nlp.load'):
+                        self._nlp = self._load()
+        return self._nlp
+
+    @property
+    def loaded(self) -> bool:
+        return self._nlp is not None
+
+    def load(self):
+        """
+        Carrega o pipeline agora em vez de no primeiro uso (pré-carregamento no servidor).
+        """
+        return self.nlp
+
+    @staticmethod
+    def _extract(doc) -> dict:
+        entities = [(ent.text, ent.label_) for ent in doc.ents]
+        keywords = [token.text for token in doc if not token.is_stop and not token.is_punct and token.is_alpha]
+
+        # Exemplo de extração de termos médicos ou condições
+        medical_terms = [token.text for token in doc if token.ent_type_ == "DISEASE" or token.ent_type_ == "SYMPTOM"]
+
+        return {
+            "extracted_entities": entities,
+            "keywords": list(set(keywords)),
+            "medical_terms": list(set(medical_terms))
+        }
+
+    def process_note(self, notes: str) -> dict:
+        """
+        Extrai entidades, palavras-chave e termos médicos de uma nota clínica.
+        """
+        nlp = self.nlp
+        with span('nlp.process'):
+            return self._extract(nlp(notes))
+
+    def process_notes_batch(self, notes: list, batch_size: int = None, n_process: int = None) -> list:
+        """
+        Processa várias notas de uma vez com nlp.pipe, na mesma ordem da entrada.
+        batch_size: notas por lote interno do spaCy.
+        n_process: processos usados pelo spaCy (1 processa no próprio processo).
+        """
+        docs = self.nlp.pipe(
+            notes,
+            batch_size=batch_size or self.batch_size,
+            n_process=n_process or self.n_process
+        )
+        with span('nlp.process_batch'):
+            return [self._extract(doc) for doc in docs]
+
+
+# Instância compartilhada pelo agente de IA e pelas rotas
+nlp_service = NLPService(
+    batch_size=int(os.environ.get('HOLDMED_NLP_BATCH_SIZE', 64)),
+    n_process=int(os.environ.get('HOLDMED_NLP_PROCESSES', 1))
+)
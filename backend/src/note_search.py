@@ -0,0 +1,372 @@
+"""
+Busca nas notas clínicas: índice de texto completo (FTS5 do SQLite) sobre o conteúdo das notas e
+índice invertido dos termos extraídos pelo NLP (entidades, palavras-chave e termos médicos).
+
+O índice FTS5 usa a própria tabela clinical_notes como conteúdo externo (o texto não é duplicado)
+e é mantido por gatilhos no banco: qualquer inserção de nota (pela API, em lote ou direto no banco)
+entra no índice na mesma transação. O tokenizador unicode61 com remove_diacritics 2 ignora acentos
+e maiúsculas, então "infeccao" encontra "Infecção". Os termos extraídos vão para NoteTerm quando a
+extração da nota é gravada (ExtractionCache.store e /clinical-notes/process-pending), normalizados
+da mesma forma.
+
+Fora do SQLite (ou em um SQLite sem FTS5) a busca textual recorre a LIKE sobre o conteúdo, sem
+ranking nem trechos.
+"""
+import os
+import re
+
+from sqlalchemy import Integer, Text, and_, column, delete, func, literal_column, null, or_, select, table, text, tuple_
+from sqlalchemy.exc import OperationalError
+
+from models.patient import ClinicalNoteExtraction, ClinicalNotes, dialect_insert, db, normalize_name
+from models.search import NoteTerm
+
+FTS_TABLE = 'clinical_notes_fts'
+
+# Tabela virtual fora do metadata: db.create_all não tenta criá-la
+notes_fts = table(FTS_TABLE, column('rowid', Integer), column('content', Text))
+fts = literal_column(FTS_TABLE)
+
+FTS_DDL = (
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        content, content='clinical_notes', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON clinical_notes BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, content) VALUES (new.id, new.content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON clinical_notes BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content) VALUES ('delete', old.id, old.content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF content ON clinical_notes BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content) VALUES ('delete', old.id, old.content);
+        INSERT INTO {FTS_TABLE}(rowid, content) VALUES (new.id, new.content);
+    END""",
+)
+
+# Tipos de termo do índice invertido, pelo campo da extração de onde vêm
+TERM_KINDS = {
+    'entity': 'extracted_entities',
+    'keyword': 'keywords',
+    'medical_term': 'medical_terms',
+}
+
+MAX_TERM_LENGTH = 200
+
+# Linhas por INSERT ao gravar termos e extrações lidas por vez na reconstrução
+INSERT_BATCH_SIZE = 5000
+
+# Trecho com os termos encontrados: marcadores e número de palavras
+SNIPPET_MARKERS = ('<mark>', '</mark>')
+SNIPPET_TOKENS = 16
+
+SORTS = ('relevance', 'recent')
+
+# Notas mais recentes, entre as que atendem à busca, ordenadas por relevância (0 ordena todas).
+# O bm25 é calculado por nota; sem a janela, um termo comum em milhões de notas pontuaria todas.
+RANK_WINDOW = int(os.environ.get('HOLDMED_NOTE_SEARCH_RANK_WINDOW', 2000))
+
+# Palavra (com * opcional para prefixo) ou "frase entre aspas"
+_QUERY_TOKEN = re.compile(r'"([^"]*)"|(\w+\*?)')
+_WORD = re.compile(r'\w+')
+
+
+def normalize_term(value: str) -> str:
+    """
+    Minúsculas, sem acentos e com espaços simples: a mesma normalização do tokenizador do FTS5.
+    """
+    return normalize_name(value)[:MAX_TERM_LENGTH]
+
+
+def extraction_terms(result: dict) -> set:
+    """
+    Pares (termo normalizado, tipo) de uma extração de nlp_service.process_note.
+    """
+    terms = set()
+    for kind, field in TERM_KINDS.items():
+        for value in result.get(field) or ():
+            # Entidades vêm como (texto, rótulo)
+            term = normalize_term(value[0] if isinstance(value, (list, tuple)) else value)
+            if term:
+                terms.add((term, kind))
+    return terms
+
+
+def fts_query(value: str, any_term: bool = False) -> str:
+    """
+    Converte o texto digitado em uma expressão FTS5: cada palavra e cada "frase entre aspas" vira
+    uma string entre aspas (operadores e pontuação não são interpretados, então não há erro de
+    sintaxe) e palavra* busca por prefixo. Todas precisam aparecer, ou qualquer uma com any_term.
+    """
+    parts = []
+    for phrase, word in _QUERY_TOKEN.findall(value):
+        if phrase:
+            words = _WORD.findall(phrase)
+            if words:
+                parts.append('"' + ' '.join(words) + '"')
+        elif word.endswith('*'):
+            parts.append(f'"{word[:-1]}"*')
+        else:
+            parts.append(f'"{word}"')
+    return (' OR ' if any_term else ' AND ').join(parts)
+
+
+class NoteSearch:
+    """
+    Índices de busca das notas clínicas e a consulta usada por GET /notes/search.
+    """
+
+    # Colunas de cada resultado, na ordem da resposta
+    names = ('id', 'patient_id', 'timestamp', 'note_type', 'author', 'content', 'rank', 'snippet')
+
+    def __init__(self):
+        # FTS5 disponível no banco principal (definido em install)
+        self.full_text = False
+
+    def install(self):
+        """
+        Cria o índice FTS5 e os gatilhos que o mantêm, se faltarem (dentro de um app_context).
+        Um índice criado agora é preenchido com as notas já existentes.
+        """
+        self.full_text = False
+        if db.engine.dialect.name != 'sqlite':
+            return
+        try:
+            with db.engine.begin() as connection:
+                exists = connection.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': FTS_TABLE}
+                ).first()
+                for statement in FTS_DDL:
+                    connection.execute(text(statement))
+                if exists is None:
+                    connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        except OperationalError as e:
+            # SQLite compilado sem FTS5: a busca textual usa LIKE
+            print(f"Índice de texto completo indisponível ({e.orig}); a busca nas notas usará LIKE")
+            return
+        self.full_text = True
+
+    def index_extractions(self, extractions):
+        """
+        Grava no índice invertido os termos de extrações recém-gravadas, substituindo os anteriores
+        das mesmas notas. Usa a sessão atual; o commit fica com quem chama.
+        extractions: pares (note_id, resultado de nlp_service.process_note).
+        """
+        extractions = list(extractions)
+        if not extractions:
+            return
+        db.session.execute(delete(NoteTerm).where(NoteTerm.note_id.in_([note_id for note_id, _ in extractions])))
+        rows = [
+            {'term': term, 'kind': kind, 'note_id': note_id}
+            for note_id, result in extractions
+            for term, kind in extraction_terms(result)
+        ]
+        # Duas gravações da mesma nota ao mesmo tempo (requisição e tarefa) inserem os mesmos termos
+        statement = dialect_insert(NoteTerm.__table__).on_conflict_do_nothing()
+        for start in range(0, len(rows), INSERT_BATCH_SIZE):
+            db.session.execute(statement, rows[start:start + INSERT_BATCH_SIZE])
+
+    def rebuild_terms(self):
+        """
+        Preenche o índice invertido a partir das extrações já gravadas (ex.: banco pré-existente).
+        """
+        db.session.execute(delete(NoteTerm))
+        fields = [getattr(ClinicalNoteExtraction, field) for field in TERM_KINDS.values()]
+        last_id = 0
+        while True:
+            rows = db.session.execute(
+                select(ClinicalNoteExtraction.note_id, *fields)
+                .where(ClinicalNoteExtraction.note_id > last_id)
+                .order_by(ClinicalNoteExtraction.note_id)
+                .limit(INSERT_BATCH_SIZE)
+            ).all()
+            if not rows:
+                break
+            self.index_extractions(
+                (row[0], dict(zip(TERM_KINDS.values(), row[1:]))) for row in rows
+            )
+            last_id = rows[-1][0]
+        db.session.commit()
+
+    def search(self, query: str = None, any_term: bool = False, terms=(), patient_ids=(), note_types=(),
+               since=None, until=None, sort: str = 'relevance', after: list = None, limit: int = 20):
+        """
+        Uma página de notas que atendem à busca.
+        query: texto para o índice FTS5; terms: pares (termo, tipo) que a nota precisa ter no índice
+        invertido. sort: relevance (bm25, só com query) ou recent (ordem de registro, mais novas antes).
+        after: chave de continuação retornada pela página anterior.
+        Retorna (linhas na ordem de names, ordenação usada, chave da próxima página ou None).
+        Um query sem palavras (só pontuação) não encontra nenhuma nota.
+        """
+        expression = fts_query(query, any_term) if query else ''
+        if query and not expression:
+            return [], sort, None
+        filters = (terms, patient_ids, note_types, since, until)
+        if not (expression and self.full_text):
+            conditions = self._filters(*filters)
+            if expression:
+                conditions.append(self._like(query, any_term))
+            return self._search_notes(conditions, after, limit)
+
+        if sort == 'relevance':
+            page, next_key = self._relevance_page(expression, filters, after, limit)
+        else:
+            page, next_key = self._recent_page(expression, filters, after[0] if after is not None else None, limit)
+        return self._page_rows(page, expression), sort, next_key
+
+    def count(self, query: str = None, any_term: bool = False, terms=(), patient_ids=(), note_types=(),
+              since=None, until=None) -> int:
+        """
+        Total de notas que atendem à busca (mesmos filtros de search, sem ordenação nem página).
+        """
+        expression = fts_query(query, any_term) if query else ''
+        if query and not expression:
+            return 0
+        filters = (terms, patient_ids, note_types, since, until)
+        if expression and self.full_text:
+            return db.session.execute(self._matches(expression, filters, func.count())).scalar()
+        conditions = self._filters(*filters)
+        if expression:
+            conditions.append(self._like(query, any_term))
+        return db.session.execute(select(func.count()).select_from(ClinicalNotes).where(*conditions)).scalar()
+
+    def _matches(self, expression: str, filters: tuple, *columns):
+        """
+        SELECT das colunas sobre as notas que atendem à expressão FTS5 e aos filtros.
+        Paciente e termos extraídos (seletivos) viram listas de ids montadas uma única vez; o "+ 0"
+        impede que o FTS5 receba a lista como restrição e reabra a busca para cada id, recalculando
+        as estatísticas do bm25 a cada vez. Tipo de nota e período são conferidos em cada nota encontrada.
+        """
+        terms, patient_ids, note_types, since, until = filters
+        statement = select(*columns).select_from(notes_fts).where(fts.op('MATCH')(expression))
+        candidate = notes_fts.c.rowid + 0
+        if patient_ids:
+            statement = statement.where(candidate.in_(
+                select(ClinicalNotes.id).where(ClinicalNotes.patient_id.in_(patient_ids))
+            ))
+        for term, kind in terms:
+            statement = statement.where(candidate.in_(self._term_notes(term, kind)))
+        conditions = self._note_filters(note_types, since, until)
+        if conditions:
+            statement = statement.join(ClinicalNotes, ClinicalNotes.id == notes_fts.c.rowid).where(*conditions)
+        return statement
+
+    def _recent_page(self, expression: str, filters: tuple, before, limit: int):
+        # Ordem decrescente de rowid: o FTS5 percorre o índice nessa ordem e para no limite
+        rowid = notes_fts.c.rowid
+        statement = self._matches(expression, filters, rowid, null())
+        if before is not None:
+            statement = statement.where(rowid < before)
+        page = db.session.execute(statement.order_by(rowid.desc()).limit(limit + 1)).all()
+        if len(page) > limit:
+            page = page[:limit]
+            # limit 0 (página já cheia): a próxima começa em "before"
+            return page, [page[-1][0] if page else before]
+        return page, None
+
+    def _relevance_page(self, expression: str, filters: tuple, after: list, limit: int):
+        """
+        Página por relevância: bm25 só nas RANK_WINDOW notas mais recentes que atendem à busca;
+        as demais vêm depois delas, sem ranking, da mais nova para a mais antiga. A chave é
+        [piso da janela, rank, id], com rank None já fora da janela.
+        """
+        rowid = notes_fts.c.rowid
+        # O piso da janela vai no cursor para que as páginas seguintes usem a mesma janela
+        floor = after[0] if after is not None else self._window_floor(expression, filters)
+        page = []
+        if after is None or after[1] is not None:
+            rank = func.bm25(fts)
+            statement = self._matches(expression, filters, rowid, rank)
+            if floor is not None:
+                statement = statement.where(rowid >= floor)
+            if after is not None:
+                statement = statement.where(tuple_(rank, rowid) > (after[1], after[2]))
+            page = db.session.execute(statement.order_by(rank, rowid).limit(limit + 1)).all()
+            if len(page) > limit:
+                page = page[:limit]
+                last_id, last_rank = page[-1]
+                return page, [floor, last_rank, last_id]
+            if floor is None:
+                return page, None
+            before = floor
+        else:
+            before = after[2]
+
+        # Janela esgotada: completa a página com as notas mais antigas que o piso
+        tail, tail_key = self._recent_page(expression, filters, before, limit - len(page))
+        page += tail
+        if tail_key is None:
+            return page, None
+        return page, [floor, None, tail_key[0]]
+
+    def _window_floor(self, expression: str, filters: tuple):
+        # rowid da RANK_WINDOW-ésima nota mais recente que atende à busca; None se houver menos
+        if not RANK_WINDOW:
+            return None
+        rowid = notes_fts.c.rowid
+        return db.session.execute(
+            self._matches(expression, filters, rowid).order_by(rowid.desc()).offset(RANK_WINDOW - 1).limit(1)
+        ).scalar()
+
+    def _page_rows(self, page: list, expression: str) -> list:
+        """
+        Colunas das notas da página e o trecho com os termos encontrados, só para as linhas da página.
+        """
+        ids = [row_id for row_id, _ in page]
+        if not ids:
+            return []
+        notes = {row[0]: row for row in db.session.execute(select(*self._columns()).where(ClinicalNotes.id.in_(ids)))}
+        snippets = dict(db.session.execute(
+            select(notes_fts.c.rowid, func.snippet(fts, 0, *SNIPPET_MARKERS, '…', SNIPPET_TOKENS))
+            .where(fts.op('MATCH')(expression), notes_fts.c.rowid.in_(ids))
+        ).all())
+        return [(*notes[row_id], rank, snippets.get(row_id)) for row_id, rank in page if row_id in notes]
+
+    def _search_notes(self, conditions: list, after: list, limit: int):
+        # Sem texto para o FTS5: filtros e termos direto em clinical_notes, mais recentes antes
+        statement = select(*self._columns(), null(), null()).where(*conditions)
+        if after is not None:
+            statement = statement.where(ClinicalNotes.id < after[0])
+        rows = db.session.execute(statement.order_by(ClinicalNotes.id.desc()).limit(limit + 1)).all()
+        if len(rows) > limit:
+            return rows[:limit], 'recent', [rows[limit - 1][0]]
+        return rows, 'recent', None
+
+    @staticmethod
+    def _columns() -> list:
+        return [ClinicalNotes.id, ClinicalNotes.patient_id, ClinicalNotes.timestamp, ClinicalNotes.note_type,
+                ClinicalNotes.author, ClinicalNotes.content]
+
+    @classmethod
+    def _filters(cls, terms, patient_ids, note_types, since, until) -> list:
+        conditions = cls._note_filters(note_types, since, until)
+        if patient_ids:
+            conditions.append(ClinicalNotes.patient_id.in_(patient_ids))
+        for term, kind in terms:
+            conditions.append(ClinicalNotes.id.in_(cls._term_notes(term, kind)))
+        return conditions
+
+    @staticmethod
+    def _note_filters(note_types, since, until) -> list:
+        conditions = []
+        if note_types:
+            conditions.append(ClinicalNotes.note_type.in_(note_types))
+        if since:
+            conditions.append(ClinicalNotes.timestamp >= since)
+        if until:
+            conditions.append(ClinicalNotes.timestamp < until)
+        return conditions
+
+    @staticmethod
+    def _term_notes(term: str, kind: str):
+        # Notas com o termo: um intervalo da chave primária de NoteTerm
+        return select(NoteTerm.note_id).where(NoteTerm.term == normalize_term(term), NoteTerm.kind == kind)
+
+    @staticmethod
+    def _like(query: str, any_term: bool):
+        patterns = [ClinicalNotes.content.ilike(f'%{word}%') for word in _WORD.findall(query)]
+        return or_(*patterns) if any_term else and_(*patterns)
+
+
+# Instância compartilhada pelas rotas e pelo cache de extrações
+note_search = NoteSearch()
@@ -0,0 +1,199 @@
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from models.push import PushEvent
+from models.user import db
+
+# Tópico que recebe os eventos de todos os pacientes (visão da ala)
+WARD_TOPIC = 'ward'
+
+# Eventos pendentes por assinante; um cliente lento demais é desconectado e reconecta
+MAX_PENDING_EVENTS = 1000
+
+# Intervalo do comentário de keep-alive enviado a conexões ociosas
+KEEPALIVE_INTERVAL = 15.0
+
+# Repasse dos eventos entre processos pela tabela push_event; serve.py o ativa com mais de um worker
+RELAY_ENABLED = os.environ.get('HOLDMED_PUSH_RELAY', '').lower() in ('1', 'true', 'yes')
+
+# Intervalo de leitura dos eventos novos (atraso máximo de entrega entre processos)
+RELAY_POLL_INTERVAL = float(os.environ.get('HOLDMED_PUSH_RELAY_POLL_MS', 500)) / 1000.0
+
+# Eventos lidos por consulta e tempo que ficam na tabela antes de serem apagados
+RELAY_BATCH_SIZE = 1000
+RELAY_RETENTION = timedelta(minutes=5)
+RELAY_PURGE_INTERVAL = 60.0
+
+
+def patient_topic(patient_id: int) -> str:
+    return f'patient:{patient_id}'
+
+
+class Subscription:
+    def __init__(self, topics):
+        self.topics = frozenset(topics)
+        self.queue = queue.Queue(maxsize=MAX_PENDING_EVENTS)
+        self.overflowed = False
+
+
+class EventBroker:
+    """
+    Distribui eventos (novas leituras, alertas) para as conexões Server-Sent Events abertas
+    neste processo, por paciente ou para a ala inteira.
+
+    Com o repasse ativo (vários workers do gunicorn), publish grava o evento na tabela push_event
+    em vez de entregá-lo: uma thread de cada processo, iniciada na primeira assinatura (depois do
+    fork), lê os eventos novos e os entrega às conexões locais, inclusive no processo que publicou.
+    """
+
+    def __init__(self, relay: bool = RELAY_ENABLED, poll_interval: float = RELAY_POLL_INTERVAL):
+        self.relay = relay
+        self.poll_interval = poll_interval
+        self.app = None
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._thread = None
+        self._last_id = None
+        self._purged_at = 0.0
+        # Processos filhos (workers, pool de tarefas) não podem herdar um lock preso por outra thread
+        os.register_at_fork(after_in_child=self._reset_locks)
+
+    def _reset_locks(self):
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+
+    def subscribe(self, topics) -> Subscription:
+        if self.relay:
+            self._ensure_relaying()
+        subscription = Subscription(topics)
+        with self._lock:
+            for topic in subscription.topics:
+                self._subscriptions.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._subscriptions.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscriptions[topic]
+
+    def publish(self, event: str, patient_id: int, data: dict):
+        """
+        Envia um evento aos assinantes do paciente e da ala. Não bloqueia quem publica
+        (com o repasse ativo, só o tempo de gravar o evento).
+        """
+        if not self.relay:
+            self._deliver(next(self._ids), event, patient_id, json.dumps(data, default=str))
+            return
+
+        # Conexão própria: quem publica já confirmou a própria transação
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(insert(PushEvent.__table__).values(
+                    event=event,
+                    patient_id=patient_id,
+                    data=json.dumps(data, default=str),
+                    created_at=datetime.utcnow(),
+                ))
+        except SQLAlchemyError as e:
+            print(f"Erro ao publicar o evento {event}: {e}")
+
+    def _deliver(self, event_id: int, event: str, patient_id: int, data: str):
+        with self._lock:
+            if not self._subscriptions:
+                return
+            subscribers = set(self._subscriptions.get(patient_topic(patient_id), ()))
+            subscribers.update(self._subscriptions.get(WARD_TOPIC, ()))
+
+        if not subscribers:
+            return
+
+        message = f'id: {event_id}\nevent: {event}\ndata: {data}\n\n'
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(message)
+            except queue.Full:
+                subscription.overflowed = True
+
+    def _ensure_relaying(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                # Só os eventos publicados a partir da primeira assinatura deste processo
+                if self._last_id is None:
+                    with self.app.app_context():
+                        with db.engine.connect() as connection:
+                            self._last_id = connection.scalar(select(func.max(PushEvent.id))) or 0
+                self._thread = threading.Thread(target=self._run, name='push-relay', daemon=True)
+                self._thread.start()
+
+    def relay_pending(self) -> int:
+        """
+        Entrega às conexões deste processo os eventos gravados desde a última leitura e apaga os
+        antigos de tempos em tempos. Retorna o número de eventos lidos.
+        """
+        table = PushEvent.__table__
+        relayed = 0
+        with db.engine.connect() as connection:
+            while True:
+                rows = connection.execute(
+                    select(table.c.id, table.c.event, table.c.patient_id, table.c.data)
+                    .where(table.c.id > self._last_id)
+                    .order_by(table.c.id)
+                    .limit(RELAY_BATCH_SIZE)
+                ).all()
+                for event_id, event, patient_id, data in rows:
+                    self._deliver(event_id, event, patient_id, data)
+                if rows:
+                    self._last_id = rows[-1].id
+                relayed += len(rows)
+                if len(rows) < RELAY_BATCH_SIZE:
+                    break
+
+        if time.monotonic() - self._purged_at >= RELAY_PURGE_INTERVAL:
+            with db.engine.begin() as connection:
+                connection.execute(delete(table).where(table.c.created_at < datetime.utcnow() - RELAY_RETENTION))
+            self._purged_at = time.monotonic()
+        return relayed
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                try:
+                    self.relay_pending()
+                except Exception as e:
+                    print(f"Erro no repasse de eventos: {e}")
+                time.sleep(self.poll_interval)
+
+    def stream(self, subscription: Subscription):
+        """
+        Gerador do corpo text/event-stream de uma assinatura; encerra a assinatura ao desconectar.
+        """
+        try:
+            yield 'retry: 3000\n\n'
+            while not subscription.overflowed:
+                try:
+                    yield subscription.queue.get(timeout=KEEPALIVE_INTERVAL)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+        finally:
+            self.unsubscribe(subscription)
+
+
+# Instância compartilhada pelas rotas; o app é associado em main.py com event_broker.init_app(app)
+event_broker = EventBroker()
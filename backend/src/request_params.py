@@ -0,0 +1,70 @@
+"""
+Leitura de parâmetros das requisições compartilhada pelas rotas: datas ISO 8601 e cursores de paginação.
+"""
+import base64
+import json
+from datetime import datetime, timezone
+
+from flask import request
+
+import serialization
+
+
+def parse_datetime(value, name: str) -> datetime:
+    """
+    Data ISO 8601 como datetime sem fuso em UTC, como as gravadas no banco: datas com fuso são
+    convertidas. Levanta ValueError se value não for um texto ISO 8601.
+    """
+    try:
+        value = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} deve estar no formato ISO 8601')
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def datetime_arg(name: str):
+    """
+    Parâmetro de data da query string (None se ausente).
+    """
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return parse_datetime(value, name)
+    except ValueError:
+        raise ValueError(f'Parâmetro "{name}" deve estar no formato ISO 8601')
+
+
+def int_arg(name: str):
+    """
+    Parâmetro inteiro da query string (None se ausente).
+    """
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f'Parâmetro "{name}" deve ser um número inteiro')
+
+
+def encode_cursor(key) -> str:
+    """
+    Cursor opaco com a chave de paginação (lista de valores; datas em ISO 8601).
+    """
+    return base64.urlsafe_b64encode(serialization.dumps(list(key))).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """
+    Chave de paginação de um cursor de encode_cursor com size valores, ou ValueError.
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except ValueError:
+        raise ValueError('Cursor de paginação inválido')
+    if not isinstance(key, list) or len(key) != size:
+        raise ValueError('Cursor de paginação inválido')
+    return key
@@ -0,0 +1,187 @@
+"""
+Varredura de risco da enfermaria: todos os pacientes ativos pontuados de uma vez.
+
+Um único SELECT traz, para cada paciente ativo, as leituras mais recentes (PatientLatest) e o
+estado das features (PatientFeatures); o modelo pontua a matriz inteira em uma chamada vetorizada
+e o ranking substitui a tabela RiskScore. GET /api/risk-board lê só as primeiras linhas do ranking.
+
+Variáveis de ambiente:
+    HOLDMED_RISK_ACTIVE_HOURS   paciente ativo: sinais vitais registrados nas últimas N horas
+                                (padrão 72; 0 inclui todos com sinais vitais)
+    HOLDMED_RISK_SWEEP_SECONDS  intervalo da varredura periódica (padrão 300; 0 só sob demanda)
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import delete, insert, select
+
+from features import feature_vector
+from instrumentation import span
+from model_registry import model_registry
+from models.feature import PatientFeatures
+from models.patient import Patient, PatientLatest, db
+from models.risk import RiskScore
+
+ACTIVE_HOURS = float(os.environ.get('HOLDMED_RISK_ACTIVE_HOURS', 72))
+SWEEP_INTERVAL = float(os.environ.get('HOLDMED_RISK_SWEEP_SECONDS', 300))
+
+# Linhas por INSERT ao gravar o ranking
+INSERT_BATCH_SIZE = 5000
+
+
+def census(at: datetime) -> list:
+    """
+    Pacientes ativos (com sinais vitais), em um único SELECT: idade e data da cirurgia, ids das
+    leituras mais recentes e estado das features. Pacientes ainda sem exames entram também: as
+    features de exames ausentes são preenchidas como na predição individual.
+    """
+    query = (
+        select(Patient.id, Patient.age, Patient.surgery_date,
+               PatientLatest.vital_signs_id, PatientLatest.lab_results_id, PatientFeatures.state)
+        .join(PatientLatest, PatientLatest.patient_id == Patient.id)
+        .outerjoin(PatientFeatures, PatientFeatures.patient_id == Patient.id)
+        .where(PatientLatest.vital_signs_id.is_not(None))
+    )
+    if ACTIVE_HOURS:
+        query = query.where(PatientLatest.vital_signs_timestamp >= at - timedelta(hours=ACTIVE_HOURS))
+    return db.session.execute(query).all()
+
+
+def impute_missing(X: np.ndarray) -> int:
+    """
+    Preenche, no lugar, as features ausentes (NaN, ex.: idade não informada) com a mediana da coluna
+    entre os demais pacientes, ou 0 se ninguém tiver o valor: o RandomForest não aceita NaN.
+    Retorna o número de pacientes com alguma feature preenchida.
+    """
+    missing = np.isnan(X)
+    for column in np.flatnonzero(missing.any(axis=0)):
+        present = X[~missing[:, column], column]
+        X[missing[:, column], column] = np.median(present) if present.size else 0
+    return int(missing.any(axis=1).sum())
+
+
+def score(agent, rows: list, at: datetime):
+    """
+    Probabilidade de complicação e classe prevista de cada paciente, com uma única chamada ao modelo,
+    e o número de pacientes com features preenchidas por impute_missing.
+    """
+    # As linhas do censo têm age e surgery_date, como o Patient esperado por feature_vector
+    with span('features.matrix'):
+        X = agent.features_matrix([feature_vector(row, row.state or {}, at) for row in rows])
+        imputed = impute_missing(X)
+    probabilities = agent.predict_proba(X)
+    classes = agent.model.classes_
+    positive = np.flatnonzero(classes == 1)
+    scores = probabilities[:, positive[0]] if positive.size else np.zeros(len(rows))
+    return scores, classes[probabilities.argmax(axis=1)].astype(bool), imputed
+
+
+def sweep(at: datetime = None) -> dict:
+    """
+    Pontua todos os pacientes ativos e substitui o ranking. Faz commit da sessão atual.
+    """
+    at = at or datetime.utcnow()
+    started = time.perf_counter()
+    agent = model_registry.get_agent()
+    version = model_registry.version
+
+    with span('db.census'):
+        rows = census(at)
+
+    records = []
+    imputed = 0
+    if rows:
+        scores, predicted, imputed = score(agent, rows, at)
+        patient_ids = np.array([row.id for row in rows])
+        # Maior risco primeiro; empates pelo id do paciente
+        order = np.lexsort((patient_ids, -scores))
+        records = [
+            {
+                'patient_id': rows[index].id,
+                'rank': rank,
+                'score': float(scores[index]),
+                'complication_predicted': bool(predicted[index]),
+                'vital_signs_id': rows[index].vital_signs_id,
+                'lab_results_id': rows[index].lab_results_id,
+                'model_version': version,
+                'scored_at': at,
+            }
+            for rank, index in enumerate(order.tolist(), start=1)
+        ]
+
+    # Leitores continuam vendo o ranking anterior até o commit
+    with span('db.store_risk'):
+        db.session.execute(delete(RiskScore))
+        for start in range(0, len(records), INSERT_BATCH_SIZE):
+            db.session.execute(insert(RiskScore), records[start:start + INSERT_BATCH_SIZE])
+        db.session.commit()
+
+    return {
+        'patients': len(records),
+        'complications_predicted': sum(record['complication_predicted'] for record in records),
+        'imputed': imputed,
+        'model_version': version,
+        'computed_at': at.isoformat(),
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+def last_sweep_at():
+    # Todas as linhas de uma varredura têm o mesmo scored_at: lê a primeira pelo índice do ranking
+    return db.session.execute(select(RiskScore.scored_at).where(RiskScore.rank == 1)).scalar()
+
+
+class RiskSweeper:
+    """
+    Varredura periódica em uma thread de cada processo do servidor, iniciada na primeira requisição
+    (depois do fork dos workers do gunicorn). Com vários processos, cada um só varre se o ranking
+    gravado for mais antigo que o intervalo, então na prática a varredura não se repete.
+    """
+
+    def __init__(self, interval: float = SWEEP_INTERVAL):
+        self.interval = interval
+        self.app = None
+        self._thread = None
+        self._lock = threading.Lock()
+        # Processos filhos (ex.: pool de tarefas) não podem herdar um lock preso por outra thread
+        os.register_at_fork(after_in_child=self._reset_locks)
+
+    def _reset_locks(self):
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        if self.interval > 0:
+            app.before_request(self._ensure_started)
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='risk-sweeper', daemon=True)
+                self._thread.start()
+
+    def _due(self) -> bool:
+        last = last_sweep_at()
+        return last is None or datetime.utcnow() - last >= timedelta(seconds=self.interval)
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                try:
+                    if self._due():
+                        sweep()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Erro na varredura de risco: {e}")
+                finally:
+                    db.session.remove()
+                time.sleep(self.interval)
+
+
+# Instância compartilhada; o app é associado em main.py com risk_sweeper.init_app(app)
+risk_sweeper = RiskSweeper()
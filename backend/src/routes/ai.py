@@ -1,10 +1,14 @@
+import click
+from datetime import datetime
 from flask import Blueprint, request, jsonify
-from ai_agent import AIAgent
+from instrumentation import span
+from micro_batcher import micro_batcher
+from model_registry import model_registry
 
 ai_bp = Blueprint('ai', __name__)
 
-# Instanciar o agente de IA
-ai_agent = AIAgent()
+# Limite de pacientes por requisição em /ai-prediction/batch
+MAX_BATCH_SIZE = 10000
 
 @ai_bp.route('/ai-analysis', methods=['POST'])
 def analyze_patient_data():
@@ -26,7 +30,9 @@ def analyze_patient_data():
         
         # Realizar análise usando o agente de IA
         # Como o AIAgent não tem método analyze_patient_data, vamos usar predict_complication
-        analysis_result = ai_agent.predict_complication(vital_signs)
+        # Requisições simultâneas são agrupadas pelo micro-batcher em uma única predição vetorizada
+        with span('model.micro_batch'):
+            analysis_result = micro_batcher.predict(vital_signs)
         
         return jsonify({
             'patient_id': patient_id,
@@ -50,8 +56,9 @@ def predict_complications():
         
         patient_data = data.get('patient_data', {})
         
-        # Realizar predição usando o agente de IA
-        prediction_result = ai_agent.predict_complication(patient_data)
+        # Realizar predição usando o agente de IA (agrupada pelo micro-batcher)
+        with span('model.micro_batch'):
+            prediction_result = micro_batcher.predict(patient_data)
         
         return jsonify({
             'prediction': prediction_result,
@@ -61,3 +68,117 @@ def predict_complications():
     except Exception as e:
         return jsonify({'error': f'Erro na predição: {str(e)}'}), 500
 
+@ai_bp.route('/ai-prediction/batch', methods=['POST'])
+def predict_complications_batch():
+    """
+    Endpoint para predição de complicações de vários pacientes em uma única chamada vetorizada
+    """
+    try:
+        data = request.get_json()
+
+        if not data or not isinstance(data.get('patients'), list):
+            return jsonify({'error': 'Lista "patients" é obrigatória'}), 400
+
+        patients = data['patients']
+        if len(patients) > MAX_BATCH_SIZE:
+            return jsonify({'error': f'Máximo de {MAX_BATCH_SIZE} pacientes por requisição'}), 400
+
+        agent = model_registry.get_agent()
+        with span('features.matrix'):
+            features = agent.features_matrix([patient.get('patient_data', {}) for patient in patients])
+        predictions = agent.predict_batch(features) if patients else []
+
+        return jsonify({
+            'predictions': [
+                {'patient_id': patient.get('patient_id'), 'prediction': prediction}
+                for patient, prediction in zip(patients, predictions)
+            ],
+            'timestamp': datetime.utcnow().isoformat() + 'Z'
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': f'Erro na predição: {str(e)}'}), 500
+
+@ai_bp.route('/models', methods=['GET'])
+def list_models():
+    """
+    Lista as versões de modelo registradas e indica a ativa
+    """
+    return jsonify({
+        'current_version': model_registry.current_version(),
+        'loaded_version': model_registry.version,
+        'versions': model_registry.list_versions()
+    }), 200
+
+@ai_bp.route('/models/activate', methods=['POST'])
+def activate_model():
+    """
+    Ativa uma versão de modelo sem reiniciar o servidor
+    """
+    data = request.get_json() or {}
+    version = data.get('version')
+
+    if not version:
+        return jsonify({'error': 'Versão do modelo é obrigatória'}), 400
+
+    try:
+        model_registry.activate(version)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+
+    return jsonify({'current_version': version}), 200
+
+@ai_bp.route('/models/reload', methods=['POST'])
+def reload_model():
+    """
+    Recarrega a versão ativa a partir do disco
+    """
+    model_registry.reload()
+    model_registry.get_agent()
+    return jsonify({'loaded_version': model_registry.version}), 200
+
+@ai_bp.cli.command('train')
+@click.option('--source', type=click.Choice(['database', 'simulated']), default='database', show_default=True,
+              help='Leituras e desfechos gravados no banco ou dados simulados.')
+@click.option('--samples', default=100, show_default=True, help='Número de amostras simuladas (--source simulated).')
+@click.option('--n-iter', default=20, show_default=True, help='Combinações de hiperparâmetros avaliadas.')
+@click.option('--cv', default=5, show_default=True, help='Partes da validação cruzada (por paciente).')
+@click.option('--n-jobs', default=-1, show_default=True, help='Processos da busca (-1 usa todos os núcleos).')
+@click.option('--sample-interval', default=60, show_default=True,
+              help='Minutos mínimos entre amostras do mesmo paciente.')
+@click.option('--no-activate', is_flag=True, help='Registra a versão sem ativá-la.')
+def train_command(source, samples, n_iter, cv, n_jobs, sample_interval, no_activate):
+    """Treina e registra uma nova versão do modelo."""
+    if source == 'simulated':
+        from model_registry import build_simulated_training_data
+
+        version = model_registry.train_and_register(
+            build_simulated_training_data(samples), metadata={'source': 'simulated'}, activate=not no_activate
+        )
+    else:
+        from datetime import timedelta
+        from training import train_from_database
+
+        try:
+            version = train_from_database(
+                n_iter=n_iter, cv=cv, n_jobs=n_jobs, sample_interval=timedelta(minutes=sample_interval),
+                activate=not no_activate, log=click.echo
+            )
+        except ValueError as e:
+            raise click.ClickException(str(e))
+    click.echo(f"Modelo registrado: {version}")
+
+@ai_bp.cli.command('models')
+def models_command():
+    """Lista as versões de modelo registradas."""
+    current = model_registry.current_version()
+    for metadata in model_registry.list_versions():
+        marker = '*' if metadata['version'] == current else ' '
+        click.echo(f"{marker} {metadata['version']}  {metadata['created_at']}  {metadata.get('metrics', {})}")
+
+@ai_bp.cli.command('activate')
+@click.argument('version')
+def activate_command(version):
+    """Ativa uma versão de modelo; servidores em execução a carregam na próxima requisição."""
+    model_registry.activate(version)
+    click.echo(f"Versão ativa: {version}")
@@ -0,0 +1,106 @@
+import os
+import time
+
+import click
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+
+import columnar
+from columnar import FILE_EXTENSIONS, FORMATS, TABLES, ColumnarUnavailable
+from instrumentation import span
+from request_params import datetime_arg
+
+data_bp = Blueprint('data', __name__)
+
+def _format_for_path(path, format_name):
+    if format_name:
+        return format_name
+    return 'arrow' if os.path.splitext(path)[1] in ('.arrow', '.arrows') else 'parquet'
+
+@data_bp.route('/export/<any(patients, "vital-signs", "lab-results", "clinical-notes"):table>', methods=['GET'])
+def export_table(table):
+    """
+    Exporta a tabela em Parquet (padrão) ou Arrow IPC (format=arrow), em streaming.
+    Filtros: patient_id (repetível) e, nas leituras, since/until (ISO 8601).
+    """
+    try:
+        format_name = columnar.format_for(request.args.get('format'))
+        filters = {
+            'patient_ids': request.args.getlist('patient_id', type=int),
+            'since': datetime_arg('since'),
+            'until': datetime_arg('until'),
+        }
+        chunks = columnar.export_stream(TABLES[table], format_name, **filters)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except ColumnarUnavailable as e:
+        return jsonify({'error': str(e)}), 501
+
+    filename = table.replace('-', '_') + FILE_EXTENSIONS[format_name]
+    return Response(
+        stream_with_context(chunks),
+        mimetype=FORMATS[format_name],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@data_bp.route('/import/<any(patients, "vital-signs", "lab-results", "clinical-notes"):table>', methods=['POST'])
+def import_table(table):
+    """
+    Importa um arquivo Parquet ou Arrow IPC (stream) enviado no corpo da requisição. O formato vem
+    de format= ou do Content-Type. Linhas inválidas são reportadas sem abortar as demais.
+    """
+    try:
+        format_name = columnar.format_for(request.args.get('format'), request.mimetype)
+        with span('data.import'):
+            result = columnar.import_batches(table, columnar.read_batches(columnar.spool(request.stream, format_name), format_name))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except ColumnarUnavailable as e:
+        return jsonify({'error': str(e)}), 501
+
+    if result.failed == 0:
+        status = 201
+    elif result.inserted == 0:
+        status = 400
+    else:
+        status = 207
+    return jsonify(result.to_dict()), status
+
+@data_bp.cli.command('export')
+@click.argument('table', type=click.Choice(list(TABLES)))
+@click.argument('path', type=click.Path(dir_okay=False, writable=True))
+@click.option('--format', 'format_name', type=click.Choice(list(FORMATS)),
+              help='Parquet ou Arrow IPC (stream); padrão pela extensão do arquivo (.arrow/.arrows).')
+@click.option('--patient-id', 'patient_ids', type=int, multiple=True, help='Somente estes pacientes.')
+@click.option('--since', type=click.DateTime(), help='Leituras a partir desta data.')
+@click.option('--until', type=click.DateTime(), help='Leituras até esta data.')
+def export_command(table, path, format_name, patient_ids, since, until):
+    """Exporta uma tabela para um arquivo Parquet ou Arrow."""
+    format_name = _format_for_path(path, format_name)
+    started = time.perf_counter()
+    try:
+        with open(path, 'wb') as f:
+            for chunk in columnar.export_stream(TABLES[table], format_name, patient_ids=list(patient_ids),
+                                                since=since, until=until):
+                f.write(chunk)
+    except ColumnarUnavailable as e:
+        raise click.ClickException(str(e))
+    click.echo(f"{table} exportado para {path} ({os.path.getsize(path)} bytes em {time.perf_counter() - started:.1f}s)")
+
+@data_bp.cli.command('import')
+@click.argument('table', type=click.Choice(list(TABLES)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'format_name', type=click.Choice(list(FORMATS)),
+              help='Parquet ou Arrow IPC (stream); padrão pela extensão do arquivo (.arrow/.arrows).')
+def import_command(table, path, format_name):
+    """Importa um arquivo Parquet ou Arrow em uma tabela, em blocos."""
+    format_name = _format_for_path(path, format_name)
+    started = time.perf_counter()
+    try:
+        with open(path, 'rb') as f:
+            result = columnar.import_batches(table, columnar.read_batches(f, format_name))
+    except (ValueError, ColumnarUnavailable) as e:
+        raise click.ClickException(str(e))
+    click.echo(f"{result.inserted} de {result.received} linhas importadas em {time.perf_counter() - started:.1f}s "
+               f"({result.failed} com erro)")
+    for error in result.errors[:20]:
+        click.echo(f"  linha {error['index']}: {error['error']}")
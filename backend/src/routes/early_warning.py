@@ -0,0 +1,61 @@
+from flask import Blueprint, jsonify, request
+from sqlalchemy import select
+
+from early_warning import LEVELS
+from models.early_warning import EarlyWarningAlert, PatientEarlyWarning
+from models.patient import Patient, db
+
+early_warning_bp = Blueprint('early_warning', __name__)
+
+DEFAULT_ALERTS_LIMIT = 100
+MAX_ALERTS_LIMIT = 1000
+
+@early_warning_bp.route('/patients/<int:patient_id>/early-warning', methods=['GET'])
+def get_early_warning(patient_id):
+    """
+    Escore NEWS2 atual do paciente, com o último valor e os pontos de cada parâmetro
+    """
+    Patient.query.get_or_404(patient_id)
+    record = db.session.get(PatientEarlyWarning, patient_id)
+    if record is None:
+        return jsonify({'patient_id': patient_id, 'score': None, 'level': None, 'parameters': {}, 'updated_at': None})
+
+    return jsonify({
+        'patient_id': patient_id,
+        'score': record.score,
+        'level': record.level,
+        'parameters': {
+            field: {'value': parameter['value'], 'points': parameter['points']}
+            for field, parameter in record.state.get('parameters', {}).items()
+        },
+        'updated_at': record.updated_at.isoformat() if record.updated_at else None
+    })
+
+@early_warning_bp.route('/early-warning/alerts', methods=['GET'])
+def list_early_warning_alerts():
+    """
+    Alertas de piora do NEWS2, do mais recente para o mais antigo.
+    Filtros: patient_id (repetível) e level (nível mínimo). Com after_id, retorna em ordem
+    crescente só os alertas posteriores a ele (para consultas periódicas).
+    """
+    limit = min(max(request.args.get('limit', DEFAULT_ALERTS_LIMIT, type=int), 1), MAX_ALERTS_LIMIT)
+    query = select(EarlyWarningAlert)
+
+    patient_ids = request.args.getlist('patient_id', type=int)
+    if patient_ids:
+        query = query.where(EarlyWarningAlert.patient_id.in_(patient_ids))
+
+    level = request.args.get('level')
+    if level:
+        if level not in LEVELS:
+            return jsonify({'error': f'Nível desconhecido: {level} (use {", ".join(LEVELS)})'}), 400
+        query = query.where(EarlyWarningAlert.level.in_(LEVELS[LEVELS.index(level):]))
+
+    after_id = request.args.get('after_id', type=int)
+    if after_id is not None:
+        query = query.where(EarlyWarningAlert.id > after_id).order_by(EarlyWarningAlert.id)
+    else:
+        query = query.order_by(EarlyWarningAlert.id.desc())
+
+    alerts = db.session.scalars(query.limit(limit)).all()
+    return jsonify([alert.to_dict() for alert in alerts])
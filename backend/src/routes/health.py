@@ -0,0 +1,21 @@
+from flask import Blueprint, jsonify
+from warmup import warmup
+
+health_bp = Blueprint('health', __name__)
+
+@health_bp.route('/health', methods=['GET'])
+def liveness():
+    """
+    Processo no ar (não depende do banco, do modelo nem do NLP)
+    """
+    return jsonify({'status': 'ok'})
+
+@health_bp.route('/health/ready', methods=['GET'])
+def readiness():
+    """
+    Estado do aquecimento do modelo de IA e do pipeline spaCy.
+    503 enquanto o aquecimento em segundo plano não termina; depois 200, mesmo com algum recurso
+    indisponível ('degraded'): as demais rotas continuam atendendo.
+    """
+    status = warmup.status()
+    return jsonify(status), 503 if status['status'] == 'warming' else 200
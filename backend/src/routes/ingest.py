@@ -0,0 +1,241 @@
+import json
+import math
+from datetime import datetime
+from flask import Blueprint, jsonify, request
+from sqlalchemy import insert, select
+from early_warning import early_warning
+from features import feature_store
+from insights import enqueue_refresh
+from models.patient import Patient, VitalSigns, PatientLatest, db
+from push import event_broker
+from request_params import parse_datetime
+from timeseries import series_store
+
+ingest_bp = Blueprint('ingest', __name__)
+
+# Campos aceitos por leitura de sinais vitais e o tipo de cada um
+VITAL_SIGN_FIELDS = {
+    'blood_pressure_systolic': float,
+    'blood_pressure_diastolic': float,
+    'heart_rate': int,
+    'temperature': float,
+    'oxygen_saturation': float,
+    'respiratory_rate': int,
+}
+
+# Linhas inseridas por transação
+CHUNK_SIZE = 5000
+
+# Intervalo das colunas inteiras (INTEGER de 64 bits do SQLite e BIGINT do PostgreSQL)
+MIN_INTEGER = -(1 << 63)
+MAX_INTEGER = (1 << 63) - 1
+
+# Máximo de erros detalhados na resposta (os demais são apenas contados)
+MAX_REPORTED_ERRORS = 1000
+
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/jsonl', 'application/json-seq')
+
+# Tamanho dos blocos lidos do corpo NDJSON
+READ_BLOCK_SIZE = 1 << 16
+
+
+def _iter_lines(stream):
+    # Leitura em blocos: readline linha a linha no stream do WSGI é bem mais lento
+    pending = b''
+    while True:
+        block = stream.read(READ_BLOCK_SIZE)
+        if not block:
+            break
+        lines = (pending + block).split(b'\n')
+        pending = lines.pop()
+        yield from lines
+    if pending:
+        yield pending
+
+
+def _iter_records():
+    """
+    Itera sobre as leituras do corpo da requisição: NDJSON (uma por linha, lido em streaming)
+    ou um array JSON. Retorna pares (registro, erro).
+    """
+    if request.mimetype in NDJSON_MIMETYPES:
+        for line in _iter_lines(request.stream):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line), None
+            except ValueError:
+                yield None, 'JSON inválido'
+        return
+
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('readings')
+    if not isinstance(data, list):
+        raise ValueError('Envie um array JSON de leituras ou NDJSON (application/x-ndjson)')
+    for record in data:
+        yield record, None
+
+
+def _validate(record, received_at):
+    """
+    Converte um registro em valores prontos para INSERT ou levanta ValueError com o motivo.
+    """
+    if not isinstance(record, dict):
+        raise ValueError('Leitura deve ser um objeto JSON')
+
+    patient_id = record.get('patient_id')
+    if not isinstance(patient_id, int) or isinstance(patient_id, bool) or not MIN_INTEGER <= patient_id <= MAX_INTEGER:
+        raise ValueError('patient_id é obrigatório e deve ser inteiro')
+
+    values = {'patient_id': patient_id}
+    for field, field_type in VITAL_SIGN_FIELDS.items():
+        value = record.get(field)
+        if value is not None:
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f'{field} deve ser numérico')
+            if not math.isfinite(value):
+                raise ValueError(f'{field} deve ser um número finito')
+            # int(72.5) truncaria a leitura; inteiros aceitam só floats sem parte fracionária
+            if field_type is int and isinstance(value, float) and not value.is_integer():
+                raise ValueError(f'{field} deve ser inteiro')
+            value = field_type(value)
+            if field_type is int and not MIN_INTEGER <= value <= MAX_INTEGER:
+                raise ValueError(f'{field} fora do intervalo aceito')
+        values[field] = value
+
+    timestamp = record.get('timestamp')
+    if timestamp is None:
+        values['timestamp'] = received_at
+    else:
+        values['timestamp'] = parse_datetime(timestamp, 'timestamp')
+
+    return values
+
+
+class _BulkResult:
+    def __init__(self):
+        self.received = 0
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+        self.patient_ids = set()
+
+    def error(self, index, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'index': index, 'error': message})
+
+
+def _insert_chunk(chunk, known_patients, result):
+    """
+    Insere um bloco de leituras validadas, descartando as de pacientes inexistentes.
+    chunk: lista de pares (índice na requisição, valores).
+    """
+    missing = {values['patient_id'] for _, values in chunk} - known_patients
+    if missing:
+        known_patients.update(db.session.scalars(select(Patient.id).where(Patient.id.in_(missing))))
+
+    rows = []
+    for index, values in chunk:
+        if values['patient_id'] in known_patients:
+            rows.append((index, values))
+        else:
+            result.error(index, f"Paciente {values['patient_id']} não encontrado")
+
+    if rows:
+        _insert_rows(rows, result)
+
+
+def _insert_rows(rows, result):
+    """
+    Insere as leituras em uma única transação. Se o banco recusar o bloco, cada metade é tentada
+    em separado, até chegar às linhas com problema: só elas são reportadas como erro.
+    rows: lista de pares (índice na requisição, valores).
+    """
+    values = [row for _, row in rows]
+    try:
+        # executemany em lote; RETURNING fornece os ids para o snapshot de leituras mais recentes
+        inserted = db.session.execute(
+            insert(VitalSigns).returning(
+                VitalSigns.patient_id, VitalSigns.id, VitalSigns.timestamp, sort_by_parameter_order=True
+            ),
+            values
+        ).all()
+        readings = [
+            {**row, 'id': row_id, 'timestamp': timestamp}
+            for row, (_, row_id, timestamp) in zip(values, inserted)
+        ]
+        PatientLatest.record_readings('vital_signs', inserted)
+        series_store.record_readings('vital_signs', readings)
+        feature_store.update_readings('vital_signs', readings)
+        alerts = early_warning.update_readings(readings)
+        db.session.commit()
+        result.inserted += len(values)
+        result.patient_ids.update(patient_id for patient_id, _, _ in inserted)
+    except Exception as e:
+        db.session.rollback()
+        if len(rows) == 1:
+            result.error(rows[0][0], f'Erro ao inserir: {str(e)}')
+            return
+        middle = len(rows) // 2
+        _insert_rows(rows[:middle], result)
+        _insert_rows(rows[middle:], result)
+        return
+
+    # Publica as leituras para os painéis conectados (mesmo formato de VitalSigns.to_dict)
+    for reading in readings:
+        event_broker.publish('vital_signs', reading['patient_id'], {**reading, 'timestamp': reading['timestamp'].isoformat()})
+    early_warning.publish(alerts)
+
+
+@ingest_bp.route('/vital-signs/bulk', methods=['POST'])
+def bulk_add_vital_signs():
+    """
+    Ingestão em lote de sinais vitais de vários pacientes (ex.: monitores de beira de leito).
+    Leituras inválidas são reportadas individualmente sem abortar o restante do lote.
+    """
+    received_at = datetime.utcnow()
+    result = _BulkResult()
+    known_patients = set()
+    chunk = []
+
+    try:
+        for index, (record, parse_error) in enumerate(_iter_records()):
+            result.received += 1
+            if parse_error:
+                result.error(index, parse_error)
+                continue
+            try:
+                chunk.append((index, _validate(record, received_at)))
+            except ValueError as e:
+                result.error(index, str(e))
+                continue
+
+            if len(chunk) >= CHUNK_SIZE:
+                _insert_chunk(chunk, known_patients, result)
+                chunk = []
+
+        if chunk:
+            _insert_chunk(chunk, known_patients, result)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Um recálculo de insights em segundo plano por paciente afetado, não por leitura
+    if result.patient_ids:
+        enqueue_refresh(result.patient_ids)
+
+    if result.failed == 0:
+        status = 201
+    elif result.inserted == 0:
+        status = 400
+    else:
+        status = 207
+
+    return jsonify({
+        'received': result.received,
+        'inserted': result.inserted,
+        'failed': result.failed,
+        'errors': result.errors
+    }), status
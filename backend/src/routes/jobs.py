@@ -0,0 +1,12 @@
+from flask import Blueprint, jsonify
+from models.job import Job
+
+jobs_bp = Blueprint('jobs', __name__)
+
+@jobs_bp.route('/jobs/<int:job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Estado e resultado de uma tarefa em segundo plano
+    """
+    job = Job.query.get_or_404(job_id)
+    return jsonify(job.to_dict())
@@ -0,0 +1,12 @@
+from flask import Blueprint, Response
+from instrumentation import metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Métricas do processo no formato de exposição do Prometheus (histogramas de requisições,
+    consultas SQL e etapas instrumentadas)
+    """
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
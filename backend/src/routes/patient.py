@@ -1,15 +1,174 @@
-from flask import Blueprint, jsonify, request
-from models.patient import Patient, VitalSigns, LabResults, ClinicalNotes, db
+from flask import Blueprint, Response, abort, jsonify, request, url_for
+from sqlalchemy import func, insert, select, tuple_
+from models.patient import Patient, VitalSigns, LabResults, ClinicalNotes, ClinicalNoteExtraction, PatientLatest, PatientInsight, PatientOutcome, dialect_insert, db, normalize_name
 from datetime import datetime
-from ai_agent import AIAgent
+from early_warning import early_warning
+from extraction_cache import extraction_cache
+from features import feature_store
+import insights as insight_store
+from instrumentation import span
+from jobs import job_queue
+from model_registry import model_registry
+from nlp_service import nlp_service
+from note_search import note_search
+from push import event_broker
+from request_params import datetime_arg, decode_cursor, encode_cursor, int_arg, parse_datetime
+import serialization
+from timeseries import series_store
 
 patient_bp = Blueprint('patient', __name__)
-ai_agent = AIAgent()
+
+# Tamanho padrão e máximo das páginas de cada série em GET /patients/<id>
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Ordenações da listagem de pacientes: colunas da chave de paginação, sempre terminando no id
+CENSUS_SORTS = {
+    'id': (Patient.id,),
+    'name': (Patient.name_key, Patient.id),
+}
+
+# Maior caractere Unicode: limite superior da busca por prefixo (nome >= prefixo e < prefixo + U+10FFFF)
+PREFIX_UPPER_BOUND = '\U0010ffff'
+
+# Notas lidas e gravadas por transação em /clinical-notes/process-pending
+NOTES_CHUNK_SIZE = 500
+
+# Séries de dados relacionados retornadas por GET /patients/<id>
+PATIENT_SERIES = {
+    'vital_signs': VitalSigns,
+    'lab_results': LabResults,
+    'clinical_notes': ClinicalNotes,
+}
+
+def _wants_async():
+    # ?async=1 devolve 202 Accepted com a tarefa em segundo plano em vez de processar na requisição
+    return request.args.get('async', '').lower() in ('1', 'true', 'yes')
+
+def _accepted(job):
+    location = url_for('jobs.get_job', job_id=job.id)
+    return jsonify({'job_id': job.id, 'status': job.status, 'status_url': location}), 202, {'Location': location}
+
+def _stored_prediction(patient_id, latest):
+    # Predição do snapshot de insights, se foi calculada com exatamente estas leituras e o modelo ativo
+    with span('db.insight'):
+        insight = db.session.get(PatientInsight, patient_id)
+    sources = (latest.vital_signs_id, latest.lab_results_id, latest.clinical_notes_id)
+    if insight_store.is_fresh(insight, sources, model_registry.current_version()):
+        return insight.body['prediction']
+    return None
+
+def _decode_series_cursor(cursor):
+    timestamp, row_id = decode_cursor(cursor, 2)
+    try:
+        return parse_datetime(timestamp, 'cursor'), int(row_id)
+    except (TypeError, ValueError):
+        raise ValueError('Cursor de paginação inválido')
+
+def _series_page(model, patient_id, since, until, cursor, limit):
+    """
+    Retorna uma página de uma série do paciente com paginação por cursor (keyset).
+    As páginas andam do registro mais recente para o mais antigo; dentro da página os
+    registros ficam em ordem cronológica (o último é o mais recente).
+    """
+    # Só as colunas serializadas, como tuplas: sem objetos do ORM nem isoformat por linha
+    names = serialization.column_names(model)
+    query = serialization.select_columns(model, names).where(model.patient_id == patient_id)
+    if since:
+        query = query.where(model.timestamp >= since)
+    if until:
+        query = query.where(model.timestamp < until)
+    if cursor:
+        query = query.where(tuple_(model.timestamp, model.id) < _decode_series_cursor(cursor))
+
+    rows = db.session.execute(query.order_by(model.timestamp.desc(), model.id.desc()).limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor((rows[-1].timestamp, rows[-1].id)) if has_more else None
+    rows.reverse()
+
+    return serialization.rows_to_dicts(names, rows), {'next_cursor': next_cursor, 'has_more': has_more}
+
+def _census_filters():
+    """
+    Condições da listagem de pacientes a partir dos parâmetros da requisição; todas cobertas por índices.
+    """
+    conditions = []
+    surgery_types = request.args.getlist('surgery_type')
+    if surgery_types:
+        conditions.append(Patient.surgery_type.in_(surgery_types))
+    genders = request.args.getlist('gender')
+    if genders:
+        conditions.append(Patient.gender.in_(genders))
+
+    surgery_date_from = datetime_arg('surgery_date_from')
+    if surgery_date_from:
+        conditions.append(Patient.surgery_date >= surgery_date_from)
+    surgery_date_to = datetime_arg('surgery_date_to')
+    if surgery_date_to:
+        conditions.append(Patient.surgery_date < surgery_date_to)
+
+    min_age = int_arg('min_age')
+    if min_age is not None:
+        conditions.append(Patient.age >= min_age)
+    max_age = int_arg('max_age')
+    if max_age is not None:
+        conditions.append(Patient.age <= max_age)
+
+    # Prefixo do nome, sem diferenciar acentos e maiúsculas: intervalo sobre o índice de name_key
+    prefix = normalize_name(request.args.get('name', ''))
+    if prefix:
+        conditions.append(Patient.name_key >= prefix)
+        conditions.append(Patient.name_key < prefix + PREFIX_UPPER_BOUND)
+    return conditions
 
 @patient_bp.route('/patients', methods=['GET'])
 def get_patients():
-    patients = Patient.query.all()
-    return jsonify([patient.to_dict() for patient in patients])
+    """
+    Censo de pacientes com paginação por chave (keyset).
+    Filtros: surgery_type e gender (repetíveis), surgery_date_from/surgery_date_to (ISO 8601),
+    min_age/max_age e name (prefixo). Ordenação: sort=id (padrão) ou sort=name.
+    O corpo é a lista da página; X-Total-Count (só na primeira página, omitido com count=0),
+    X-Next-Cursor e Link (rel="next") trazem a paginação.
+    """
+    sort = request.args.get('sort', 'id')
+    if sort not in CENSUS_SORTS:
+        return jsonify({'error': f'Ordenação desconhecida: {sort}'}), 400
+    key_columns = CENSUS_SORTS[sort]
+    limit = min(max(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    cursor = request.args.get('cursor')
+
+    try:
+        conditions = _census_filters()
+        after = tuple(decode_cursor(cursor, len(key_columns))) if cursor else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    names = serialization.column_names(Patient)
+    query = select(*(getattr(Patient, name) for name in names), *key_columns).where(*conditions)
+    if after is not None:
+        # O limite na primeira coluna posiciona a busca no índice; a comparação de tuplas desempata
+        query = query.where(key_columns[0] >= after[0], tuple_(*key_columns) > after)
+    with span('db.census'):
+        rows = db.session.execute(query.order_by(*key_columns).limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    headers = {}
+    if cursor is None and request.args.get('count', '1').lower() not in ('0', 'false', 'no'):
+        # Contagem sem ORDER BY nem LIMIT sobre os mesmos índices; as páginas seguintes não a repetem
+        with span('db.census_count'):
+            headers['X-Total-Count'] = str(db.session.execute(
+                select(func.count()).select_from(Patient).where(*conditions)
+            ).scalar())
+    if has_more:
+        next_cursor = encode_cursor(rows[-1][len(names):])
+        arguments = {**request.args.to_dict(flat=False), 'cursor': next_cursor}
+        arguments.pop('count', None)
+        headers['X-Next-Cursor'] = next_cursor
+        headers['Link'] = f'<{url_for("patient.get_patients", _external=True, **arguments)}>; rel="next"'
+
+    return serialization.rows_response(names, (row[:len(names)] for row in rows), headers)
 
 @patient_bp.route('/patients', methods=['POST'])
 def create_patient():
@@ -31,15 +190,35 @@ def create_patient():
 
 @patient_bp.route('/patients/<int:patient_id>', methods=['GET'])
 def get_patient(patient_id):
-    patient = Patient.query.get_or_404(patient_id)
-    patient_data = patient.to_dict()
+    names = serialization.column_names(Patient)
+    with span('db.patient'):
+        row = db.session.execute(serialization.select_columns(Patient, names).where(Patient.id == patient_id)).first()
+    if row is None:
+        abort(404)
+    patient_data = dict(zip(names, row))
     
-    # Incluir dados relacionados
-    patient_data['vital_signs'] = [vs.to_dict() for vs in patient.vital_signs]
-    patient_data['lab_results'] = [lr.to_dict() for lr in patient.lab_results]
-    patient_data['clinical_notes'] = [cn.to_dict() for cn in patient.clinical_notes]
+    try:
+        since = datetime_arg('since')
+        until = datetime_arg('until')
+        limit = min(max(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+        include = request.args.get('include')
+        series = include.split(',') if include else list(PATIENT_SERIES)
+        
+        # Incluir dados relacionados: uma consulta limitada por série, independente do tamanho do histórico
+        pagination = {}
+        for name in series:
+            if name not in PATIENT_SERIES:
+                return jsonify({'error': f'Série desconhecida: {name}'}), 400
+            cursor = request.args.get(f'{name}_cursor')
+            with span(f'db.{name}'):
+                patient_data[name], pagination[name] = _series_page(
+                    PATIENT_SERIES[name], patient_id, since, until, cursor, limit
+                )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    return jsonify(patient_data)
+    patient_data['pagination'] = pagination
+    return serialization.json_response(patient_data)
 
 @patient_bp.route('/patients/<int:patient_id>/vital-signs', methods=['POST'])
 def add_vital_signs(patient_id):
@@ -56,7 +235,16 @@ def add_vital_signs(patient_id):
         respiratory_rate=data.get('respiratory_rate')
     )
     db.session.add(vital_signs)
+    PatientLatest.record(vital_signs)
+    series_store.record(vital_signs)
+    feature_store.update(vital_signs)
+    alerts = early_warning.update(vital_signs)
     db.session.commit()
+    event_broker.publish('vital_signs', patient_id, vital_signs.to_dict())
+    early_warning.publish(alerts)
+    
+    # Recalcula os insights do paciente em segundo plano com a nova leitura
+    insight_store.enqueue_refresh([patient_id])
     return jsonify(vital_signs.to_dict()), 201
 
 @patient_bp.route('/patients/<int:patient_id>/lab-results', methods=['POST'])
@@ -74,7 +262,14 @@ def add_lab_results(patient_id):
         potassium=data.get('potassium')
     )
     db.session.add(lab_results)
+    PatientLatest.record(lab_results)
+    series_store.record(lab_results)
+    feature_store.update(lab_results)
     db.session.commit()
+    event_broker.publish('lab_results', patient_id, lab_results.to_dict())
+    
+    # Recalcula os insights do paciente em segundo plano com a nova leitura
+    insight_store.enqueue_refresh([patient_id])
     return jsonify(lab_results.to_dict()), 201
 
 @patient_bp.route('/patients/<int:patient_id>/clinical-notes', methods=['POST'])
@@ -89,44 +284,96 @@ def add_clinical_notes(patient_id):
         author=data['author']
     )
     db.session.add(clinical_notes)
+    PatientLatest.record(clinical_notes)
     db.session.commit()
+    
+    # Recalcula os insights (incluindo a extração da nota) em segundo plano; sem sinais vitais
+    # e exames ainda não há insights, então só a nota é extraída
+    if patient_id not in insight_store.enqueue_refresh([patient_id]):
+        job_queue.enqueue('process_note', {'note_id': clinical_notes.id, 'content': clinical_notes.content}, patient_id)
     return jsonify(clinical_notes.to_dict()), 201
 
+@patient_bp.route('/patients/<int:patient_id>/<any("vital-signs", "lab-results"):series>/series', methods=['GET'])
+def get_series(patient_id, series):
+    """
+    Série temporal do paciente para gráficos de tendência, em colunas.
+    resolution: raw, 1m, 15m, 1h ou auto (padrão); fields: campos separados por vírgula.
+    """
+    Patient.query.get_or_404(patient_id)
+    try:
+        fields = request.args.get('fields')
+        return jsonify(series_store.query(
+            series.replace('-', '_'),
+            patient_id,
+            resolution=request.args.get('resolution', 'auto'),
+            since=datetime_arg('since'),
+            until=datetime_arg('until'),
+            fields=fields.split(',') if fields else None
+        ))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@patient_bp.route('/patients/<int:patient_id>/outcome', methods=['PUT'])
+def set_outcome(patient_id):
+    """
+    Registra o desfecho do paciente (houve ou não complicação), usado como rótulo no treinamento do modelo
+    """
+    Patient.query.get_or_404(patient_id)
+    data = request.get_json(silent=True) or {}
+    
+    if not isinstance(data.get('complication'), bool):
+        return jsonify({'error': 'Campo "complication" é obrigatório e deve ser booleano'}), 400
+    
+    try:
+        occurred_at = parse_datetime(data['occurred_at'], 'occurred_at') if data.get('occurred_at') else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Upsert: dois registros simultâneos do mesmo paciente não disputam o INSERT
+    values = {
+        'patient_id': patient_id,
+        'complication': data['complication'],
+        'occurred_at': occurred_at,
+        'recorded_at': datetime.utcnow(),
+    }
+    statement = dialect_insert(PatientOutcome.__table__).values(values)
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=['patient_id'],
+        set_={column: statement.excluded[column] for column in values if column != 'patient_id'}
+    ))
+    db.session.commit()
+    outcome = db.session.get(PatientOutcome, patient_id, populate_existing=True)
+    return jsonify(outcome.to_dict()), 200
+
 @patient_bp.route('/patients/<int:patient_id>/predict-complications', methods=['GET'])
 def predict_complications(patient_id):
-    patient = Patient.query.get_or_404(patient_id)
+    with span('db.patient'):
+        patient = Patient.query.get_or_404(patient_id)
     
-    # Obter os dados mais recentes do paciente
-    latest_vital_signs = VitalSigns.query.filter_by(patient_id=patient_id).order_by(VitalSigns.timestamp.desc()).first()
-    latest_lab_results = LabResults.query.filter_by(patient_id=patient_id).order_by(LabResults.timestamp.desc()).first()
+    # Obter os dados mais recentes do paciente a partir do snapshot materializado
+    with span('db.latest'):
+        latest = db.session.get(PatientLatest, patient_id)
+        latest_vital_signs = latest.vital_signs if latest else None
+        latest_lab_results = latest.lab_results if latest else None
     
     if not latest_vital_signs or not latest_lab_results:
         return jsonify({'error': 'Dados insuficientes para predição'}), 400
     
-    # Preparar dados para o agente de IA
-    patient_data = {
-        'sinais_vitais_pressao': latest_vital_signs.blood_pressure_systolic or 0,
-        'sinais_vitais_temperatura': latest_vital_signs.temperature or 0,
-        'exames_laboratoriais_glicose': latest_lab_results.glucose or 0,
-        'idade': patient.age
-    }
+    # Vetor de features mantido incrementalmente a cada leitura (sem reler o histórico)
+    with span('features.vector'):
+        patient_data = feature_store.vector(patient)
+    
+    if _wants_async():
+        return _accepted(job_queue.enqueue('predict_complications', {
+            'patient_data': patient_data,
+            'vital_signs_id': latest.vital_signs_id,
+            'lab_results_id': latest.lab_results_id
+        }, patient_id))
     
     try:
-        # Usar dados simulados para treinar o modelo (em produção, usaria dados históricos reais)
-        import pandas as pd
-        import numpy as np
-        
-        # Dados simulados para treinamento
-        training_data = pd.DataFrame({
-            'sinais_vitais_pressao': np.random.rand(100) * 50 + 80,
-            'sinais_vitais_temperatura': np.random.rand(100) * 3 + 36,
-            'exames_laboratoriais_glicose': np.random.rand(100) * 50 + 80,
-            'idade': np.random.randint(20, 80, 100),
-            'complicação': np.random.randint(0, 2, 100)
-        })
-        
-        ai_agent.train_model(training_data, 'complicação')
-        prediction = ai_agent.predict_complication(patient_data)
+        # O modelo é treinado fora da requisição e servido pelo registro de modelos;
+        # se a predição destas leituras já foi calculada em segundo plano, é reaproveitada
+        prediction = _stored_prediction(patient_id, latest) or model_registry.get_agent().predict_complication(patient_data)
         
         return jsonify({
             'patient_id': patient_id,
@@ -145,8 +392,13 @@ def process_clinical_notes(patient_id):
     if 'notes' not in data:
         return jsonify({'error': 'Campo "notes" é obrigatório'}), 400
     
+    if _wants_async():
+        return _accepted(job_queue.enqueue('process_text', {'notes': data['notes']}, patient_id))
+    
     try:
-        processed_notes = ai_agent.process_clinical_notes(data['notes'])
+        # Textos repetidos são servidos pelo cache de extrações (indexado pelo hash do conteúdo)
+        with span('nlp.extract'):
+            processed_notes = {'original_notes': data['notes'], **extraction_cache.process_text(data['notes'])}
         return jsonify({
             'patient_id': patient_id,
             'processed_notes': processed_notes
@@ -155,60 +407,97 @@ def process_clinical_notes(patient_id):
     except Exception as e:
         return jsonify({'error': f'Erro no processamento das notas: {str(e)}'}), 500
 
+@patient_bp.route('/clinical-notes/process-pending', methods=['POST'])
+def process_pending_clinical_notes():
+    """
+    Processa em lote, com nlp.pipe, todas as notas clínicas ainda sem extração.
+    Aceita "patient_id" ou "patient_ids"; sem filtro, processa as notas de todos os pacientes (a ala inteira).
+    Tamanho de lote e processos do spaCy vêm da configuração do servidor (HOLDMED_NLP_BATCH_SIZE e
+    HOLDMED_NLP_PROCESSES), não da requisição.
+    """
+    data = request.get_json(silent=True) or {}
+    patient_ids = data.get('patient_ids')
+    if data.get('patient_id') is not None:
+        patient_ids = [data['patient_id']]
+
+    query = (
+        select(ClinicalNotes.id, ClinicalNotes.content)
+        .outerjoin(ClinicalNoteExtraction, ClinicalNoteExtraction.note_id == ClinicalNotes.id)
+        .where(ClinicalNoteExtraction.note_id.is_(None))
+        .order_by(ClinicalNotes.id)
+        .limit(NOTES_CHUNK_SIZE)
+    )
+    if patient_ids is not None:
+        query = query.where(ClinicalNotes.patient_id.in_(patient_ids))
+
+    processed = 0
+    last_id = 0
+    try:
+        while True:
+            pending = db.session.execute(query.where(ClinicalNotes.id > last_id)).all()
+            if not pending:
+                break
+
+            contents = [content or '' for _, content in pending]
+            results = nlp_service.process_notes_batch(contents)
+            db.session.execute(insert(ClinicalNoteExtraction), [
+                {
+                    'note_id': note_id,
+                    'content_hash': ClinicalNoteExtraction.hash_content(content),
+                    'processed_at': datetime.utcnow(),
+                    **result
+                }
+                for (note_id, _), content, result in zip(pending, contents, results)
+            ])
+            note_search.index_extractions((note_id, result) for (note_id, _), result in zip(pending, results))
+            db.session.commit()
+
+            processed += len(pending)
+            last_id = pending[-1][0]
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro no processamento das notas: {str(e)}', 'processed': processed}), 500
+
+    return jsonify({'processed': processed})
+
 @patient_bp.route('/patients/<int:patient_id>/dashboard-insights', methods=['GET'])
 def get_dashboard_insights(patient_id):
-    patient = Patient.query.get_or_404(patient_id)
+    # Caminho rápido: snapshot pré-calculado ainda válido, validado por ETag/If-None-Match
+    with span('db.insight'):
+        insight = db.session.get(PatientInsight, patient_id)
+        sources = insight_store.current_sources(patient_id)
+    if insight_store.is_fresh(insight, sources, model_registry.current_version()) and not _wants_async():
+        if request.if_none_match.contains(insight.etag):
+            return Response(status=304, headers={'ETag': f'"{insight.etag}"', 'Cache-Control': 'no-cache'})
+        return _insight_response(insight)
     
-    # Obter predição de complicações
-    latest_vital_signs = VitalSigns.query.filter_by(patient_id=patient_id).order_by(VitalSigns.timestamp.desc()).first()
-    latest_lab_results = LabResults.query.filter_by(patient_id=patient_id).order_by(LabResults.timestamp.desc()).first()
-    latest_notes = ClinicalNotes.query.filter_by(patient_id=patient_id).order_by(ClinicalNotes.timestamp.desc()).first()
+    with span('db.patient'):
+        patient = Patient.query.get_or_404(patient_id)
+    
+    # Obter predição de complicações (leituras mais recentes em uma única linha do snapshot)
+    with span('db.latest'):
+        latest = db.session.get(PatientLatest, patient_id)
+        latest_vital_signs = latest.vital_signs if latest else None
+        latest_lab_results = latest.lab_results if latest else None
     
     if not latest_vital_signs or not latest_lab_results:
         return jsonify({'error': 'Dados insuficientes para gerar insights'}), 400
     
     try:
-        # Preparar dados para predição
-        patient_data = {
-            'sinais_vitais_pressao': latest_vital_signs.blood_pressure_systolic or 0,
-            'sinais_vitais_temperatura': latest_vital_signs.temperature or 0,
-            'exames_laboratoriais_glicose': latest_lab_results.glucose or 0,
-            'idade': patient.age
-        }
-        
-        # Treinar modelo com dados simulados
-        import pandas as pd
-        import numpy as np
-        
-        training_data = pd.DataFrame({
-            'sinais_vitais_pressao': np.random.rand(100) * 50 + 80,
-            'sinais_vitais_temperatura': np.random.rand(100) * 3 + 36,
-            'exames_laboratoriais_glicose': np.random.rand(100) * 50 + 80,
-            'idade': np.random.randint(20, 80, 100),
-            'complicação': np.random.randint(0, 2, 100)
-        })
+        if _wants_async():
+            return _accepted(job_queue.enqueue(
+                'dashboard_insights', insight_store.refresh_payload(patient, latest), patient_id
+            ))
         
-        ai_agent.train_model(training_data, 'complicação')
-        prediction = ai_agent.predict_complication(patient_data)
-        
-        # Processar notas clínicas se disponíveis
-        processed_notes = {'keywords': [], 'medical_terms': []}
-        if latest_notes:
-            processed_notes = ai_agent.process_clinical_notes(latest_notes.content)
-        
-        # Gerar insights
-        insights = ai_agent.generate_dashboard_insights(prediction, processed_notes)
-        
-        return jsonify({
-            'patient_id': patient_id,
-            'patient_name': patient.name,
-            'insights': insights,
-            'prediction': prediction,
-            'latest_vital_signs': latest_vital_signs.to_dict() if latest_vital_signs else None,
-            'latest_lab_results': latest_lab_results.to_dict() if latest_lab_results else None,
-            'processed_notes': processed_notes
-        })
+        # Snapshot ausente ou desatualizado: calcula agora e grava para as próximas leituras
+        return _insight_response(insight_store.compute(patient, latest))
     
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': f'Erro ao gerar insights: {str(e)}'}), 500
 
+def _insight_response(insight):
+    response = jsonify(insight.body)
+    response.set_etag(insight.etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,90 @@
+import click
+from flask import Blueprint, jsonify, request
+from sqlalchemy import func, select
+
+from instrumentation import span
+from models.patient import Patient, VitalSigns, db
+from models.risk import RiskScore
+import risk_board
+import serialization
+
+risk_bp = Blueprint('risk', __name__)
+
+DEFAULT_BOARD_SIZE = 20
+MAX_BOARD_SIZE = 500
+
+# Colunas do quadro: posição e risco, dados do paciente e os sinais vitais usados no cálculo
+BOARD_COLUMNS = {
+    'rank': RiskScore.rank,
+    'patient_id': RiskScore.patient_id,
+    'score': RiskScore.score,
+    'complication_predicted': RiskScore.complication_predicted,
+    'name': Patient.name,
+    'age': Patient.age,
+    'gender': Patient.gender,
+    'surgery_type': Patient.surgery_type,
+    'surgery_date': Patient.surgery_date,
+    'vital_signs_timestamp': VitalSigns.timestamp,
+    'heart_rate': VitalSigns.heart_rate,
+    'blood_pressure_systolic': VitalSigns.blood_pressure_systolic,
+    'temperature': VitalSigns.temperature,
+    'oxygen_saturation': VitalSigns.oxygen_saturation,
+    'respiratory_rate': VitalSigns.respiratory_rate,
+}
+
+@risk_bp.route('/risk-board', methods=['GET'])
+def get_risk_board():
+    """
+    Pacientes de maior risco segundo a última varredura, em ordem de risco.
+    Parâmetros: limit (padrão 20, máximo 500), surgery_type (repetível) e min_score.
+    """
+    limit = min(max(request.args.get('limit', DEFAULT_BOARD_SIZE, type=int), 1), MAX_BOARD_SIZE)
+    conditions = []
+    surgery_types = request.args.getlist('surgery_type')
+    if surgery_types:
+        conditions.append(Patient.surgery_type.in_(surgery_types))
+    if request.args.get('min_score'):
+        min_score = request.args.get('min_score', type=float)
+        if min_score is None:
+            return jsonify({'error': 'Parâmetro "min_score" deve ser um número'}), 400
+        conditions.append(RiskScore.score >= min_score)
+
+    # Percorre o índice do ranking e para nas primeiras linhas; paciente e sinais vitais por chave primária
+    with span('db.risk_board'):
+        rows = db.session.execute(
+            select(*BOARD_COLUMNS.values(), RiskScore.model_version, RiskScore.scored_at)
+            .join(Patient, Patient.id == RiskScore.patient_id)
+            .outerjoin(VitalSigns, VitalSigns.id == RiskScore.vital_signs_id)
+            .where(*conditions)
+            .order_by(RiskScore.rank)
+            .limit(limit)
+        ).all()
+        total = db.session.execute(select(func.max(RiskScore.rank))).scalar() or 0
+
+    names = list(BOARD_COLUMNS)
+    return serialization.json_response({
+        'computed_at': rows[0].scored_at if rows else risk_board.last_sweep_at(),
+        'model_version': rows[0].model_version if rows else None,
+        'total_patients': total,
+        'patients': serialization.rows_to_dicts(names, (row[:len(names)] for row in rows)),
+    })
+
+@risk_bp.route('/risk-board/sweep', methods=['POST'])
+def sweep_risk_board():
+    """
+    Executa a varredura agora (além da periódica) e retorna o resumo
+    """
+    try:
+        return jsonify(risk_board.sweep()), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro na varredura de risco: {str(e)}'}), 500
+
+@risk_bp.cli.command('sweep')
+def sweep_command():
+    """Pontua todos os pacientes ativos e atualiza o quadro de risco."""
+    summary = risk_board.sweep()
+    click.echo(f"{summary['patients']} pacientes pontuados em {summary['seconds']}s "
+               f"({summary['complications_predicted']} com complicação prevista, modelo {summary['model_version']})")
+    if summary['imputed']:
+        click.echo(f"{summary['imputed']} pacientes com dados ausentes (ex.: idade) preenchidos pela mediana")
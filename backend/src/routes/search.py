@@ -0,0 +1,67 @@
+from flask import Blueprint, jsonify, request, url_for
+
+from instrumentation import span
+from note_search import SORTS, TERM_KINDS, fts_query, note_search
+from request_params import datetime_arg, decode_cursor, encode_cursor
+import serialization
+
+search_bp = Blueprint('search', __name__)
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+def _decode_cursor(cursor, sort):
+    return decode_cursor(cursor, 3 if sort == 'relevance' else 1)
+
+@search_bp.route('/notes/search', methods=['GET'])
+def search_notes():
+    """
+    Busca nas notas clínicas: q (texto completo; "frase", prefixo*) e os termos extraídos pelo NLP
+    em entity, keyword e medical_term (repetíveis; a nota precisa ter todos). match=any aceita
+    qualquer palavra de q. Filtros: patient_id e note_type (repetíveis), since/until (ISO 8601).
+    sort=relevance (padrão com q) ou recent. Paginação por cursor, como em GET /patients;
+    count=1 inclui X-Total-Count na primeira página.
+    """
+    query = request.args.get('q', '').strip()
+    any_term = request.args.get('match', 'all') == 'any'
+    terms = [(term, kind) for kind in TERM_KINDS for term in request.args.getlist(kind) if term.strip()]
+    if not query and not terms:
+        return jsonify({'error': f'Informe "q" ou um termo ({", ".join(TERM_KINDS)})'}), 400
+    if query and not fts_query(query):
+        return jsonify({'error': 'O parâmetro "q" não tem palavras para buscar'}), 400
+
+    sort = request.args.get('sort', 'relevance' if query else 'recent')
+    if sort not in SORTS:
+        return jsonify({'error': f'Ordenação desconhecida: {sort}'}), 400
+    limit = min(max(request.args.get('limit', DEFAULT_SEARCH_LIMIT, type=int), 1), MAX_SEARCH_LIMIT)
+    cursor = request.args.get('cursor')
+
+    try:
+        filters = {
+            'query': query,
+            'any_term': any_term,
+            'terms': terms,
+            'patient_ids': request.args.getlist('patient_id', type=int),
+            'note_types': request.args.getlist('note_type'),
+            'since': datetime_arg('since'),
+            'until': datetime_arg('until'),
+        }
+        after = _decode_cursor(cursor, sort) if cursor else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    with span('db.note_search'):
+        rows, sort, next_key = note_search.search(**filters, sort=sort, after=after, limit=limit)
+
+    headers = {'X-Search-Sort': sort}
+    if cursor is None and request.args.get('count', '').lower() in ('1', 'true', 'yes'):
+        with span('db.note_search_count'):
+            headers['X-Total-Count'] = str(note_search.count(**filters))
+    if next_key is not None:
+        next_cursor = encode_cursor(next_key)
+        arguments = {**request.args.to_dict(flat=False), 'cursor': next_cursor, 'sort': sort}
+        arguments.pop('count', None)
+        headers['X-Next-Cursor'] = next_cursor
+        headers['Link'] = f'<{url_for("search.search_notes", _external=True, **arguments)}>; rel="next"'
+
+    return serialization.rows_response(note_search.names, rows, headers)
@@ -0,0 +1,33 @@
+from flask import Blueprint, Response, request
+from models.patient import Patient
+from push import WARD_TOPIC, event_broker, patient_topic
+
+stream_bp = Blueprint('stream', __name__)
+
+def _event_stream(topics):
+    subscription = event_broker.subscribe(topics)
+    return Response(event_broker.stream(subscription), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        # Desativa o buffer de proxies reversos (nginx) para os eventos chegarem na hora
+        'X-Accel-Buffering': 'no'
+    })
+
+@stream_bp.route('/stream', methods=['GET'])
+def stream_events():
+    """
+    Server-Sent Events com novas leituras e alertas.
+    ?patient_id=1&patient_id=2 assina pacientes específicos; sem patient_id (ou com ?ward=1), a ala inteira.
+    """
+    patient_ids = request.args.getlist('patient_id', type=int)
+    topics = {patient_topic(patient_id) for patient_id in patient_ids}
+    if not topics or request.args.get('ward', '').lower() in ('1', 'true', 'yes'):
+        topics.add(WARD_TOPIC)
+    return _event_stream(topics)
+
+@stream_bp.route('/patients/<int:patient_id>/stream', methods=['GET'])
+def stream_patient_events(patient_id):
+    """
+    Server-Sent Events com as novas leituras e alertas de um paciente
+    """
+    Patient.query.get_or_404(patient_id)
+    return _event_stream({patient_topic(patient_id)})
@@ -1,12 +1,14 @@
 from flask import Blueprint, jsonify, request
 from models.user import User, db
+import serialization
 
 user_bp = Blueprint('user', __name__)
 
 @user_bp.route('/users', methods=['GET'])
 def get_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    # Lista em streaming, lida e codificada em lotes (NDJSON com ?format=ndjson ou Accept: application/x-ndjson)
+    names = serialization.column_names(User)
+    return serialization.stream_rows(serialization.select_columns(User, names).order_by(User.id), names)
 
 @user_bp.route('/users', methods=['POST'])
 def create_user():
@@ -0,0 +1,109 @@
+import json
+from datetime import date, datetime
+
+from flask import Response, request, stream_with_context
+from sqlalchemy import select
+
+from instrumentation import span
+from models.user import db
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional: sem ele, usa o módulo json da biblioteca padrão
+    orjson = None
+
+# Linhas lidas do banco e codificadas por vez nas respostas em streaming
+STREAM_BATCH_SIZE = 1000
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'Objeto do tipo {type(value).__name__} não é serializável em JSON')
+
+
+def dumps(obj) -> bytes:
+    """
+    Codifica em JSON (UTF-8) com orjson, se instalado. Datas saem em ISO 8601, como em to_dict().
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=_default).encode('utf-8')
+
+
+def column_names(model) -> list:
+    """
+    Colunas da tabela do modelo, na ordem de declaração (a mesma dos campos de to_dict()). Colunas
+    derivadas (info={'derived': True}), como Patient.name_key, ficam de fora.
+    """
+    return [name for name, column in model.__table__.columns.items() if not column.info.get('derived')]
+
+
+def select_columns(model, names: list = None):
+    """
+    SELECT só com as colunas serializadas: as linhas chegam como tuplas, sem montar objetos do ORM.
+    """
+    names = names or column_names(model)
+    return select(*(getattr(model, name) for name in names))
+
+
+def rows_to_dicts(names: list, rows) -> list:
+    return [dict(zip(names, row)) for row in rows]
+
+
+def json_response(obj, status: int = 200) -> Response:
+    with span('json.encode'):
+        body = dumps(obj)
+    return Response(body, status=status, mimetype='application/json')
+
+
+def wants_ndjson() -> bool:
+    # ?format=ndjson ou Accept: application/x-ndjson
+    if request.args.get('format', '').lower() == 'ndjson':
+        return True
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+def rows_response(names: list, rows, headers: dict = None) -> Response:
+    """
+    Resposta com uma lista já lida (ex.: uma página): array JSON ou NDJSON, como em stream_rows.
+    """
+    records = rows_to_dicts(names, rows)
+    with span('json.encode'):
+        if wants_ndjson():
+            return Response(b''.join(dumps(record) + b'\n' for record in records),
+                            mimetype=NDJSON_MIMETYPE, headers=headers)
+        return Response(dumps(records), mimetype='application/json', headers=headers)
+
+
+def _encode_stream(statement, names: list, ndjson: bool):
+    result = db.session.execute(statement.execution_options(yield_per=STREAM_BATCH_SIZE))
+    first = True
+    if not ndjson:
+        yield b'['
+    for rows in result.partitions():
+        records = rows_to_dicts(names, rows)
+        if ndjson:
+            yield b''.join(dumps(record) + b'\n' for record in records)
+        else:
+            # Um único dumps por lote; os colchetes do lote são descartados
+            chunk = dumps(records)[1:-1]
+            yield chunk if first else b',' + chunk
+            first = False
+    if not ndjson:
+        yield b']'
+
+
+def stream_rows(statement, names: list) -> Response:
+    """
+    Resposta em streaming (chunked) de um SELECT de colunas: array JSON ou, se o cliente pedir,
+    NDJSON (um objeto por linha). As linhas são lidas e codificadas em lotes de STREAM_BATCH_SIZE,
+    então a memória não cresce com o número de linhas.
+    """
+    ndjson = wants_ndjson()
+    return Response(
+        stream_with_context(_encode_stream(statement, names, ndjson)),
+        mimetype=NDJSON_MIMETYPE if ndjson else 'application/json'
+    )
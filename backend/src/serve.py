@@ -0,0 +1,128 @@
+"""
+Servidor de produção do HoldMed.
+
+Carrega a aplicação, o pipeline spaCy e o modelo de IA uma única vez no processo mestre e
+depois cria os workers do gunicorn com fork: as páginas de memória desses objetos são
+compartilhadas (copy-on-write) entre os workers em vez de carregadas em cada um.
+
+Uso:
+    python serve.py --workers 4 --threads 8 --bind 0.0.0.0:5000
+"""
+import argparse
+import gc
+import os
+import time
+
+from gunicorn.app.base import BaseApplication
+
+
+def process_memory() -> dict:
+    """
+    Memória do processo atual em MB. rss inclui páginas compartilhadas com o mestre;
+    pss divide as compartilhadas entre os processos e mostra o custo real de cada worker.
+    """
+    memory = {}
+    for path, fields in (('/proc/self/status', ('VmRSS',)), ('/proc/self/smaps_rollup', ('Pss', 'Private_Dirty'))):
+        try:
+            with open(path) as f:
+                for line in f:
+                    name, _, value = line.partition(':')
+                    if name in fields:
+                        memory[name.lower()] = round(int(value.split()[0]) / 1024, 1)
+        except OSError:
+            pass
+
+    if not memory:
+        import resource
+        memory['maxrss'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return memory
+
+
+def preload():
+    """
+    Cria a aplicação e carrega os recursos pesados no processo mestre.
+    Retorna a aplicação e o tempo de inicialização em segundos.
+    """
+    started = time.perf_counter()
+
+    from main import create_app
+    from models.user import db
+    import storage
+
+    # Aquecimento síncrono: modelo e spaCy já carregados no mestre, antes do fork
+    app = create_app({'WARMUP': 'eager'})
+    # Cada worker abre as próprias conexões com o banco
+    storage.dispose(app, db)
+
+    # Move os objetos já carregados para a geração permanente: o coletor de lixo dos workers
+    # não toca nessas páginas, o que preserva o compartilhamento copy-on-write
+    gc.collect()
+    gc.freeze()
+
+    return app, time.perf_counter() - started
+
+
+class HoldMedServer(BaseApplication):
+    def __init__(self, app, options):
+        self.application = app
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
+
+
+def _post_fork(server, worker):
+    # Conexões abertas no mestre depois do preload (ex.: tarefas em segundo plano) não podem ser
+    # usadas pelo worker: o pool herdado é descartado e o worker abre as próprias
+    from models.user import db
+    import storage
+
+    storage.dispose(server.app.application, db, close=False)
+
+
+def _post_worker_init(worker):
+    print(f"👷 Worker {worker.pid} pronto - memória: {process_memory()}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor de produção do HoldMed (gunicorn com pré-carregamento).')
+    parser.add_argument('--bind', default=os.environ.get('HOLDMED_BIND', '0.0.0.0:5000'))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('HOLDMED_WORKERS', os.cpu_count() or 1)))
+    # Threads por worker: cada conexão de streaming (SSE) ocupa uma thread
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('HOLDMED_THREADS', 8)))
+    parser.add_argument('--timeout', type=int, default=120)
+    args = parser.parse_args()
+
+    app, startup_seconds = preload()
+    print(f"⚙️  Aplicação carregada em {startup_seconds:.2f}s - memória do mestre: {process_memory()}", flush=True)
+
+    # Divide os núcleos entre os pools de tarefas dos workers, se não houver configuração explícita
+    from jobs import job_queue
+    if job_queue.max_workers is None:
+        job_queue.max_workers = max(1, (os.cpu_count() or 1) // args.workers)
+
+    # Com vários workers, cada conexão SSE fica em um deles: os eventos publicados em qualquer
+    # processo passam pelo banco (tabela push_event) para chegar a todas as conexões
+    from push import event_broker
+    if args.workers > 1:
+        event_broker.relay = True
+
+    HoldMedServer(app, {
+        'bind': args.bind,
+        'workers': args.workers,
+        'threads': args.threads,
+        'worker_class': 'gthread',
+        'timeout': args.timeout,
+        'preload_app': True,
+        'post_fork': _post_fork,
+        'post_worker_init': _post_worker_init,
+    }).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Configuração do armazenamento: URL do banco, pool de conexões, ajustes do SQLite e roteamento
+das leituras para uma réplica.
+
+Variáveis de ambiente:
+    HOLDMED_DATABASE_URL            URL SQLAlchemy do banco principal (padrão: database/app.db)
+    HOLDMED_DATABASE_REPLICA_URL    URL de uma réplica de leitura, usada pelas rotas GET
+    HOLDMED_DB_POOL_SIZE            conexões mantidas no pool por engine (padrão 10)
+    HOLDMED_DB_MAX_OVERFLOW         conexões extras além do pool em picos (padrão 20)
+    HOLDMED_DB_POOL_TIMEOUT         segundos esperando uma conexão livre (padrão 30)
+    HOLDMED_SQLITE_TUNING           0 mantém os padrões do SQLite (sem WAL e sem os PRAGMAs abaixo)
+    HOLDMED_SQLITE_BUSY_TIMEOUT_MS  espera por um lock antes de "database is locked" (padrão 10000)
+    HOLDMED_SQLITE_MMAP_SIZE        bytes do arquivo mapeados em memória (padrão 256 MB)
+"""
+import os
+
+from flask import has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql.dml import UpdateBase
+
+# Bind do Flask-SQLAlchemy da réplica de leitura (SQLALCHEMY_BINDS)
+REPLICA_BIND = 'replica'
+
+# Métodos HTTP cujas leituras podem ir para a réplica
+READ_METHODS = ('GET', 'HEAD')
+
+POOL_SIZE = int(os.environ.get('HOLDMED_DB_POOL_SIZE', 10))
+MAX_OVERFLOW = int(os.environ.get('HOLDMED_DB_MAX_OVERFLOW', 20))
+POOL_TIMEOUT = float(os.environ.get('HOLDMED_DB_POOL_TIMEOUT', 30))
+
+SQLITE_TUNING = os.environ.get('HOLDMED_SQLITE_TUNING', '1').lower() not in ('0', 'false', 'no')
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('HOLDMED_SQLITE_BUSY_TIMEOUT_MS', 10000))
+SQLITE_MMAP_SIZE = int(os.environ.get('HOLDMED_SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+
+
+def database_url(default: str) -> str:
+    return os.environ.get('HOLDMED_DATABASE_URL') or default
+
+
+def _is_sqlite_file(url) -> bool:
+    url = make_url(url)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def engine_options(url) -> dict:
+    """
+    Opções de create_engine para a URL: pool com tamanho explícito e, no SQLite, o timeout
+    do driver igual ao busy_timeout. Bancos SQLite em memória mantêm o pool padrão do SQLAlchemy.
+    """
+    url = make_url(url)
+    if url.get_backend_name() == 'sqlite':
+        if not _is_sqlite_file(url):
+            return {}
+        return {
+            'pool_size': POOL_SIZE,
+            'max_overflow': MAX_OVERFLOW,
+            'pool_timeout': POOL_TIMEOUT,
+            'connect_args': {'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000, 'check_same_thread': False},
+        }
+    return {
+        'pool_size': POOL_SIZE,
+        'max_overflow': MAX_OVERFLOW,
+        'pool_timeout': POOL_TIMEOUT,
+        # Servidores de banco fecham conexões ociosas: valida antes de usar e renova periodicamente
+        'pool_pre_ping': True,
+        'pool_recycle': 1800,
+    }
+
+
+def _sqlite_pragmas(primary: bool):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            if primary:
+                # WAL: leitores não bloqueiam o escritor nem são bloqueados por ele
+                cursor.execute('PRAGMA journal_mode=WAL')
+            # Com WAL, NORMAL só sincroniza no checkpoint; uma queda perde no máximo as últimas transações
+            cursor.execute('PRAGMA synchronous=NORMAL')
+            cursor.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS:d}')
+            cursor.execute(f'PRAGMA mmap_size={SQLITE_MMAP_SIZE:d}')
+        finally:
+            cursor.close()
+    return set_pragmas
+
+
+def configure(app):
+    """
+    Preenche a configuração do Flask-SQLAlchemy (antes de db.init_app): opções do engine
+    principal e, se houver, o bind da réplica de leitura.
+    """
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config['SQLALCHEMY_DATABASE_URI']))
+    app.config.setdefault('SQLITE_TUNING', SQLITE_TUNING)
+
+    replica_url = app.config.get('SQLALCHEMY_REPLICA_URI') or os.environ.get('HOLDMED_DATABASE_REPLICA_URL')
+    if replica_url:
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        binds.setdefault(REPLICA_BIND, {'url': replica_url, **engine_options(replica_url)})
+        app.config['SQLALCHEMY_BINDS'] = binds
+
+
+def init_app(app, db):
+    """
+    Aplica os PRAGMAs a cada nova conexão dos engines SQLite (depois de db.init_app).
+    """
+    if not app.config['SQLITE_TUNING']:
+        return
+    with app.app_context():
+        for key, engine in db.engines.items():
+            if _is_sqlite_file(engine.url):
+                event.listen(engine, 'connect', _sqlite_pragmas(primary=key != REPLICA_BIND))
+
+
+def dispose(app, db, close: bool = True):
+    """
+    Fecha as conexões abertas dos pools (ex.: no processo mestre antes do fork dos workers,
+    que não podem compartilhar conexões herdadas). close=False, no processo filho, só descarta
+    as conexões herdadas sem fechá-las, pois elas continuam sendo do processo pai.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=close)
+
+
+class RoutingSession(Session):
+    """
+    Sessão que envia as leituras das requisições GET/HEAD para a réplica, se configurada.
+
+    Escritas (flush, INSERT/UPDATE/DELETE) vão sempre para o banco principal; depois da primeira
+    escrita, as leituras da mesma sessão também, para enxergarem o que acabou de ser gravado.
+    Fora de requisições (tarefas em segundo plano, comandos) tudo usa o banco principal.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or isinstance(clause, UpdateBase):
+                self.info['holdmed_wrote'] = True
+            elif not self.info.get('holdmed_wrote') and has_request_context() and request.method in READ_METHODS:
+                replica = self._db.engines.get(REPLICA_BIND)
+                if replica is not None:
+                    return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
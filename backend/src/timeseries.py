@@ -0,0 +1,418 @@
+import zlib
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import case, delete, select, update
+
+from models.patient import VitalSigns, LabResults, dialect_insert, db
+from models.timeseries import SeriesChunk, SeriesHead, SeriesRollup
+
+# Séries armazenadas e a tabela de origem de cada uma
+SERIES_MODELS = {
+    'vital_signs': VitalSigns,
+    'lab_results': LabResults,
+}
+
+# Resoluções dos agregados, em segundos
+RESOLUTIONS = {'1m': 60, '15m': 15 * 60, '1h': 60 * 60}
+
+# Leituras acumuladas na tabela de origem antes de serem compactadas em um bloco colunar
+CHUNK_ROWS = 1024
+
+# Janela padrão das consultas sem "since"
+DEFAULT_WINDOW = timedelta(hours=24)
+
+# A resolução automática escolhe a mais fina com até este número de pontos
+MAX_AUTO_POINTS = 1500
+
+# Leituras lidas por transação na reconstrução
+REBUILD_BATCH_SIZE = 5000
+
+
+def series_fields(series: str) -> list:
+    """
+    Campos numéricos de uma série (todas as colunas da tabela de origem, exceto id, paciente e horário).
+    """
+    return [
+        column.name for column in SERIES_MODELS[series].__table__.columns
+        if column.name not in ('id', 'patient_id', 'timestamp')
+    ]
+
+
+def _to_ms(timestamps) -> np.ndarray:
+    return np.array(timestamps, dtype='datetime64[ms]').astype(np.int64)
+
+
+def _from_ms(milliseconds) -> list:
+    return np.asarray(milliseconds, dtype=np.int64).astype('datetime64[ms]').tolist()
+
+
+def _encode_timestamps(milliseconds: np.ndarray) -> bytes:
+    # Diferenças entre leituras consecutivas são pequenas e repetitivas: comprimem muito melhor
+    return zlib.compress(np.diff(milliseconds, prepend=0).astype('<i8').tobytes())
+
+
+def _decode_timestamps(blob: bytes) -> np.ndarray:
+    return np.cumsum(np.frombuffer(zlib.decompress(blob), dtype='<i8'))
+
+
+def _encode_values(values: np.ndarray) -> bytes:
+    # Uma coluna contígua por campo; leituras ausentes ficam como NaN
+    return zlib.compress(np.ascontiguousarray(values.T, dtype='<f8').tobytes())
+
+
+def _decode_values(blob: bytes, n_fields: int) -> np.ndarray:
+    return np.frombuffer(zlib.decompress(blob), dtype='<f8').reshape(n_fields, -1)
+
+
+def _as_list(column: np.ndarray) -> list:
+    return [None if value != value else value for value in column.tolist()]
+
+
+def _aggregate(patient_ids, seconds, values, resolution):
+    """
+    Agrupa as leituras por (paciente, intervalo) e calcula contagem, soma, mínimo e máximo de
+    cada campo, ignorando valores ausentes.
+    """
+    buckets = seconds // resolution * resolution
+    order = np.lexsort((buckets, patient_ids))
+    patient_ids, buckets, values = patient_ids[order], buckets[order], values[order]
+
+    boundaries = (patient_ids[1:] != patient_ids[:-1]) | (buckets[1:] != buckets[:-1])
+    starts = np.flatnonzero(np.concatenate(([True], boundaries)))
+
+    present = ~np.isnan(values)
+    counts = np.add.reduceat(present, starts, axis=0)
+    sums = np.add.reduceat(np.where(present, values, 0.0), starts, axis=0)
+    minimums = np.fmin.reduceat(values, starts, axis=0)
+    maximums = np.fmax.reduceat(values, starts, axis=0)
+    return patient_ids[starts], buckets[starts], counts, sums, minimums, maximums
+
+
+class SeriesStore:
+    """
+    Armazenamento de séries temporais de sinais vitais e exames para gráficos de tendência.
+
+    As tabelas de leituras continuam sendo a origem dos dados. A cada inserção, na mesma
+    transação, são atualizados os agregados por minuto, 15 minutos e hora (SeriesRollup); a cada
+    CHUNK_ROWS leituras de um paciente, elas são compactadas em um bloco colunar (SeriesChunk).
+    Consultas leem agregados ou blocos com consultas de colunas, sem criar objetos ORM.
+    """
+
+    def record(self, *rows):
+        """
+        Registra leituras recém-inseridas (VitalSigns ou LabResults) na mesma transação da inserção.
+        """
+        db.session.flush()
+        by_series = {}
+        for row in rows:
+            series = next(name for name, model in SERIES_MODELS.items() if isinstance(row, model))
+            by_series.setdefault(series, []).append(row)
+        for series, series_rows in by_series.items():
+            fields = series_fields(series)
+            self._append(series, [
+                (row.patient_id, row.id, row.timestamp, *(getattr(row, field) for field in fields))
+                for row in series_rows
+            ])
+
+    def record_readings(self, series: str, readings):
+        """
+        Versão em lote de record para inserções feitas sem objetos ORM.
+        readings: dicionários com patient_id, id, timestamp e os campos da série.
+        """
+        fields = series_fields(series)
+        self._append(series, [
+            (reading['patient_id'], reading['id'], reading['timestamp'], *(reading.get(field) for field in fields))
+            for reading in readings
+        ])
+
+    def _append(self, series, rows):
+        # rows: tuplas (patient_id, id, timestamp, *campos)
+        if not rows:
+            return
+        patient_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        milliseconds = _to_ms([row[2] for row in rows])
+        values = np.array([row[3:] for row in rows], dtype=float)
+
+        newest = {}
+        for row in rows:
+            newest[row[0]] = max(newest.get(row[0], 0), row[1])
+
+        self._update_rollups(series, patient_ids, milliseconds, values)
+        self._advance_heads(series, patient_ids, newest)
+
+    def _update_rollups(self, series, patient_ids, milliseconds, values):
+        fields = series_fields(series)
+        records = []
+        for resolution in RESOLUTIONS.values():
+            groups = _aggregate(patient_ids, milliseconds // 1000, values, resolution)
+            for patient_id, bucket, counts, sums, minimums, maximums in zip(*groups):
+                for index, field in enumerate(fields):
+                    if counts[index]:
+                        records.append({
+                            'patient_id': int(patient_id),
+                            'series': series,
+                            'resolution': resolution,
+                            'bucket': int(bucket),
+                            'field': field,
+                            'count': int(counts[index]),
+                            'sum': float(sums[index]),
+                            'min': float(minimums[index]),
+                            'max': float(maximums[index]),
+                        })
+
+        if records:
+            insert = dialect_insert(SeriesRollup.__table__)
+            current, new = SeriesRollup.__table__.c, insert.excluded
+            db.session.execute(insert.on_conflict_do_update(
+                index_elements=['patient_id', 'series', 'resolution', 'bucket', 'field'],
+                set_={
+                    'count': current['count'] + new['count'],
+                    'sum': current['sum'] + new['sum'],
+                    'min': case((new['min'] < current['min'], new['min']), else_=current['min']),
+                    'max': case((new['max'] > current['max'], new['max']), else_=current['max']),
+                }
+            ), records)
+
+    def _advance_heads(self, series, patient_ids, newest):
+        unique_ids, counts = np.unique(patient_ids, return_counts=True)
+        insert = dialect_insert(SeriesHead.__table__)
+        db.session.execute(insert.on_conflict_do_update(
+            index_elements=['patient_id', 'series'],
+            set_={'pending_count': SeriesHead.__table__.c.pending_count + insert.excluded.pending_count}
+        ), [
+            {'patient_id': int(patient_id), 'series': series, 'sealed_through_id': 0, 'pending_count': int(count)}
+            for patient_id, count in zip(unique_ids, counts)
+        ])
+
+        full = db.session.scalars(
+            select(SeriesHead.patient_id).where(
+                SeriesHead.series == series,
+                SeriesHead.patient_id.in_(unique_ids.tolist()),
+                SeriesHead.pending_count >= CHUNK_ROWS
+            )
+        ).all()
+        for patient_id in full:
+            self._seal(series, patient_id, newest[patient_id])
+
+    def _seal(self, series, patient_id, through_id):
+        """
+        Compacta as leituras do paciente ainda fora de blocos, até o id through_id, em um novo SeriesChunk.
+        """
+        model = SERIES_MODELS[series]
+        fields = series_fields(series)
+        sealed_through_id = db.session.execute(
+            select(SeriesHead.sealed_through_id).where(SeriesHead.patient_id == patient_id, SeriesHead.series == series)
+        ).scalar_one()
+
+        rows = db.session.execute(
+            select(model.id, model.timestamp, *(getattr(model, field) for field in fields))
+            .where(model.patient_id == patient_id, model.id > sealed_through_id, model.id <= through_id)
+            .order_by(model.id)
+        ).all()
+        if not rows:
+            return
+
+        milliseconds = _to_ms([row[1] for row in rows])
+        values = np.array([row[2:] for row in rows], dtype=float)
+        order = np.argsort(milliseconds, kind='stable')
+        milliseconds, values = milliseconds[order], values[order]
+
+        # O UPDATE condicional impede que dois processos compactem as mesmas leituras
+        remaining = SeriesHead.pending_count - len(rows)
+        claimed = db.session.execute(
+            update(SeriesHead)
+            .where(
+                SeriesHead.patient_id == patient_id,
+                SeriesHead.series == series,
+                SeriesHead.sealed_through_id == sealed_through_id
+            )
+            .values(sealed_through_id=rows[-1].id, pending_count=case((remaining > 0, remaining), else_=0))
+        ).rowcount
+        if not claimed:
+            return
+
+        start_time, end_time = _from_ms([milliseconds[0], milliseconds[-1]])
+        db.session.add(SeriesChunk(
+            patient_id=patient_id,
+            series=series,
+            start_time=start_time,
+            end_time=end_time,
+            first_id=rows[0].id,
+            last_id=rows[-1].id,
+            count=len(rows),
+            fields=fields,
+            timestamps=_encode_timestamps(milliseconds),
+            values=_encode_values(values)
+        ))
+
+    def rebuild(self, patient_ids=None, series_names=None):
+        """
+        Reconstrói agregados e blocos a partir das tabelas de leituras (ex.: banco pré-existente).
+        patient_ids e series_names restringem a reconstrução a esses pacientes e séries (ex.: importação).
+        """
+        series_names = list(series_names or SERIES_MODELS)
+        if patient_ids is not None:
+            patient_ids = list(patient_ids)
+        for table in (SeriesRollup, SeriesHead, SeriesChunk):
+            statement = delete(table).where(table.series.in_(series_names))
+            if patient_ids is not None:
+                statement = statement.where(table.patient_id.in_(patient_ids))
+            db.session.execute(statement)
+
+        for series in series_names:
+            model = SERIES_MODELS[series]
+            columns = [getattr(model, field) for field in series_fields(series)]
+            last_id = 0
+            while True:
+                query = select(model.patient_id, model.id, model.timestamp, *columns).where(model.id > last_id)
+                if patient_ids is not None:
+                    query = query.where(model.patient_id.in_(patient_ids))
+                rows = db.session.execute(query.order_by(model.id).limit(REBUILD_BATCH_SIZE)).all()
+                if not rows:
+                    break
+                self._append(series, rows)
+                db.session.commit()
+                last_id = rows[-1].id
+        db.session.commit()
+
+    @staticmethod
+    def choose_resolution(since: datetime, until: datetime) -> str:
+        """
+        Resolução mais fina que mantém o intervalo pedido em até MAX_AUTO_POINTS pontos.
+        """
+        span = (until - since).total_seconds()
+        for name, seconds in sorted(RESOLUTIONS.items(), key=lambda item: item[1]):
+            if span / seconds <= MAX_AUTO_POINTS:
+                return name
+        return '1h'
+
+    def query(self, series: str, patient_id: int, resolution: str = 'auto', since: datetime = None,
+              until: datetime = None, fields: list = None) -> dict:
+        """
+        Série de um paciente no intervalo [since, until), em colunas.
+        resolution: 'raw' (leituras individuais), '1m', '15m', '1h' ou 'auto'.
+        """
+        available = series_fields(series)
+        fields = fields or available
+        unknown = [field for field in fields if field not in available]
+        if unknown:
+            raise ValueError(f"Campos desconhecidos: {', '.join(unknown)}")
+
+        if since is None:
+            since = (until or datetime.utcnow()) - DEFAULT_WINDOW
+        if resolution == 'auto':
+            resolution = self.choose_resolution(since, until or max(datetime.utcnow(), since))
+
+        if resolution == 'raw':
+            timestamps, data = self._raw(series, patient_id, since, until, fields)
+        elif resolution in RESOLUTIONS:
+            timestamps, data = self._rollups(series, patient_id, RESOLUTIONS[resolution], since, until, fields)
+        else:
+            raise ValueError(f"Resolução inválida: {resolution} (use raw, auto, {', '.join(RESOLUTIONS)})")
+
+        return {
+            'patient_id': patient_id,
+            'series': series,
+            'resolution': resolution,
+            'since': since.isoformat(),
+            'until': until.isoformat() if until else None,
+            'timestamps': [timestamp.isoformat() for timestamp in timestamps],
+            'fields': data
+        }
+
+    def _raw(self, series, patient_id, since, until, fields):
+        model = SERIES_MODELS[series]
+        chunk_query = select(SeriesChunk.fields, SeriesChunk.timestamps, SeriesChunk.values).where(
+            SeriesChunk.patient_id == patient_id,
+            SeriesChunk.series == series,
+            SeriesChunk.end_time >= since
+        )
+        if until:
+            chunk_query = chunk_query.where(SeriesChunk.start_time < until)
+
+        since_ms = _to_ms([since])[0]
+        until_ms = _to_ms([until])[0] if until else None
+        parts_ms, parts_values = [], []
+        for chunk_fields, chunk_timestamps, chunk_values in db.session.execute(chunk_query):
+            milliseconds = _decode_timestamps(chunk_timestamps)
+            columns = _decode_values(chunk_values, len(chunk_fields))
+            mask = milliseconds >= since_ms
+            if until_ms is not None:
+                mask &= milliseconds < until_ms
+            # Blocos antigos podem não ter um campo adicionado depois: fica ausente
+            selected = np.full((len(fields), int(mask.sum())), np.nan)
+            for index, field in enumerate(fields):
+                if field in chunk_fields:
+                    selected[index] = columns[chunk_fields.index(field)][mask]
+            parts_ms.append(milliseconds[mask])
+            parts_values.append(selected)
+
+        # Leituras ainda não compactadas
+        sealed_through_id = db.session.execute(
+            select(SeriesHead.sealed_through_id).where(SeriesHead.patient_id == patient_id, SeriesHead.series == series)
+        ).scalar() or 0
+        tail_query = select(model.timestamp, *(getattr(model, field) for field in fields)).where(
+            model.patient_id == patient_id,
+            model.id > sealed_through_id,
+            model.timestamp >= since
+        )
+        if until:
+            tail_query = tail_query.where(model.timestamp < until)
+        tail = db.session.execute(tail_query).all()
+        if tail:
+            parts_ms.append(_to_ms([row[0] for row in tail]))
+            parts_values.append(np.array([row[1:] for row in tail], dtype=float).T)
+
+        if not parts_ms:
+            return [], {field: [] for field in fields}
+
+        milliseconds = np.concatenate(parts_ms)
+        values = np.concatenate(parts_values, axis=1)
+        order = np.argsort(milliseconds, kind='stable')
+        return _from_ms(milliseconds[order]), {
+            field: _as_list(values[index][order]) for index, field in enumerate(fields)
+        }
+
+    def _rollups(self, series, patient_id, resolution, since, until, fields):
+        # O primeiro intervalo é o que contém "since"
+        first_bucket = int(_to_ms([since])[0] // 1000) // resolution * resolution
+        query = select(
+            SeriesRollup.bucket, SeriesRollup.field, SeriesRollup.count,
+            SeriesRollup.sum, SeriesRollup.min, SeriesRollup.max
+        ).where(
+            SeriesRollup.patient_id == patient_id,
+            SeriesRollup.series == series,
+            SeriesRollup.resolution == resolution,
+            SeriesRollup.bucket >= first_bucket,
+            SeriesRollup.field.in_(fields)
+        ).order_by(SeriesRollup.bucket)
+        if until:
+            query = query.where(SeriesRollup.bucket < int(_to_ms([until])[0] // 1000))
+        rows = db.session.execute(query).all()
+
+        timestamps = []
+        positions = {}
+        for row in rows:
+            if row.bucket not in positions:
+                positions[row.bucket] = len(timestamps)
+                timestamps.append(row.bucket)
+
+        timestamps = _from_ms(np.array(timestamps, dtype=np.int64) * 1000)
+        size = len(timestamps)
+        data = {
+            field: {'mean': [None] * size, 'min': [None] * size, 'max': [None] * size, 'count': [0] * size}
+            for field in fields
+        }
+        for bucket, field, count, total, minimum, maximum in rows:
+            position = positions[bucket]
+            values = data[field]
+            values['mean'][position] = total / count
+            values['min'][position] = minimum
+            values['max'][position] = maximum
+            values['count'][position] = count
+        return timestamps, data
+
+
+# Instância compartilhada pelas rotas de inserção e consulta
+series_store = SeriesStore()
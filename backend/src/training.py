@@ -0,0 +1,200 @@
+import heapq
+import os
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from scipy.stats import randint
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score, roc_auc_score
+from sklearn.model_selection import GroupKFold, GroupShuffleSplit, RandomizedSearchCV
+from sqlalchemy import select, tuple_
+
+from ai_agent import AIAgent
+from features import FEATURE_SIGNALS, SERIES_MODELS, feature_vector, fold
+from model_registry import model_registry
+from models.patient import Patient, PatientOutcome, db
+
+# Leituras lidas por consulta ao montar o conjunto de treinamento
+READ_CHUNK_SIZE = 10000
+
+# Intervalo mínimo entre duas amostras do mesmo paciente (leituras muito próximas são quase idênticas)
+DEFAULT_SAMPLE_INTERVAL = timedelta(hours=1)
+
+# Espaço de busca dos hiperparâmetros da Random Forest
+PARAM_DISTRIBUTIONS = {
+    'n_estimators': randint(100, 400),
+    'max_depth': [None, 8, 12, 16, 24],
+    'min_samples_leaf': randint(1, 20),
+    'max_features': ['sqrt', 'log2', 0.5],
+    'class_weight': [None, 'balanced'],
+}
+
+
+def feature_names() -> list:
+    """
+    Colunas do conjunto de treinamento, na mesma ordem do vetor servido pelo feature store.
+    """
+    class _Blank:
+        age = None
+        surgery_date = None
+    return list(feature_vector(_Blank(), {}, datetime.utcnow()))
+
+
+def _iter_readings(series: str, chunk_size: int):
+    """
+    Leituras de uma série dos pacientes com desfecho registrado, em ordem (paciente, horário),
+    lidas em blocos com paginação por chave para não carregar a tabela inteira.
+    """
+    model = SERIES_MODELS[series]
+    fields = list(FEATURE_SIGNALS[series])
+    columns = [getattr(model, field) for field in fields]
+    last = None
+    while True:
+        query = (
+            select(model.patient_id, model.timestamp, model.id, *columns)
+            .join(PatientOutcome, PatientOutcome.patient_id == model.patient_id)
+            .order_by(model.patient_id, model.timestamp, model.id)
+            .limit(chunk_size)
+        )
+        if last is not None:
+            query = query.where(tuple_(model.patient_id, model.timestamp, model.id) > last)
+        rows = db.session.execute(query).all()
+        if not rows:
+            return
+        for row in rows:
+            yield row[0], row[1], series, dict(zip(fields, row[3:]))
+        last = tuple(rows[-1][:3])
+
+
+def build_training_set(sample_interval: timedelta = DEFAULT_SAMPLE_INTERVAL, chunk_size: int = READ_CHUNK_SIZE):
+    """
+    Monta o conjunto de treinamento a partir das tabelas de leituras dos pacientes com desfecho.
+
+    As leituras de cada paciente são reproduzidas em ordem cronológica com as mesmas funções do
+    feature store (fold/feature_vector), então o modelo é treinado com as features que recebe na
+    predição. Cada amostra é o vetor do paciente em um instante com sinais vitais e exames,
+    rotulado com o desfecho. Retorna (X, y, grupos por paciente, nomes das features).
+    """
+    outcomes = {
+        row.patient_id: row for row in db.session.execute(
+            select(PatientOutcome.patient_id, PatientOutcome.complication, PatientOutcome.occurred_at)
+        )
+    }
+    patients = {
+        row.id: row for row in db.session.execute(
+            select(Patient.id, Patient.age, Patient.surgery_date)
+            .join(PatientOutcome, PatientOutcome.patient_id == Patient.id)
+        )
+    }
+    names = feature_names()
+    vital_names = set(FEATURE_SIGNALS['vital_signs'].values())
+    lab_names = set(FEATURE_SIGNALS['lab_results'].values())
+
+    samples, labels, groups = [], [], []
+    readings = heapq.merge(
+        *(_iter_readings(series, chunk_size) for series in SERIES_MODELS),
+        key=lambda reading: (reading[0], reading[1])
+    )
+
+    current_id, state, last_sample = None, {}, None
+    for patient_id, timestamp, series, values in readings:
+        if patient_id != current_id:
+            current_id, state, last_sample = patient_id, {}, None
+        fold(state, series, timestamp, values)
+
+        outcome = outcomes[patient_id]
+        if outcome.occurred_at is not None and timestamp >= outcome.occurred_at:
+            continue
+        if last_sample is not None and timestamp - last_sample < sample_interval:
+            continue
+        if not (vital_names & state.keys() and lab_names & state.keys()):
+            continue
+
+        vector = feature_vector(patients[patient_id], state, timestamp)
+        samples.append([vector[name] for name in names])
+        labels.append(int(outcome.complication))
+        groups.append(patient_id)
+        last_sample = timestamp
+
+    X = np.array(samples, dtype=np.float64).reshape(len(samples), len(names))
+    return X, np.array(labels, dtype=np.int64), np.array(groups, dtype=np.int64), names
+
+
+def train_from_database(n_iter: int = 20, cv: int = 5, n_jobs: int = -1, test_size: float = 0.2,
+                        sample_interval: timedelta = DEFAULT_SAMPLE_INTERVAL, random_state: int = 42,
+                        activate: bool = True, log=print) -> str:
+    """
+    Treina um modelo com os dados do banco e o registra como nova versão.
+
+    Busca aleatória de hiperparâmetros com validação cruzada por paciente (GroupKFold), em
+    paralelo em todos os núcleos (n_jobs=-1); o melhor modelo é avaliado em pacientes
+    separados para teste. Retorna a versão registrada.
+    """
+    started = time.perf_counter()
+    X, y, groups, names = build_training_set(sample_interval)
+    data_seconds = time.perf_counter() - started
+    n_patients = len(np.unique(groups))
+    log(f"Conjunto de treinamento: {len(y)} amostras de {n_patients} pacientes ({data_seconds:.1f}s)")
+
+    if len(np.unique(y)) < 2:
+        raise ValueError("O treinamento precisa de pacientes com e sem complicação (registre os desfechos).")
+    if n_patients < 2 * cv:
+        raise ValueError(f"Pacientes com desfecho insuficientes para validação cruzada com {cv} partes: {n_patients}")
+
+    # Teste com pacientes que não aparecem no treino: amostras do mesmo paciente são correlacionadas
+    train_index, test_index = next(
+        GroupShuffleSplit(n_splits=1, test_size=test_size, random_state=random_state).split(X, y, groups)
+    )
+    search = RandomizedSearchCV(
+        # Paralelismo entre candidatos e partes; cada floresta usa um único núcleo
+        RandomForestClassifier(random_state=random_state, n_jobs=1),
+        PARAM_DISTRIBUTIONS,
+        n_iter=n_iter,
+        scoring='roc_auc',
+        cv=GroupKFold(n_splits=cv),
+        n_jobs=n_jobs,
+        random_state=random_state,
+        refit=True
+    )
+    fit_started = time.perf_counter()
+    search.fit(X[train_index], y[train_index], groups=groups[train_index])
+    fit_seconds = time.perf_counter() - fit_started
+    log(f"Busca de hiperparâmetros concluída em {fit_seconds:.1f}s: {search.best_params_}")
+
+    model = search.best_estimator_
+    X_test, y_test = X[test_index], y[test_index]
+    probabilities = model.predict_proba(X_test)[:, list(model.classes_).index(1)]
+    predictions = model.predict(X_test)
+    metrics = {
+        'accuracy': float(accuracy_score(y_test, predictions)),
+        'precision': float(precision_score(y_test, predictions, zero_division=0)),
+        'recall': float(recall_score(y_test, predictions, zero_division=0)),
+        'f1': float(f1_score(y_test, predictions, zero_division=0)),
+        'roc_auc': float(roc_auc_score(y_test, probabilities)) if len(np.unique(y_test)) > 1 else None,
+        'cv_roc_auc': float(search.best_score_),
+    }
+    log(f"Métricas no conjunto de teste: {metrics}")
+
+    agent = AIAgent()
+    agent.model = model
+    agent.features = names
+    return model_registry.register(agent, {
+        'source': 'database',
+        'target_column': 'complication',
+        'training_samples': int(len(train_index)),
+        'test_samples': int(len(test_index)),
+        'training_patients': int(n_patients),
+        'sample_interval_minutes': sample_interval.total_seconds() / 60,
+        'best_params': {
+            key: value.item() if isinstance(value, np.generic) else value
+            for key, value in search.best_params_.items()
+        },
+        'search': {'n_iter': n_iter, 'cv': cv, 'n_jobs': n_jobs, 'cpu_count': os.cpu_count()},
+        'metrics': metrics,
+        'training_seconds': {
+            'data': round(data_seconds, 2),
+            'search': round(fit_seconds, 2),
+            'total': round(time.perf_counter() - started, 2),
+        },
+    }, activate=activate)
@@ -0,0 +1,152 @@
+"""
+Aquecimento dos recursos pesados: modelo de IA (scikit-learn, joblib) e pipeline spaCy.
+
+Importar a aplicação não carrega esses módulos; cada um é carregado no primeiro uso ou, conforme
+HOLDMED_WARMUP, por este módulo:
+    background  (padrão) em uma thread de fundo iniciada por create_app; as rotas que não usam
+                o modelo nem o NLP (ex.: /api/users) respondem enquanto isso
+    eager       na própria create_app, antes de aceitar requisições (ex.: serve.py, antes do fork)
+    lazy        só no primeiro uso, pela requisição que precisar
+
+GET /api/health/ready informa o estado de cada recurso.
+"""
+import os
+import threading
+import time
+
+from model_registry import model_registry
+from nlp_service import nlp_service
+
+MODES = ('background', 'eager', 'lazy')
+
+WARMUP_MODE = os.environ.get('HOLDMED_WARMUP', 'background').lower()
+
+PENDING = 'pending'
+LOADING = 'loading'
+READY = 'ready'
+FAILED = 'failed'
+
+
+class Warmup:
+    """
+    Carrega os recursos registrados, em ordem, e guarda o estado, a duração e o erro de cada um.
+    """
+
+    def __init__(self):
+        self.mode = None
+        self._components = {}
+        self._status = {}
+        self._lock = threading.Lock()
+        # Preso enquanto um recurso carrega: um fork (ex.: pool de tarefas) espera a carga terminar,
+        # senão o filho herdaria módulos importados pela metade
+        self._loading = threading.Lock()
+        self._thread = None
+        self._started_at = None
+        self._finished_at = None
+        # O processo filho herda o estado (os recursos já carregados), mas não a thread
+        os.register_at_fork(
+            before=self._before_fork, after_in_parent=self._after_fork, after_in_child=self._reset_locks
+        )
+
+    def _before_fork(self):
+        self._loading.acquire()
+
+    def _after_fork(self):
+        self._loading.release()
+
+    def _reset_locks(self):
+        self._lock = threading.Lock()
+        self._loading = threading.Lock()
+
+    def register(self, name: str, load, is_loaded):
+        """
+        load: carrega o recurso; is_loaded: informa se ele já está em memória (ex.: carregado
+        no primeiro uso por uma requisição, antes do aquecimento chegar nele).
+        """
+        self._components[name] = (load, is_loaded)
+        self._status[name] = {'state': PENDING, 'seconds': None, 'error': None}
+
+    def run(self):
+        """
+        Carrega agora, nesta thread, os recursos que ainda não estão em memória.
+        """
+        self._started_at = self._started_at or time.time()
+        for name, (load, is_loaded) in self._components.items():
+            if is_loaded():
+                self._set(name, state=READY)
+                continue
+            self._set(name, state=LOADING, error=None)
+            started = time.perf_counter()
+            try:
+                with self._loading:
+                    load()
+            except Exception as e:
+                self._set(name, state=FAILED, seconds=round(time.perf_counter() - started, 3), error=str(e))
+                print(f"❌ Aquecimento de {name} falhou: {e}")
+            else:
+                self._set(name, state=READY, seconds=round(time.perf_counter() - started, 3))
+        self._finished_at = time.time()
+
+    def start(self):
+        """
+        Inicia o aquecimento em uma thread de fundo (uma única vez por processo).
+        """
+        with self._lock:
+            if self._thread is None:
+                self._started_at = time.time()
+                self._thread = threading.Thread(target=self.run, name='holdmed-warmup', daemon=True)
+                self._thread.start()
+        return self._thread
+
+    def _set(self, name: str, **fields):
+        with self._lock:
+            self._status[name] = {**self._status[name], **fields}
+
+    def status(self) -> dict:
+        """
+        Estado de cada recurso e o geral: 'ready' (todos carregados), 'warming' (thread de
+        aquecimento em andamento), 'degraded' (algum falhou) ou 'lazy' (aguardando o primeiro uso).
+        """
+        with self._lock:
+            components = {name: dict(status) for name, status in self._status.items()}
+        for name, (_, is_loaded) in self._components.items():
+            # Recursos carregados sob demanda por uma requisição também contam
+            if components[name]['state'] != READY and is_loaded():
+                components[name]['state'] = READY
+
+        states = {component['state'] for component in components.values()}
+        if states <= {READY}:
+            status = 'ready'
+        elif self._thread is not None and self._thread.is_alive():
+            status = 'warming'
+        elif FAILED in states:
+            status = 'degraded'
+        else:
+            status = 'lazy'
+
+        finished = self._finished_at if status != 'warming' else None
+        return {
+            'status': status,
+            'mode': self.mode,
+            'seconds': round(finished - self._started_at, 3) if finished and self._started_at else None,
+            'components': components,
+        }
+
+    def init_app(self, app):
+        """
+        Aplica o modo de aquecimento (app.config['WARMUP'] ou HOLDMED_WARMUP).
+        """
+        mode = app.config.setdefault('WARMUP', WARMUP_MODE)
+        if mode not in MODES:
+            raise ValueError(f"Modo de aquecimento inválido: {mode} (use {', '.join(MODES)})")
+        self.mode = mode
+        if mode == 'eager':
+            self.run()
+        elif mode == 'background':
+            self.start()
+
+
+# Instância compartilhada por create_app e pela rota de prontidão
+warmup = Warmup()
+warmup.register('model', model_registry.get_agent, lambda: model_registry.version is not None)
+warmup.register('nlp', nlp_service.load, lambda: nlp_service.loaded)
@@ -0,0 +1,52 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+# Sem threads de fundo nem carregamento do modelo/spaCy durante os testes
+os.environ.setdefault('HOLDMED_JOB_WORKERS', '0')
+os.environ.setdefault('HOLDMED_WARMUP', 'lazy')
+os.environ.setdefault('HOLDMED_RISK_SWEEP_SECONDS', '0')
+
+from main import create_app  # noqa: E402
+from models.user import db  # noqa: E402
+import storage  # noqa: E402
+from model_registry import model_registry  # noqa: E402
+
+
+@pytest.fixture(scope='session', autouse=True)
+def model_registry_dir(tmp_path_factory):
+    # Registro de modelos próprio de cada sessão de testes, apagado pelo pytest
+    root = str(tmp_path_factory.mktemp('model-registry'))
+    previous = os.environ.get('HOLDMED_MODEL_REGISTRY')
+    os.environ['HOLDMED_MODEL_REGISTRY'] = root
+    model_registry.root = root
+    yield root
+    if previous is None:
+        del os.environ['HOLDMED_MODEL_REGISTRY']
+    else:
+        os.environ['HOLDMED_MODEL_REGISTRY'] = previous
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}", 'TESTING': True})
+    yield app
+    storage.dispose(app, db)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def patient_id(client):
+    response = client.post('/api/patients', json={
+        'name': 'Paciente Teste', 'age': 60, 'gender': 'F', 'surgery_type': 'Apendicectomia',
+        'surgery_date': '2024-01-01T08:00:00'
+    })
+    assert response.status_code == 201
+    return response.get_json()['id']
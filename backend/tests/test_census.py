@@ -0,0 +1,33 @@
+from models.patient import Patient, add_missing_columns, db
+
+
+def _create(client, name):
+    response = client.post('/api/patients', json={'name': name, 'age': 50, 'gender': 'M', 'surgery_type': 'Colecistectomia'})
+    assert response.status_code == 201
+
+
+def test_name_prefix_ignores_accents_and_case(client):
+    for name in ('Ávila Souza', 'Álvaro Lima', 'Bruno Avelar', 'Érica Andrade'):
+        _create(client, name)
+
+    for prefix in ('á', 'A', 'avila', 'ÁVI'):
+        response = client.get('/api/patients', query_string={'name': prefix, 'sort': 'name'})
+        assert response.status_code == 200
+        names = [patient['name'] for patient in response.get_json()]
+        expected = ['Álvaro Lima', 'Ávila Souza'] if prefix in ('á', 'A') else ['Ávila Souza']
+        assert names == expected
+        assert 'name_key' not in response.get_json()[0]
+
+    response = client.get('/api/patients', query_string={'name': 'e'})
+    assert [patient['name'] for patient in response.get_json()] == ['Érica Andrade']
+
+
+def test_existing_database_gets_name_key(app):
+    with app.app_context():
+        db.session.add(Patient(name='Ângela Prado'))
+        db.session.commit()
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql('DROP INDEX ix_patient_name_key')
+            connection.exec_driver_sql('ALTER TABLE patient DROP COLUMN name_key')
+        add_missing_columns()
+        assert db.session.execute(db.select(Patient.name_key)).scalar() == 'angela prado'
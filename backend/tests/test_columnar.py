@@ -0,0 +1,68 @@
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+from models.patient import db
+from models.timeseries import SeriesHead
+import timeseries
+from timeseries import series_store
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+
+def test_app_startup_does_not_import_pyarrow():
+    # Processo novo: outros testes podem já ter importado o pyarrow neste
+    code = 'import sys, main; print("pyarrow" in sys.modules)'
+    output = subprocess.run([sys.executable, '-c', code], cwd=SRC_DIR, env=os.environ.copy(),
+                            capture_output=True, text=True, check=True).stdout
+    assert output.strip() == 'False'
+
+
+def _vitals_file(patient_id, ids):
+    import pyarrow as pa
+    import pyarrow.ipc
+
+    table = pa.table({
+        'id': ids,
+        'patient_id': [patient_id] * len(ids),
+        'timestamp': [datetime(2024, 1, 2, 8) + timedelta(minutes=row_id) for row_id in ids],
+        'heart_rate': [60 + row_id for row_id in ids],
+    })
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def test_import_below_sealed_id_rebuilds_series(app, client, patient_id, monkeypatch):
+    pytest.importorskip('pyarrow')
+    monkeypatch.setattr(timeseries, 'CHUNK_ROWS', 4)
+
+    for ids in ([10, 11, 12, 13], [1, 2]):
+        response = client.post('/api/import/vital-signs', data=_vitals_file(patient_id, ids),
+                               content_type='application/vnd.apache.arrow.stream')
+        assert response.status_code == 201
+
+    with app.app_context():
+        head = db.session.get(SeriesHead, (patient_id, 'vital_signs'))
+        assert (head.sealed_through_id, head.pending_count) == (13, 0)
+        series = series_store.query('vital_signs', patient_id, 'raw', since=datetime(2024, 1, 2),
+                                    until=datetime(2024, 1, 3), fields=['heart_rate'])
+    assert series['fields']['heart_rate'] == [61, 62, 70, 71, 72, 73]
+
+
+def test_import_reports_only_colliding_ids(app, client, patient_id):
+    pytest.importorskip('pyarrow')
+    response = client.post('/api/import/vital-signs', data=_vitals_file(patient_id, [5, 6]),
+                           content_type='application/vnd.apache.arrow.stream')
+    assert response.status_code == 201
+
+    response = client.post('/api/import/vital-signs', data=_vitals_file(patient_id, [1, 2, 5, 7, 8]),
+                           content_type='application/vnd.apache.arrow.stream')
+    assert response.status_code == 207
+    body = response.get_json()
+    assert body['inserted'] == 4
+    assert [error['index'] for error in body['errors']] == [2]
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from early_warning import EarlyWarningEngine
+
+START = datetime(2024, 1, 2, 8, 0)
+
+
+@pytest.fixture
+def engine():
+    return EarlyWarningEngine(max_age=timedelta(minutes=60))
+
+
+def _score(engine, **readings):
+    values = np.array([[readings.get(field, np.nan) for field in engine.fields]], dtype=np.float64)
+    return dict(zip(engine.fields, engine.points(values)[0].tolist()))
+
+
+def _fold(engine, state, minutes, **readings):
+    values = np.array([[readings.get(field, np.nan) for field in engine.fields]], dtype=np.float64)
+    return engine.fold(state, START + timedelta(minutes=minutes), values[0].tolist(), engine.points(values)[0].tolist())
+
+
+@pytest.mark.parametrize('field, value, points', [
+    ('temperature', 35.0, 3),
+    ('temperature', 35.1, 1),
+    ('temperature', 36.0, 1),
+    ('temperature', 36.1, 0),
+    ('temperature', 38.0, 0),
+    ('temperature', 39.1, 2),
+    ('oxygen_saturation', 91, 3),
+    ('oxygen_saturation', 92, 2),
+    ('oxygen_saturation', 95, 1),
+    ('oxygen_saturation', 96, 0),
+    ('respiratory_rate', 8, 3),
+    ('respiratory_rate', 12, 0),
+    ('respiratory_rate', 25, 3),
+    ('heart_rate', 40, 3),
+    ('heart_rate', 91, 1),
+    ('heart_rate', 131, 3),
+    ('blood_pressure_systolic', 90, 3),
+    ('blood_pressure_systolic', 111, 0),
+    ('blood_pressure_systolic', 220, 3),
+])
+def test_band_edges(engine, field, value, points):
+    assert _score(engine, **{field: value})[field] == points
+
+
+def test_missing_values_have_no_points(engine):
+    assert _score(engine, heart_rate=80)['temperature'] == -1
+
+
+def test_partial_readings_combine_with_latest_values(engine):
+    state = {}
+    assert _fold(engine, state, 0, respiratory_rate=22, oxygen_saturation=95, temperature=36.5) == ('low', 'low')
+    assert state['score'] == 3
+    # Só frequência cardíaca: soma-se aos valores mais recentes dos demais parâmetros
+    assert _fold(engine, state, 5, heart_rate=115) == ('low', 'medium')
+    assert state['score'] == 5
+    assert state['parameters']['respiratory_rate']['value'] == 22
+
+
+def test_out_of_order_reading_is_ignored(engine):
+    state = {}
+    _fold(engine, state, 10, heart_rate=80)
+    # Leitura retroativa de um parâmetro já mais recente não muda o estado
+    assert _fold(engine, state, 5, heart_rate=135) == ('low', 'low')
+    assert state['parameters']['heart_rate']['value'] == 80
+    # Parâmetro ainda sem leitura é aceito mesmo com horário anterior
+    _fold(engine, state, 0, temperature=35.0)
+    assert state['parameters']['temperature']['points'] == 3
+
+
+def test_values_older_than_max_age_leave_the_score(engine):
+    state = {}
+    _fold(engine, state, 0, respiratory_rate=25)
+    assert (state['score'], state['level']) == (3, 'low_medium')
+    _fold(engine, state, 60, heart_rate=95)
+    assert state['score'] == 4
+    # 61 minutos depois da frequência respiratória: ela sai do escore
+    assert _fold(engine, state, 61, heart_rate=95) == ('low_medium', 'low')
+    assert state['score'] == 1
@@ -0,0 +1,24 @@
+from extraction_cache import extraction_cache
+from models.patient import ClinicalNoteExtraction, ClinicalNotes, db
+
+
+def test_store_replaces_existing_extraction(app, patient_id):
+    with app.app_context():
+        note = ClinicalNotes(patient_id=patient_id, note_type='evolução', content='Febre alta.', author='Equipe')
+        db.session.add(note)
+        db.session.commit()
+        note_id = note.id
+
+        first = {'extracted_entities': [['febre', 'MISC']], 'keywords': ['febre'], 'medical_terms': ['febre']}
+        extraction_cache.store(note_id, 'Febre alta.', first)
+        db.session.commit()
+        db.session.remove()
+
+        # Outra sessão grava a mesma nota por cima da extração existente
+        second = {'extracted_entities': [], 'keywords': ['alta'], 'medical_terms': []}
+        extraction_cache.store(note_id, 'Febre alta.', second)
+        db.session.commit()
+
+        stored = db.session.get(ClinicalNoteExtraction, note_id, populate_existing=True)
+        assert stored.keywords == ['alta']
+        assert db.session.query(ClinicalNoteExtraction).count() == 1
@@ -0,0 +1,48 @@
+from models.patient import VitalSigns, db
+
+
+def test_bulk_rejects_fractional_integer_fields(app, client, patient_id):
+    readings = [
+        {'patient_id': patient_id, 'timestamp': '2024-01-02T08:00:00', 'heart_rate': 72.5},
+        {'patient_id': patient_id, 'timestamp': '2024-01-02T09:00:00', 'heart_rate': 80.0, 'respiratory_rate': 16},
+    ]
+    response = client.post('/api/vital-signs/bulk', json=readings)
+    body = response.get_json()
+    assert body['inserted'] == 1
+    assert body['errors'] == [{'index': 0, 'error': 'heart_rate deve ser inteiro'}]
+
+    with app.app_context():
+        assert db.session.execute(db.select(VitalSigns.heart_rate)).scalars().all() == [80]
+
+
+def test_bulk_converts_offset_timestamps_to_utc(app, client, patient_id):
+    readings = [{'patient_id': patient_id, 'timestamp': '2026-10-18T20:00:00+03:00', 'heart_rate': 70}]
+    response = client.post('/api/vital-signs/bulk', json=readings)
+    assert response.get_json()['inserted'] == 1
+
+    with app.app_context():
+        timestamp = db.session.execute(db.select(VitalSigns.timestamp)).scalar()
+    assert timestamp.isoformat() == '2026-10-18T17:00:00'
+
+
+def test_bulk_reports_only_rows_rejected_by_the_database(app, client, patient_id):
+    with app.app_context(), db.engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TRIGGER reject_666 BEFORE INSERT ON vital_signs WHEN NEW.heart_rate = 666 "
+            "BEGIN SELECT RAISE(ABORT, 'leitura recusada'); END"
+        )
+    readings = [{'patient_id': patient_id, 'timestamp': f'2024-01-02T08:{minute:02d}:00', 'heart_rate': 70 + minute}
+                for minute in range(10)]
+    readings[3]['heart_rate'] = readings[8]['heart_rate'] = 666
+    response = client.post('/api/vital-signs/bulk', json=readings)
+    assert response.status_code == 207
+    body = response.get_json()
+    assert body['inserted'] == 8
+    assert [error['index'] for error in body['errors']] == [3, 8]
+
+
+def test_bulk_rejects_integers_out_of_range(client, patient_id):
+    readings = [{'patient_id': patient_id, 'heart_rate': 1 << 63}, {'patient_id': 1 << 64}]
+    body = client.post('/api/vital-signs/bulk', json=readings).get_json()
+    assert body['errors'] == [{'index': 0, 'error': 'heart_rate fora do intervalo aceito'},
+                              {'index': 1, 'error': 'patient_id é obrigatório e deve ser inteiro'}]
@@ -0,0 +1,37 @@
+import insights
+from push import event_broker, patient_topic
+
+
+def _body(patient_id, predicted):
+    return {
+        'patient_id': patient_id,
+        'patient_name': 'Paciente Teste',
+        'insights': [],
+        'prediction': {'complication_predicted': predicted, 'probability': 0.9 if predicted else 0.1},
+        'latest_vital_signs': None,
+        'latest_lab_results': None,
+        'processed_notes': {},
+    }
+
+
+def test_alert_is_published_only_after_commit(app, patient_id):
+    subscription = event_broker.subscribe([patient_topic(patient_id)])
+    try:
+        with app.app_context():
+            _, alert = insights.store(patient_id, (None, None, None), 'v0001', _body(patient_id, True))
+            assert alert is not None
+            assert subscription.queue.empty()
+
+            insights.db.session.rollback()
+            # Snapshot não gravado: a próxima predição positiva ainda gera o alerta
+            _, alert = insights.store(patient_id, (None, None, None), 'v0001', _body(patient_id, True))
+            insights.db.session.commit()
+            insights.publish_alert(alert)
+
+        message = subscription.queue.get(timeout=1)
+        assert 'event: alert' in message
+        with app.app_context():
+            _, alert = insights.store(patient_id, (None, None, None), 'v0001', _body(patient_id, True))
+            assert alert is None
+    finally:
+        event_broker.unsubscribe(subscription)
@@ -0,0 +1,22 @@
+from datetime import datetime, timedelta
+
+from jobs import job_queue
+from models.job import Job
+from models.user import db
+
+
+def test_purge_finished_removes_only_old_finished_jobs(app):
+    now = datetime.utcnow()
+    with app.app_context():
+        db.session.add_all([
+            Job(kind='process_text', status='done', result={'a': 1}, finished_at=now - timedelta(hours=48)),
+            Job(kind='process_text', status='failed', error='x', finished_at=now - timedelta(hours=30)),
+            Job(kind='process_text', status='done', result={'a': 1}, finished_at=now - timedelta(hours=1)),
+            Job(kind='process_text', status='queued'),
+            Job(kind='process_text', status='running', started_at=now - timedelta(hours=48)),
+        ])
+        db.session.commit()
+
+        assert job_queue.purge_finished(timedelta(hours=24)) == 2
+        remaining = sorted(job.status for job in Job.query.all())
+        assert remaining == ['done', 'queued', 'running']
@@ -0,0 +1,74 @@
+import pytest
+
+from models.patient import ClinicalNotes, db
+from models.search import NoteTerm
+import note_search as note_search_module
+from note_search import note_search
+
+
+@pytest.fixture
+def note_id(app, patient_id):
+    with app.app_context():
+        note = ClinicalNotes(patient_id=patient_id, note_type='evolução', content='Febre e infecção de ferida.',
+                             author='Equipe')
+        db.session.add(note)
+        db.session.commit()
+        return note.id
+
+
+@pytest.mark.parametrize('query', ['!!!', '"', '* -'])
+def test_query_without_words_is_rejected(client, note_id, query):
+    response = client.get('/api/notes/search', query_string={'q': query})
+
+    assert response.status_code == 400
+
+
+def test_query_without_words_matches_nothing(app, note_id):
+    with app.app_context():
+        rows, _, next_key = note_search.search('!!!')
+        assert rows == [] and next_key is None
+        assert note_search.count('!!!') == 0
+
+
+def test_search_finds_note_without_accents(client, note_id):
+    response = client.get('/api/notes/search', query_string={'q': 'infeccao'})
+
+    assert response.status_code == 200
+    assert [row['id'] for row in response.get_json()] == [note_id]
+
+
+def test_index_extractions_tolerates_terms_already_indexed(app, note_id):
+    result = {'extracted_entities': [['febre', 'MISC']], 'keywords': ['febre'], 'medical_terms': ['febre']}
+    with app.app_context():
+        # A mesma nota duas vezes no lote, como em duas gravações concorrentes: os termos repetidos são ignorados
+        note_search.index_extractions([(note_id, result), (note_id, result)])
+        db.session.commit()
+
+        assert db.session.query(NoteTerm).filter_by(note_id=note_id).count() == 3
+
+
+@pytest.mark.parametrize('limit', [2, 3, 7])
+def test_relevance_pages_reach_matches_outside_the_rank_window(app, client, patient_id, monkeypatch, limit):
+    monkeypatch.setattr(note_search_module, 'RANK_WINDOW', 3)
+    with app.app_context():
+        notes = [ClinicalNotes(patient_id=patient_id, note_type='evolução', author='Equipe',
+                               content='febre ' * (1 + index % 3) + f'nota {index}') for index in range(7)]
+        db.session.add_all(notes)
+        db.session.commit()
+        ids = [note.id for note in notes]
+
+    seen, cursor = [], None
+    while True:
+        query = {'q': 'febre', 'limit': limit, 'count': 1, **({'cursor': cursor} if cursor else {})}
+        response = client.get('/api/notes/search', query_string=query)
+        if cursor is None:
+            assert response.headers['X-Total-Count'] == '7'
+        seen += [(row['id'], row['rank']) for row in response.get_json()]
+        cursor = response.headers.get('X-Next-Cursor')
+        if cursor is None:
+            break
+
+    # As 3 mais recentes por relevância; as demais depois, da mais nova para a mais antiga, sem rank
+    assert sorted(row_id for row_id, _ in seen[:3]) == ids[4:]
+    assert all(rank is not None for _, rank in seen[:3])
+    assert seen[3:] == [(row_id, None) for row_id in reversed(ids[:4])]
@@ -0,0 +1,16 @@
+def test_outcome_converts_offset_to_utc_and_replaces(client, patient_id):
+    response = client.put(f'/api/patients/{patient_id}/outcome',
+                          json={'complication': True, 'occurred_at': '2024-01-03T10:00:00-03:00'})
+    assert response.status_code == 200
+    assert response.get_json()['occurred_at'] == '2024-01-03T13:00:00'
+
+    response = client.put(f'/api/patients/{patient_id}/outcome', json={'complication': False})
+    assert response.status_code == 200
+    assert response.get_json()['complication'] is False
+    assert response.get_json()['occurred_at'] is None
+
+
+def test_outcome_rejects_non_string_occurred_at(client, patient_id):
+    response = client.put(f'/api/patients/{patient_id}/outcome', json={'complication': True, 'occurred_at': 12})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'occurred_at deve estar no formato ISO 8601'
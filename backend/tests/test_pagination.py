@@ -0,0 +1,33 @@
+def test_series_cursor_pages_through_readings(client, patient_id):
+    readings = [{'patient_id': patient_id, 'timestamp': f'2024-01-02T0{hour}:00:00+00:00', 'heart_rate': 70 + hour}
+                for hour in range(5)]
+    assert client.post('/api/vital-signs/bulk', json=readings).status_code == 201
+
+    seen, cursor = [], None
+    while True:
+        query = {'include': 'vital_signs', 'limit': 2, **({'vital_signs_cursor': cursor} if cursor else {})}
+        body = client.get(f'/api/patients/{patient_id}', query_string=query).get_json()
+        seen = [reading['heart_rate'] for reading in body['vital_signs']] + seen
+        cursor = body['pagination']['vital_signs']['next_cursor']
+        if cursor is None:
+            break
+    assert seen == [70, 71, 72, 73, 74]
+
+
+def test_census_cursor_pages_by_name(client):
+    for name in ('Carla', 'Ana', 'Bruno'):
+        client.post('/api/patients', json={'name': name, 'age': 40, 'gender': 'F', 'surgery_type': 'Hérnia'})
+
+    first = client.get('/api/patients', query_string={'sort': 'name', 'limit': 2})
+    assert [patient['name'] for patient in first.get_json()] == ['Ana', 'Bruno']
+    second = client.get('/api/patients', query_string={'sort': 'name', 'limit': 2,
+                                                       'cursor': first.headers['X-Next-Cursor']})
+    assert [patient['name'] for patient in second.get_json()] == ['Carla']
+
+
+def test_invalid_cursor_is_rejected(client, patient_id):
+    response = client.get(f'/api/patients/{patient_id}', query_string={'vital_signs_cursor': 'xyz'})
+    assert response.status_code == 400
+    assert client.get('/api/patients', query_string={'cursor': 'WzFd'}).status_code == 200
+    assert client.get('/api/patients', query_string={'sort': 'name', 'cursor': 'WzFd'}).status_code == 400
+    assert client.get('/api/notes/search', query_string={'q': 'dor', 'cursor': 'xyz'}).status_code == 400
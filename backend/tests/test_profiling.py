@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+import instrumentation
+
+
+@pytest.fixture
+def profiling(monkeypatch, tmp_path):
+    monkeypatch.setattr(instrumentation, 'PROFILING', 'request')
+    monkeypatch.setattr(instrumentation, 'PROFILE_DIR', str(tmp_path / 'profiles'))
+    return tmp_path / 'profiles'
+
+
+def test_profile_from_loopback_returns_opaque_id(client, profiling):
+    response = client.get('/api/patients', query_string={'profile': 1})
+    profile_id = response.headers['X-Profile']
+    assert '/' not in profile_id
+    assert os.listdir(profiling) == [f'{profile_id}.collapsed']
+
+
+def test_remote_or_proxied_clients_cannot_profile(client, profiling):
+    response = client.get('/api/patients', query_string={'profile': 1}, environ_base={'REMOTE_ADDR': '10.0.0.5'})
+    assert 'X-Profile' not in response.headers
+    response = client.get('/api/patients', headers={'X-Profile': '1', 'X-Forwarded-For': '10.0.0.5'})
+    assert 'X-Profile' not in response.headers
+    assert not profiling.exists()
+
+
+def test_profile_token_is_required_when_configured(client, profiling, monkeypatch):
+    monkeypatch.setattr(instrumentation, 'PROFILE_TOKEN', 'segredo')
+    assert 'X-Profile' not in client.get('/api/patients', query_string={'profile': 1}).headers
+    response = client.get('/api/patients', headers={'X-Profile': 'segredo'}, environ_base={'REMOTE_ADDR': '10.0.0.5'})
+    assert 'X-Profile' in response.headers
@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta
+
+from models.push import PushEvent
+from models.user import db
+from push import EventBroker, patient_topic
+
+
+def test_relay_delivers_events_published_by_another_process(app, patient_id):
+    # Dois brokers com o repasse ativo simulam dois workers do gunicorn sobre o mesmo banco
+    publisher = EventBroker(relay=True)
+    receiver = EventBroker(relay=False)
+    receiver._last_id = 0
+    subscription = receiver.subscribe([patient_topic(patient_id)])
+
+    with app.app_context():
+        publisher.publish('vital_signs', patient_id, {'heart_rate': 80})
+        publisher.publish('vital_signs', patient_id + 1, {'heart_rate': 90})
+        # Sem entrega local: o evento só chega pelo repasse
+        assert publisher._subscriptions == {}
+        assert receiver.relay_pending() == 2
+
+    message = subscription.queue.get_nowait()
+    assert 'event: vital_signs' in message
+    assert '"heart_rate": 80' in message
+    assert subscription.queue.empty()
+
+    with app.app_context():
+        # Eventos já entregues não são repetidos
+        assert receiver.relay_pending() == 0
+
+
+def test_relay_purges_old_events(app, patient_id):
+    receiver = EventBroker(relay=True)
+    receiver._last_id = 0
+    with app.app_context():
+        db.session.add(PushEvent(event='alert', patient_id=patient_id, data='{}',
+                                 created_at=datetime.utcnow() - timedelta(hours=1)))
+        db.session.add(PushEvent(event='alert', patient_id=patient_id, data='{}'))
+        db.session.commit()
+
+        assert receiver.relay_pending() == 2
+        assert PushEvent.query.count() == 1
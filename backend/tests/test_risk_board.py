@@ -0,0 +1,32 @@
+import ai_agent
+
+
+def test_sweep_includes_patients_without_lab_results(client, patient_id):
+    client.post(f'/api/patients/{patient_id}/vital-signs', json={
+        'heart_rate': 130, 'respiratory_rate': 28, 'oxygen_saturation': 88, 'blood_pressure_systolic': 88,
+        'temperature': 39.2
+    })
+
+    response = client.post('/api/risk-board/sweep')
+    assert response.status_code == 200
+    assert response.get_json()['patients'] == 1
+
+    board = client.get('/api/risk-board').get_json()
+    assert [row['patient_id'] for row in board['patients']] == [patient_id]
+
+
+def test_sweep_scores_patients_without_age(client, patient_id, monkeypatch):
+    # O scikit-learn (usado em lotes grandes) rejeita NaN; a floresta compilada não
+    monkeypatch.setattr(ai_agent, 'COMPILED_MAX_BATCH', 0)
+    response = client.post('/api/patients', json={'name': 'Sem Idade', 'age': None, 'gender': 'M',
+                                                  'surgery_type': 'Apendicectomia'})
+    without_age = response.get_json()['id']
+    for current in (patient_id, without_age):
+        client.post(f'/api/patients/{current}/vital-signs', json={'heart_rate': 95, 'temperature': 37.8})
+
+    response = client.post('/api/risk-board/sweep')
+    assert response.status_code == 200
+    assert (response.get_json()['patients'], response.get_json()['imputed']) == (2, 1)
+
+    board = client.get('/api/risk-board').get_json()
+    assert sorted(row['patient_id'] for row in board['patients']) == sorted([patient_id, without_age])
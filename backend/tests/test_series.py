@@ -0,0 +1,21 @@
+def test_series_accepts_timezone_aware_since(client, patient_id):
+    client.post(f'/api/patients/{patient_id}/vital-signs', json={'heart_rate': 80, 'temperature': 36.8})
+
+    response = client.get(f'/api/patients/{patient_id}/vital-signs/series', query_string={'since': '2024-01-01T00:00:00Z'})
+
+    assert response.status_code == 200
+    assert response.get_json()['since'] == '2024-01-01T00:00:00'
+
+
+def test_series_converts_offset_to_utc(client, patient_id):
+    client.post(f'/api/patients/{patient_id}/vital-signs', json={'heart_rate': 80})
+
+    response = client.get(f'/api/patients/{patient_id}/vital-signs/series', query_string={
+        'since': '2024-01-01T03:00:00+03:00', 'until': '2999-01-01T02:00:00+03:00', 'resolution': 'raw'
+    })
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['since'] == '2024-01-01T00:00:00'
+    assert body['until'] == '2998-12-31T23:00:00'
+    assert body['fields']['heart_rate'] == [80]
@@ -0,0 +1,82 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from main import create_app
+from models.patient import Patient
+from models.user import db
+import storage
+
+
+@pytest.fixture
+def make_app(tmp_path, monkeypatch):
+    # Espera curta por locks: sem WAL o leitor falha logo em vez de esperar 10 s
+    monkeypatch.setattr(storage, 'SQLITE_BUSY_TIMEOUT_MS', 200)
+    apps = []
+
+    def make(**config):
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'storage.db'}", 'TESTING': True, **config})
+        apps.append(app)
+        return app
+
+    yield make
+    for app in apps:
+        storage.dispose(app, db)
+
+
+def _read_during_exclusive_write(app):
+    """
+    Uma conexão mantém uma transação de escrita aberta (BEGIN EXCLUSIVE com um INSERT) enquanto
+    outra conexão do mesmo pool lê a tabela. Retorna o número de pacientes visto pelo leitor.
+    """
+    with app.app_context():
+        writer = db.engine.raw_connection()
+        try:
+            cursor = writer.cursor()
+            cursor.execute('BEGIN EXCLUSIVE')
+            cursor.execute("INSERT INTO patient (name, name_key) VALUES ('Escrita', 'escrita')")
+            with db.engine.connect() as reader:
+                return reader.execute(text('SELECT count(*) FROM patient')).scalar()
+        finally:
+            writer.rollback()
+            writer.close()
+
+
+def test_readers_proceed_during_writes_with_wal(make_app):
+    app = make_app(SQLITE_TUNING=True)
+    with app.app_context():
+        assert db.session.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+    # O leitor não espera o escritor e não vê a transação ainda não confirmada
+    assert _read_during_exclusive_write(app) == 0
+
+
+def test_readers_block_without_tuning(make_app):
+    app = make_app(SQLITE_TUNING=False)
+    with pytest.raises(OperationalError, match='database is locked'):
+        _read_during_exclusive_write(app)
+
+
+def test_get_reads_go_to_the_replica_and_writes_to_the_primary(make_app, tmp_path):
+    app = make_app(SQLALCHEMY_REPLICA_URI=f"sqlite:///{tmp_path / 'replica.db'}")
+    with app.app_context():
+        primary, replica = db.engine, db.engines['replica']
+        assert primary is not replica
+
+    mapper = Patient.__mapper__
+    with app.test_request_context('/api/patients', method='GET'):
+        assert db.session.get_bind(mapper=mapper) is replica
+        db.session.add(Patient(name='Nova'))
+        db.session.flush()
+        # Depois de uma escrita, as leituras da mesma sessão também vão ao principal
+        assert db.session.get_bind(mapper=mapper) is primary
+        db.session.rollback()
+        db.session.remove()
+
+    with app.test_request_context('/api/patients', method='POST'):
+        assert db.session.get_bind(mapper=mapper) is primary
+        db.session.remove()
+
+    with app.app_context():
+        # Fora de requisições (tarefas, comandos) tudo usa o principal
+        assert db.session.get_bind(mapper=mapper) is primary
+        db.session.remove()